@@ -0,0 +1,59 @@
+import os
+import logging
+from . import devxp, streaming
+from .client import async_ai_client
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# asyncio versions of the ai.devxp calls for the async runtime. The prompts are
+# built by the devxp *_payload functions so both runtimes send identical requests.
+
+async def fetch_message(*args, **kwargs):
+    return (await async_ai_client.tool_input("fetch_message", devxp.fetch_message_payload(*args, **kwargs)))["channel_post"][0]
+
+async def fetch_messages(posts: list, *args, **kwargs) -> list:
+    items = (await async_ai_client.tool_input("fetch_messages", devxp.fetch_messages_payload(posts, *args, **kwargs))).get("channel_post", [])
+    return devxp._match_posts(posts, items)
+
+async def stream_messages(posts: list, *args, **kwargs):
+    """Async generator of (position, post), see devxp.stream_messages"""
+    if not streaming.STREAMING:
+        for position, post in enumerate(await fetch_messages(posts, *args, **kwargs)):
+            if post is not None:
+                yield position, post
+        return
+
+    parser = streaming.ArrayItemParser("channel_post")
+    results = [None] * len(posts)
+    position = 0
+    async for fragment in async_ai_client.stream_tool_input("fetch_messages", devxp.fetch_messages_payload(posts, *args, **kwargs)):
+        for item in parser.feed(fragment):
+            slot = devxp._match_post(posts, results, position, item)
+            position += 1
+            if slot is not None:
+                yield slot, results[slot]
+
+async def fetch_post_with_replies(*args, **kwargs):
+    return devxp._check_post_with_replies(await async_ai_client.tool_input("fetch_post_with_replies", devxp.fetch_post_with_replies_payload(*args, **kwargs)))
+
+async def fetch_conversation(conversation_params):
+    return (await async_ai_client.tool_input("fetch_conversation", devxp.fetch_conversation_payload(conversation_params)))["conversations"]
+
+async def thread(*args, **kwargs):
+    replies = (await async_ai_client.tool_input("thread", devxp.thread_payload(*args, **kwargs)))["replies"]
+    logger.info(replies)
+    return replies
+
+async def fetch_channels(customer_name: str, use_case: str):
+    channels = (await async_ai_client.tool_input("fetch_channels", devxp.fetch_channels_payload(customer_name, use_case), bearer=True))["channels"]
+    logger.info(channels)
+    return channels
+
+async def fetch_canvas(*args, **kwargs):
+    return (await async_ai_client.tool_input("fetch_canvas", devxp.fetch_canvas_payload(*args, **kwargs), bearer=True))["canvas"]
+
+async def design_channel(channel_name: str, channel_topic: str, channel_description: str):
+    parameters = await async_ai_client.tool_input("design_channel", devxp.design_channel_payload(channel_name, channel_topic, channel_description))
+    logger.info(parameters)
+    return parameters
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# "postgres", "disk" or "off"
+BACKEND = os.environ.get("AI_CACHE_BACKEND", "postgres").lower()
+TTL = int(os.environ.get("AI_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_BYTES = int(os.environ.get("AI_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+CACHE_DIR = os.environ.get("AI_CACHE_DIR", os.path.join(".cache", "ai"))
+# calls whose answer only depends on the prompt; message generation wants fresh output every time
+CACHED_ENDPOINTS = set(filter(None, os.environ.get("AI_CACHE_ENDPOINTS", "design_channel,fetch_channels,fetch_canvas").split(",")))
+
+# payload fields that change the model's answer; anything else (e.g. "source") is bookkeeping
+_KEY_FIELDS = ("model", "system", "messages", "tools", "tool_choice", "max_tokens", "temperature", "top_p", "top_k")
+# how often (in writes) to check the size budget
+_EVICT_EVERY = 50
+
+
+def cache_key(payload: dict | str) -> str:
+    """Content address of a request: sha256 of the canonical JSON of its semantic fields"""
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    normalised = {field: payload[field] for field in _KEY_FIELDS if field in payload}
+    return hashlib.sha256(json.dumps(normalised, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Base class: hit/miss bookkeeping around a get/put storage backend"""
+    def __init__(self, ttl: int = TTL, max_bytes: int = MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "errors": 0, "evicted": 0}
+        self._writes_since_evict = 0
+
+    def get(self, endpoint: str, payload: dict | str) -> Optional[dict]:
+        try:
+            response = self._get(cache_key(payload))
+        except Exception as e:
+            logger.error(f"AI cache read failed for {endpoint}: {e}")
+            self._count("errors")
+            return None
+        self._count("hits" if response is not None else "misses")
+        if response is not None:
+            logger.debug(f"AI cache hit for {endpoint}")
+        return response
+
+    def put(self, endpoint: str, payload: dict | str, response: dict):
+        try:
+            self._put(cache_key(payload), endpoint, json.dumps(response))
+            self._count("writes")
+            with self._lock:
+                self._writes_since_evict += 1
+                evict = self._writes_since_evict >= _EVICT_EVERY
+                if evict:
+                    self._writes_since_evict = 0
+            if evict:
+                self._count("evicted", self._evict())
+        except Exception as e:
+            logger.error(f"AI cache write failed for {endpoint}: {e}")
+            self._count("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {**self._counters, "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else 0.0}
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[dict]:
+        """The cached response for `key`, or None if there is none or it has expired"""
+
+    @abstractmethod
+    def _put(self, key: str, endpoint: str, body: str):
+        """Store the JSON `body` under `key`"""
+
+    @abstractmethod
+    def _evict(self) -> int:
+        """Drop expired entries, then least recently used ones past max_bytes; returns how many"""
+
+
+class PostgresResponseCache(ResponseCache):
+    """Shared by every dyno and worker, in the ai_response_cache table (see migrations/)"""
+    def __init__(self, db, **kwargs):
+        super().__init__(**kwargs)
+        self.db = db
+
+    def _get(self, key: str) -> Optional[dict]:
+        row = self.db.fetch_one(
+            "UPDATE ai_response_cache SET last_hit_at = now() WHERE key = %s AND expires_at > now() RETURNING response",
+            (key,)
+        )
+        return row["response"] if row else None
+
+    def _put(self, key: str, endpoint: str, body: str):
+        self.db.execute("""
+            INSERT INTO ai_response_cache (key, endpoint, response, size_bytes, expires_at)
+            VALUES (%s, %s, %s, %s, now() + make_interval(secs => %s))
+            ON CONFLICT (key) DO UPDATE SET response = EXCLUDED.response, size_bytes = EXCLUDED.size_bytes,
+                created_at = now(), last_hit_at = now(), expires_at = EXCLUDED.expires_at
+        """, (key, endpoint, body, len(body), self.ttl))
+
+    def _evict(self) -> int:
+        expired = self.db.fetch_one("WITH gone AS (DELETE FROM ai_response_cache WHERE expires_at <= now() RETURNING 1) SELECT COUNT(*) AS n FROM gone")["n"]
+        over = self.db.fetch_one("""
+            WITH ranked AS (
+                SELECT key, SUM(size_bytes) OVER (ORDER BY last_hit_at DESC, key) AS running
+                FROM ai_response_cache
+            ), gone AS (
+                DELETE FROM ai_response_cache WHERE key IN (SELECT key FROM ranked WHERE running > %s) RETURNING 1
+            )
+            SELECT COUNT(*) AS n FROM gone
+        """, (self.max_bytes,))["n"]
+        return expired + over
+
+
+class DiskResponseCache(ResponseCache):
+    """Local to one dyno/machine: one JSON file per key under `directory`"""
+    def __init__(self, directory: str = CACHE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r") as file:
+                response = json.load(file)
+            os.utime(path, None) # mtime doubles as last-used time for eviction
+            return response
+        except FileNotFoundError:
+            return None
+
+    def _put(self, key: str, endpoint: str, body: str):
+        # write then rename so concurrent readers never see a partial file
+        temp_path = f"{self._path(key)}.{os.getpid()}.{random.randrange(1 << 30)}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(body)
+        os.replace(temp_path, self._path(key))
+
+    def _evict(self) -> int:
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort(reverse=True) # most recently used first
+
+        removed, total, now = 0, 0, time.time()
+        for mtime, size, name in entries:
+            total += size
+            if now - mtime > self.ttl or total > self.max_bytes:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def build_cache(backend: str = BACKEND) -> Optional[ResponseCache]:
+    if backend == "postgres":
+        from utils.database import Database, DatabaseConfig
+        return PostgresResponseCache(Database(DatabaseConfig()))
+    if backend == "disk":
+        return DiskResponseCache()
+    return None
+
+
+response_cache = build_cache()
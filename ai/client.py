@@ -0,0 +1,472 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from .cache import CACHED_ENDPOINTS, response_cache
+from .prompts import Prompt
+from .resilience import MalformedResponseError, ResiliencePolicy, policy
+from .streaming import non_streamed_tool_input, sse_events, tool_input_delta
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Rolling latency figures for one endpoint"""
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p95_ms": round(self.percentile(95) * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+
+class _LatencyMetrics:
+    """Per-endpoint latency bookkeeping shared by the sync and async clients"""
+    def __init__(self, resilience: ResiliencePolicy):
+        self._metrics: Dict[str, LatencyStats] = {}
+        self._lock = threading.Lock()
+        self.resilience = resilience
+
+    def _headers(self, bearer: bool) -> Dict[str, str]:
+        api_key = os.environ.get('DEVXP_API_KEY', '')
+        return {
+            'Content-Type': 'application/json',
+            'Authorization': f"Bearer {api_key}" if bearer else api_key
+        }
+
+    @staticmethod
+    def _body(payload: dict | str, stream: bool = False) -> bytes | str:
+        """The request body for a payload: a Prompt's pre-serialised body, or the payload encoded now"""
+        if isinstance(payload, Prompt):
+            return payload.body(stream=stream)
+        if stream:
+            payload = {**(json.loads(payload) if isinstance(payload, str) else payload), "stream": True}
+        return json.dumps(payload) if isinstance(payload, dict) else payload
+
+    @staticmethod
+    def _use_cache(endpoint: str, cache: Optional[bool]) -> bool:
+        """Cache the endpoints in AI_CACHE_ENDPOINTS unless the caller passes cache=False"""
+        if response_cache is None:
+            return False
+        return endpoint in CACHED_ENDPOINTS if cache is None else cache
+
+    @staticmethod
+    def _checker(payload: dict | str, check: Optional[Callable[[dict], Optional[str]]]):
+        """The tool schema check of a Prompt combined with the caller's own check"""
+        tool_check = payload.tool.check if isinstance(payload, Prompt) else None
+        if tool_check is None or check is None:
+            return tool_check or check
+        return lambda tool_input: tool_check(tool_input) or check(tool_input)
+
+    def _latency(self, endpoint: str) -> Optional[LatencyStats]:
+        with self._lock:
+            return self._metrics.get(endpoint)
+
+    def _record(self, endpoint: str, seconds: float, error: bool):
+        with self._lock:
+            stats = self._metrics.get(endpoint)
+            if stats is None:
+                stats = self._metrics[endpoint] = LatencyStats()
+            stats.record(seconds, error)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latency figures per endpoint"""
+        with self._lock:
+            return {endpoint: stats.summary() for endpoint, stats in self._metrics.items()}
+
+
+class AIClient(_LatencyMetrics):
+    """
+    Shared client for the DevXP AI API.
+
+    Keeps a single keep-alive requests.Session so LLM calls reuse TCP/TLS connections,
+    applies connect/read timeouts to every request and records per-endpoint latency.
+    Transient failures are retried, slow requests can be hedged and a circuit breaker
+    fails fast while the API is down, see ai.resilience.
+    `endpoint` is the logical name of the call (e.g. "fetch_message") since all calls
+    go to the same URL.
+    """
+    def __init__(
+        self,
+        base_url: Optional[str] = os.environ.get("AI_API"),
+        pool_size: int = int(os.environ.get("AI_POOL_SIZE", "10")),
+        connect_timeout: float = float(os.environ.get("AI_CONNECT_TIMEOUT", "5")),
+        read_timeout: float = float(os.environ.get("AI_READ_TIMEOUT", "120")),
+        resilience: ResiliencePolicy = policy,
+    ):
+        super().__init__(resilience)
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # hedged requests run here so the caller can wait on whichever answers first
+        self._hedges = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="ai-hedge")
+
+    def _request(self, endpoint: str, body: bytes | str, bearer: bool) -> dict:
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session.post(self.base_url, headers=self._headers(bearer), timeout=self.timeout, data=body)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            result = response.json()
+            error = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed, error)
+            logger.debug(f"AI {endpoint} took {elapsed * 1000:.0f}ms{' (failed)' if error else ''}")
+
+    def _hedged(self, endpoint: str, body: bytes | str, bearer: bool) -> dict:
+        """One request, plus an identical second one if the first is slower than usual; the first answer wins"""
+        delay = self.resilience.hedge_delay(self._latency(endpoint))
+        if delay is None:
+            return self._request(endpoint, body, bearer)
+
+        primary = self._hedges.submit(self._request, endpoint, body, bearer)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        self.resilience.count(endpoint, "hedged")
+        hedge = self._hedges.submit(self._request, endpoint, body, bearer)
+        error = None
+        for future in as_completed((primary, hedge)):
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if future is hedge:
+                self.resilience.count(endpoint, "hedge_won")
+            return result
+        raise error
+
+    def _send(self, endpoint: str, body: bytes | str, bearer: bool) -> dict:
+        attempt = 0
+        while True:
+            self.resilience.before_call(endpoint)
+            try:
+                result = self._hedged(endpoint, body, bearer)
+                self.resilience.succeeded()
+                return result
+            except Exception as e:
+                attempt += 1
+                backoff = self.resilience.retry_backoff(endpoint, e, attempt)
+            time.sleep(backoff)
+
+    def post(self, endpoint: str, payload: dict | str, bearer: bool = False, cache: Optional[bool] = None, check: Optional[Callable[[dict], Any]] = None) -> dict:
+        """
+        POST a payload (dict or pre-serialised JSON string) and return the decoded response.
+        Identical prompts to cacheable endpoints are answered from the response cache;
+        pass cache=False to force a fresh answer. `check` may raise to reject a response
+        before it is cached.
+        """
+        use_cache = self._use_cache(endpoint, cache)
+        if use_cache:
+            cached = response_cache.get(endpoint, payload)
+            if cached is not None:
+                return cached
+
+        result = self._send(endpoint, self._body(payload), bearer)
+        if check:
+            check(result)
+        if use_cache:
+            response_cache.put(endpoint, payload, result)
+        return result
+
+    def tool_input(self, endpoint: str, payload: dict | str, bearer: bool = False, cache: Optional[bool] = None, check: Optional[Callable[[dict], Optional[str]]] = None) -> dict:
+        """
+        POST a tool_choice payload and return the tool input the model produced. Answers
+        with no tool input, or that fail the tool's schema check or `check` (which returns
+        a description of the problem), are asked for again up to AI_SCHEMA_RETRIES times
+        before MalformedResponseError is raised.
+        """
+        check = self._checker(payload, check)
+        extract = lambda response: self.resilience.tool_input(endpoint, response, check)
+        for reask in range(self.resilience.schema_retries + 1):
+            try:
+                return extract(self.post(endpoint, payload, bearer=bearer, cache=False if reask else cache, check=extract))
+            except MalformedResponseError as e:
+                if reask == self.resilience.schema_retries:
+                    self.resilience.count(endpoint, "failed")
+                    raise
+                self.resilience.count(endpoint, "reasked")
+                logger.warning(f"{e}, asking again")
+
+    def stream_tool_input(self, endpoint: str, payload: dict | str, bearer: bool = False) -> Iterator[str]:
+        """
+        POST a tool_choice payload with "stream": true and yield the tool input JSON as it
+        is generated, in fragments. If the API answers with plain JSON instead of server-sent
+        events the whole tool input is yielded at once. Streamed calls are never cached, and
+        are only retried if they fail before the first fragment.
+        """
+        body = self._body(payload, stream=True)
+        attempt = 0
+        while True:
+            self.resilience.before_call(endpoint)
+            started = False
+            try:
+                for fragment in self._stream(endpoint, body, bearer):
+                    started = True
+                    yield fragment
+                self.resilience.succeeded()
+                return
+            except GeneratorExit:
+                self.resilience.succeeded()
+                raise
+            except Exception as e:
+                if started:
+                    self.resilience.failed(endpoint, e)
+                    raise
+                attempt += 1
+                backoff = self.resilience.retry_backoff(endpoint, e, attempt)
+            time.sleep(backoff)
+
+    def _stream(self, endpoint: str, body: bytes | str, bearer: bool) -> Iterator[str]:
+        start = time.perf_counter()
+        first = None
+        error = True
+        try:
+            with self.session.post(self.base_url, headers=self._headers(bearer), timeout=self.timeout, data=body, stream=True) as response:
+                response.raise_for_status()
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    yield non_streamed_tool_input(response.json())
+                else:
+                    for event in sse_events(response.iter_lines(decode_unicode=True)):
+                        fragment = tool_input_delta(event)
+                        if fragment:
+                            if first is None:
+                                first = time.perf_counter() - start
+                            yield fragment
+            error = False
+        except GeneratorExit:
+            error = False # the caller had what it needed
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed, error)
+            first_ms = f", first fragment after {first * 1000:.0f}ms" if first is not None else ""
+            logger.debug(f"AI {endpoint} stream took {elapsed * 1000:.0f}ms{first_ms}{' (failed)' if error else ''}")
+
+
+class AsyncAIClient(_LatencyMetrics):
+    """
+    asyncio counterpart of AIClient, used by the async runtime (SLACK_APP_RUNTIME=async).
+
+    The httpx.AsyncClient is created on first use so it binds to the running event loop;
+    `pool_size` caps the number of concurrent connections to the AI API.
+    """
+    def __init__(
+        self,
+        base_url: Optional[str] = os.environ.get("AI_API"),
+        pool_size: int = int(os.environ.get("AI_POOL_SIZE", "10")),
+        connect_timeout: float = float(os.environ.get("AI_CONNECT_TIMEOUT", "5")),
+        read_timeout: float = float(os.environ.get("AI_READ_TIMEOUT", "120")),
+        resilience: ResiliencePolicy = policy,
+    ):
+        super().__init__(resilience)
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def _request(self, endpoint: str, body: bytes | str, bearer: bool) -> dict:
+        start = time.perf_counter()
+        error = True
+        try:
+            response = await self.client.post(self.base_url, headers=self._headers(bearer), content=body)
+            response.raise_for_status()
+            result = response.json()
+            error = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed, error)
+            logger.debug(f"AI {endpoint} took {elapsed * 1000:.0f}ms{' (failed)' if error else ''}")
+
+    async def _hedged(self, endpoint: str, body: bytes | str, bearer: bool) -> dict:
+        """See AIClient._hedged; the slower request is cancelled"""
+        delay = self.resilience.hedge_delay(self._latency(endpoint))
+        if delay is None:
+            return await self._request(endpoint, body, bearer)
+
+        primary = asyncio.ensure_future(self._request(endpoint, body, bearer))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        self.resilience.count(endpoint, "hedged")
+        hedge = asyncio.ensure_future(self._request(endpoint, body, bearer))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.resilience.count(endpoint, "hedge_won")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _send(self, endpoint: str, body: bytes | str, bearer: bool) -> dict:
+        attempt = 0
+        while True:
+            self.resilience.before_call(endpoint)
+            try:
+                result = await self._hedged(endpoint, body, bearer)
+                self.resilience.succeeded()
+                return result
+            except asyncio.CancelledError:
+                self.resilience.abandoned()
+                raise
+            except Exception as e:
+                attempt += 1
+                backoff = self.resilience.retry_backoff(endpoint, e, attempt)
+            await asyncio.sleep(backoff)
+
+    async def post(self, endpoint: str, payload: dict | str, bearer: bool = False, cache: Optional[bool] = None, check: Optional[Callable[[dict], Any]] = None) -> dict:
+        """POST a payload (dict or pre-serialised JSON string) and return the decoded response, see AIClient.post"""
+        use_cache = self._use_cache(endpoint, cache)
+        if use_cache:
+            cached = await asyncio.to_thread(response_cache.get, endpoint, payload)
+            if cached is not None:
+                return cached
+
+        result = await self._send(endpoint, self._body(payload), bearer)
+        if check:
+            check(result)
+        if use_cache:
+            await asyncio.to_thread(response_cache.put, endpoint, payload, result)
+        return result
+
+    async def tool_input(self, endpoint: str, payload: dict | str, bearer: bool = False, cache: Optional[bool] = None, check: Optional[Callable[[dict], Optional[str]]] = None) -> dict:
+        """POST a tool_choice payload and return the tool input the model produced, see AIClient.tool_input"""
+        check = self._checker(payload, check)
+        extract = lambda response: self.resilience.tool_input(endpoint, response, check)
+        for reask in range(self.resilience.schema_retries + 1):
+            try:
+                return extract(await self.post(endpoint, payload, bearer=bearer, cache=False if reask else cache, check=extract))
+            except MalformedResponseError as e:
+                if reask == self.resilience.schema_retries:
+                    self.resilience.count(endpoint, "failed")
+                    raise
+                self.resilience.count(endpoint, "reasked")
+                logger.warning(f"{e}, asking again")
+
+    async def stream_tool_input(self, endpoint: str, payload: dict | str, bearer: bool = False) -> AsyncIterator[str]:
+        """Yield the tool input JSON as it is generated, see AIClient.stream_tool_input"""
+        body = self._body(payload, stream=True)
+        attempt = 0
+        while True:
+            self.resilience.before_call(endpoint)
+            started = False
+            try:
+                async for fragment in self._stream(endpoint, body, bearer):
+                    started = True
+                    yield fragment
+                self.resilience.succeeded()
+                return
+            except GeneratorExit:
+                self.resilience.succeeded()
+                raise
+            except asyncio.CancelledError:
+                self.resilience.abandoned()
+                raise
+            except Exception as e:
+                if started:
+                    self.resilience.failed(endpoint, e)
+                    raise
+                attempt += 1
+                backoff = self.resilience.retry_backoff(endpoint, e, attempt)
+            await asyncio.sleep(backoff)
+
+    async def _stream(self, endpoint: str, body: bytes | str, bearer: bool) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        first = None
+        error = True
+        try:
+            async with self.client.stream("POST", self.base_url, headers=self._headers(bearer), content=body) as response:
+                response.raise_for_status()
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    await response.aread()
+                    yield non_streamed_tool_input(response.json())
+                else:
+                    lines = []
+                    async for line in response.aiter_lines():
+                        lines.append(line)
+                        if line:
+                            continue
+                        # a blank line ends an event
+                        for event in sse_events(lines):
+                            fragment = tool_input_delta(event)
+                            if fragment:
+                                if first is None:
+                                    first = time.perf_counter() - start
+                                yield fragment
+                        lines = []
+                    for event in sse_events(lines):
+                        fragment = tool_input_delta(event)
+                        if fragment:
+                            yield fragment
+            error = False
+        except GeneratorExit:
+            error = False # the caller had what it needed
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed, error)
+            first_ms = f", first fragment after {first * 1000:.0f}ms" if first is not None else ""
+            logger.debug(f"AI {endpoint} stream took {elapsed * 1000:.0f}ms{first_ms}{' (failed)' if error else ''}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+ai_client = AIClient()
+async_ai_client = AsyncAIClient()
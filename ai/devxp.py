@@ -1,28 +1,15 @@
 import os
-import requests
-import json
 import random
 import logging
+from typing import Iterator, Optional, Tuple
+from . import prompts, streaming
+from .client import ai_client
 
 logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
 logger = logging.getLogger(__name__)
 
-API_BASE_URL = os.environ.get("AI_API")
-
-def fetch_message(author: str, conversation_participants: list, purpose: str, channel_topic: str, topic: str, length: str, tone: str, emoji_density: str = "average", custom_prompt: str = ""):
-    logger.info("DEVXP.FETCH_MESSAGE")
-    logger.info(f"author: {author}")
-    logger.info(f"conversation_participants: {conversation_participants}")
-    logger.info(f"purpose: {purpose}")
-    logger.info(f"channel_topic: {channel_topic}")
-    logger.info(f"topic: {topic}")
-    logger.info(f"length: {length}")
-    logger.info(f"tone: {tone}")
-    logger.info(f"emoji_density: {emoji_density}")
-    logger.info(f"custom_prompt: {custom_prompt}")
-
-
-    url = API_BASE_URL
+def fetch_message_payload(author: str, conversation_participants: list, purpose: str, channel_topic: str, topic: str, length: str, tone: str, emoji_density: str = "average", custom_prompt: str = ""):
+    logger.info(f"DEVXP.FETCH_MESSAGE: {author}, {topic}")
 
     # author = user id in full format
 
@@ -40,16 +27,8 @@ def fetch_message(author: str, conversation_participants: list, purpose: str, ch
     if topic:
         content += f"The topic of this post is: {topic}. "
 
-    length_opts = {
-        "short": random.randrange(1, 2),
-        "medium": random.randrange(1, 5),
-        "long": random.randrange(1, 10)
-    }
-    if isinstance(length, str) and not length_opts[length]:
-        length = "medium"
-
     content += (
-        f"The length of the post should be {length_opts[length]} sentences, and can optionally use simple markdown (*bold*, _italic_, `inline code`, ```code block```) if appropriate. "
+        f"The length of the post should be {_sentence_count(length)} sentences, and can optionally use simple markdown (*bold*, _italic_, `inline code`, ```code block```) if appropriate. "
         "RULES: \n"
         f"- TONE: The tone of the post is {tone}. \n"
         "- VOICE: Ensure this author has a unique voice and the post sounds authentic. \n"
@@ -62,87 +41,181 @@ def fetch_message(author: str, conversation_participants: list, purpose: str, ch
     if custom_prompt:
         content += f"\n\n CUSTOM INSTRUCTIONS: {custom_prompt}."
     
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a conversation builder for Slack that can simulate conversations between humans."
-            },
-            {
-                "role": "user",
-                "content": content
-            }
-        ],
-        "temperature": 1,
-        "source":"converse_demo_app",
-        "max_tokens":2000,
-        "tools":[
-            {
-                "name":"get_message",
-                "description":"Format a Slack post as returned from Claude.",
-                "input_schema":{
-                "type":"object",
-                "properties":{
-                    "channel_post":{
-                        "type":"array",
-                        "items":{
-                            "type":"object",
-                            "properties":{
-                            "author":{
-                                "type":"string",
-                                "description":"The name of the author posting the message. This is alphanumeric only."
-                            },
-                            "message":{
-                                "type":"string",
-                                "description":f"The content of the Slack message posted by the author. Bold text is enclosed in single *, Underlined text is inclosed in _, Code is inclosed in `, blocks of code or highly technical details are inclosed in ```, and text to strike through is enclosed in ~. There should be {length_opts[length]} sentences."
-                            },
-                            "reacjis":{
-                                "type":"array",
-                                "items":{
-                                    "type":"string"
-                                },
-                                "description":"A list of emojis used in response to this Slack message. Emojis must be named only."
-                            }
-                            },
-                            "required":[
-                            "author",
-                            "message"
-                            ]
-                        },
-                        "description":"A structured Slack message."
-                    }
-                },
-                "required":[
-                    "channel_post"
-                ]
-                }
-            }
-        ],
-        "tool_choice":{
-            "type":"tool",
-            "name":"get_message"
-        }
-    }
-
-
-    logger.debug(f"FETCH_MESSAGE prompt: {payload}")
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': os.environ.get('DEVXP_API_KEY', '')
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()  # Raise an exception for bad status codes
-
-    # TODO: handle errors better here and make sure the structure has the 'conversations' object
-    
-    return response.json()["content"][0]["content"][0]["input"]["channel_post"][0]
+    payload = prompts.Prompt(prompts.GET_MESSAGE, prompts.CONVERSATION_BUILDER, content, max_tokens=2000, temperature=1)
 
+    logger.debug(f"FETCH_MESSAGE prompt: {content}")
+    return payload
 
-def fetch_conversation(conversation_params):
-    url = API_BASE_URL
+def fetch_message(*args, **kwargs):
+    """Generate a single channel post; arguments as for fetch_message_payload"""
+    return ai_client.tool_input("fetch_message", fetch_message_payload(*args, **kwargs))["channel_post"][0]
+
+
+def fetch_messages_payload(posts: list, conversation_participants: list, purpose: str, channel_topic: str, length: str, tone: str, emoji_density: str = "average", custom_prompt: str = ""):
+    """
+    Prompt for several channel posts in one call. `posts` is a list of {"author", "topic"}
+    (author as a user id); the model returns one channel_post item per entry, tagged with
+    its 1-based index.
+    """
+    logger.info(f"DEVXP.FETCH_MESSAGES: {len(posts)} posts")
+
+    post_lines = "\n".join(
+        f"{index}. Author: <@{post['author']}>. Topic: {post['topic'] or channel_topic}. Length: {_sentence_count(length)} sentences."
+        for index, post in enumerate(posts, start=1)
+    )
+    content = (
+        "I am a Solution Engineer at Slack, creating a demo to showcase Slack's features using realistic conversations. "
+        f"Generate {len(posts)} separate Slack posts, exactly one for each entry in the list below, in the same order. "
+        f"Posts may optionally mention any of the following users: {_build_mention_string(conversation_participants)}. "
+    )
+
+    if purpose:
+        content += f"The purpose of this channel is: {purpose}."
+
+    if channel_topic:
+        content += f"The current channel topic is: '{channel_topic}'. "
+
+    content += (
+        f"\nPOSTS:\n{post_lines}\n"
+        "Posts can optionally use simple markdown (*bold*, _italic_, `inline code`, ```code block```) if appropriate. "
+        "RULES: \n"
+        f"- TONE: The tone of the posts is {tone}. \n"
+        "- VOICE: Ensure each author has a unique voice and every post sounds authentic and distinct from the others. \n"
+        f"- EMOJI: Standard Slack emoji only. Use a {emoji_density} number of emojis in the message content. \n"
+        "- REACJI: Limit reactions (0-4 reacjis per message).\n"
+        "MENTIONS: User Mentions: Mention only the specified users, with no additional names. \n"
+        "FORMAT: Do not format topics or keywords with ** marks.\n"
+    )
+
+    if custom_prompt:
+        content += f"\n\n CUSTOM INSTRUCTIONS: {custom_prompt}."
+
+    payload = prompts.Prompt(prompts.GET_MESSAGES, prompts.CONVERSATION_BUILDER, content, max_tokens=min(8000, 600 * len(posts)), temperature=1)
+
+    logger.debug(f"FETCH_MESSAGES prompt: {content}")
+    return payload
+
+def fetch_messages(posts: list, *args, **kwargs) -> list:
+    """
+    Generate several channel posts in one call; arguments as for fetch_messages_payload.
+    Returns one entry per requested post, None where the model's item was missing or
+    invalid so the caller can fall back to fetch_message for just those.
+    """
+    items = ai_client.tool_input("fetch_messages", fetch_messages_payload(posts, *args, **kwargs)).get("channel_post", [])
+    return _match_posts(posts, items)
+
+def stream_messages(posts: list, *args, **kwargs) -> Iterator[Tuple[int, dict]]:
+    """
+    As fetch_messages, but yields (position, post) for each valid post as soon as the
+    model has finished writing it, while the rest of the batch is still being generated.
+    Positions of posts that never arrive are simply not yielded.
+    """
+    payload = fetch_messages_payload(posts, *args, **kwargs)
+    if not streaming.STREAMING:
+        for position, post in enumerate(_match_posts(posts, ai_client.tool_input("fetch_messages", payload).get("channel_post", []))):
+            if post is not None:
+                yield position, post
+        return
+
+    parser = streaming.ArrayItemParser("channel_post")
+    results = [None] * len(posts)
+    position = 0
+    for fragment in ai_client.stream_tool_input("fetch_messages", payload):
+        for item in parser.feed(fragment):
+            slot = _match_post(posts, results, position, item)
+            position += 1
+            if slot is not None:
+                yield slot, results[slot]
+    missing = results.count(None)
+    if missing:
+        logger.info(f"{missing} of {len(posts)} streamed posts missing or invalid")
+
+def _match_posts(posts: list, items: list) -> list:
+    results = [None] * len(posts)
+    for position, item in enumerate(items if isinstance(items, list) else []):
+        _match_post(posts, results, position, item)
+    missing = results.count(None)
+    if missing:
+        logger.info(f"{missing} of {len(posts)} batched posts missing or invalid")
+    return results
+
+def _match_post(posts: list, results: list, position: int, item) -> Optional[int]:
+    """Validate the model's `position`th item and store it in its slot in `results`; returns the slot"""
+    if not isinstance(item, dict) or not isinstance(item.get("message"), str) or not item["message"].strip():
+        return None
+    index = item.get("index")
+    slot = index - 1 if isinstance(index, int) and 1 <= index <= len(posts) else position
+    if slot >= len(posts) or results[slot] is not None:
+        return None
+    author = ''.join(c for c in str(item.get("author", "")) if c.isalnum())
+    if author != posts[slot]["author"]:
+        logger.warning(f"Batched post {slot + 1} was written for {author} instead of {posts[slot]['author']}, discarding")
+        return None
+    item["author"] = author
+    results[slot] = item
+    return slot
+
+def fetch_post_with_replies_payload(author: str, conversation_participants: list, purpose: str, channel_topic: str, topic: str, length: str, tone: str, emoji_density: str = "average", custom_prompt: str = "", replies: int = 0):
+    """Prompt for one channel post together with its thread replies; `author` is a user id"""
+    logger.info(f"DEVXP.FETCH_POST_WITH_REPLIES: {author}, {replies} replies")
 
+    content = (
+        "I am a Solution Engineer at Slack, creating a demo to showcase Slack's features using realistic conversations. "
+        f"Generate a Slack post from the user: <@{author}>, followed by exactly {replies} threaded replies to it. "
+        f"The post and replies may optionally mention any of the following users: {_build_mention_string(conversation_participants)}. "
+        "Replies are written by users from that list (not only the author) and should read as a natural discussion of the post. "
+    )
+
+    if purpose:
+        content += f"The purpose of this channel is: {purpose}."
+
+    if channel_topic:
+        content += f"The current channel topic is: '{channel_topic}'. "
+
+    if topic:
+        content += f"The topic of this post is: {topic}. "
+
+    content += (
+        f"The length of the post should be {_sentence_count(length)} sentences, each reply between 1 and 5 sentences, and they can optionally use simple markdown (*bold*, _italic_, `inline code`, ```code block```) if appropriate. "
+        "RULES: \n"
+        f"- TONE: The tone of the conversation is {tone}. \n"
+        "- VOICE: Ensure each author has a unique voice and every message sounds authentic. \n"
+        f"- EMOJI: Standard Slack emoji only. Use a {emoji_density} number of emojis in the message content. \n"
+        "- REACJI: Limit reactions (0-4 reacjis per message).\n"
+        "MENTIONS: User Mentions: Mention only the specified users, with no additional names. \n"
+        "FORMAT: Do not format topics or keywords with ** marks.\n"
+    )
+
+    if custom_prompt:
+        content += f"\n\n CUSTOM INSTRUCTIONS: {custom_prompt}."
+
+    payload = prompts.Prompt(prompts.GET_POST_WITH_REPLIES, prompts.CONVERSATION_BUILDER, content, max_tokens=2000 + 300 * replies, temperature=1)
+
+    logger.debug(f"FETCH_POST_WITH_REPLIES prompt: {content}")
+    return payload
+
+def fetch_post_with_replies(*args, **kwargs):
+    """
+    Generate a post and its replies in one call; arguments as for fetch_post_with_replies_payload.
+    Returns {"post", "replies"}, or None if the post itself is unusable.
+    """
+    return _check_post_with_replies(ai_client.tool_input("fetch_post_with_replies", fetch_post_with_replies_payload(*args, **kwargs)))
+
+def _check_post_with_replies(result: dict):
+    def valid(message):
+        return isinstance(message, dict) and isinstance(message.get("message"), str) and message["message"].strip() and message.get("author")
+
+    post = result.get("post") if isinstance(result, dict) else None
+    if not valid(post):
+        return None
+    replies = []
+    for reply in result.get("replies") or []:
+        if valid(reply):
+            reply["author"] = ''.join(c for c in str(reply["author"]) if c.isalnum())
+            replies.append(reply)
+    return {"post": post, "replies": replies}
+
+def fetch_conversation_payload(conversation_params):
     content = (
         "I am a Solution Engineer at Slack, creating a demo to showcase Slack's features "
         f"using realistic conversations. Generate a Slack conversations among the following users: {_build_mention_string(conversation_params['conversation_participants'])}.\n\n"
@@ -190,107 +263,16 @@ def fetch_conversation(conversation_params):
     # logger.debug(f"\n\n{conversation_params}\n\n")
     # logger.debug(f"\n\n{content}\n\n")
 
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a conversation builder for Slack that can simulate conversations between humans."
-            },
-            {
-                "role": "user",
-                "content": content
-            }
-        ],
-        "source": "converse_demo_app",
-        "max_tokens": 2000,
-        "tools": [{
-            "name": "get_conversation",
-            "description": "Format a Slack conversation as returned from Claude.",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "conversations": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "author": {
-                                    "type": "string",
-                                    "description": "The name of the author posting the message. This is alphanumeric only."
-                                },
-                                "message": {
-                                    "type": "string",
-                                    "description": "The content of the message posted by the author. "
-                                                 "Bold text is enclosed in single *, Underlined text is inclosed in _, "
-                                                 "Code is inclosed in `, and text to strike through is enclosed in ~. "
-                                                #  "There should be approximately 5 sentences."
-                                },
-                                "reacjis": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "A list of emojis used in response to this Slack message."
-                                },
-                                "replies": {
-                                    "type": "array",
-                                    "items": {
-                                        "type": "object",
-                                        "properties": {
-                                            "author": {
-                                                "type": "string",
-                                                "description": "The name of the author posting the reply message."
-                                            },
-                                            "message": {
-                                                "type": "string",
-                                                "description": "The reply message"
-                                            },
-                                            "reacjis": {
-                                                "type": "array",
-                                                "items": {"type": "string"},
-                                                "description": "An optional list of emojis used in response to this Slack message."
-                                            }
-                                        },
-                                        "required": ["author", "message"]
-                                    },
-                                    "description": f"A structured set of {random.randrange(start=_parse_range(conversation_params['thread_replies'])['min'], stop=_parse_range(conversation_params['thread_replies'])['max'])} message sent in reply to the previous message. "
-                                }
-                            },
-                            "required": ["author", "message"]
-                        },
-                        "description": "A structured Slack conversation message."
-                    }
-                },
-                "required": ["conversations"]
-            }
-        }],
-        "tool_choice": {
-            "type": "tool",
-            "name": "get_conversation"
-        }
-    }
-
-    logger.debug(f"FETCH_CONVERSATION prompt: {payload}")
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': os.environ.get('DEVXP_API_KEY', '')
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()  # Raise an exception for bad status codes
-
-    # TODO: handle errors better here and make sure the structure has the 'conversations' object
-    
-    return response.json()["content"][0]["content"][0]["input"]["conversations"]
+    payload = prompts.Prompt(prompts.GET_CONVERSATION, prompts.CONVERSATION_BUILDER, content, max_tokens=2000)
+
+    logger.debug(f"FETCH_CONVERSATION prompt: {content}")
+    return payload
 
-def thread(description: str, topic: str, thread: dict, members: list, replies: int = 0):
-    logger.info("DEVXP.THREAD")
-    logger.info(f"description: {description}")
-    logger.info(f"topic: {topic}")
-    logger.info(f"thread: {thread}")
-    logger.info(f"members: {members}")
-    logger.info(f"replies: {replies}")
+def fetch_conversation(conversation_params):
+    return ai_client.tool_input("fetch_conversation", fetch_conversation_payload(conversation_params))["conversations"]
 
-    url = API_BASE_URL
+def thread_payload(description: str, topic: str, thread: dict, members: list, replies: int = 0):
+    logger.info(f"DEVXP.THREAD: {len(thread)} messages, {len(members)} members, {replies} replies")
 
     if not replies:
         replies = "reasonable number of"
@@ -314,72 +296,14 @@ def thread(description: str, topic: str, thread: dict, members: list, replies: i
         "\"\"\""
     )
 
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a conversation builder for Slack that can simulate conversations between humans."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 1,
-        "source": "converse_demo_app",
-        "max_tokens": 2000,
-        "tools": [{
-            "name": "extend_thread",
-            "description": "Extend an existing Slack thread.",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "replies": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "author": {
-                                    "type": "string",
-                                    "description": "The name of the author posting the reply message. This is alphanumeric only."
-                                },
-                                 "message": {
-                                    "type": "string",
-                                    "description": "The reply Slack message. Bold text is enclosed in single *, Underlined text is inclosed in _, Code is inclosed in `, blocks of code or highly technical details are inclosed in ```, and text to strike through is enclosed in ~."
-                                },
-                                "reacjis": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "An optional list of emojis used in response to this Slack message. Emojis must be named only."
-                                }
-                            },
-                            "required": ["author", "message"]
-                        },
-                        "description": "A structured message message send in reply to the previous message. Use a random number between 0 and 10 as the number of replies to generate."
-                    }
-                },
-                "required": ["replies"]
-            }
-        }],
-        "tool_choice": {
-            "type": "tool",
-            "name": "extend_thread"
-        }
-    }
-
-    logger.info(payload)
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': os.environ.get('DEVXP_API_KEY', '')
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()  # Raise an exception for bad status codes
-
-    # TODO: handle errors better here and make sure the structure has the 'conversations' object
-    
-    replies = response.json()["content"][0]["content"][0]["input"]["replies"]
+    payload = prompts.Prompt(prompts.EXTEND_THREAD, prompts.CONVERSATION_BUILDER, prompt, max_tokens=2000, temperature=1)
+
+    logger.debug(f"THREAD prompt: {prompt}")
+    return payload
+
+def thread(*args, **kwargs):
+    """Generate replies that extend a thread; arguments as for thread_payload"""
+    replies = ai_client.tool_input("thread", thread_payload(*args, **kwargs))["replies"]
 
     logger.info(replies)
 
@@ -387,84 +311,25 @@ def thread(description: str, topic: str, thread: dict, members: list, replies: i
 
 
 
+def fetch_channels_payload(customer_name: str, use_case: str):
+    content = (
+        f"I need to design a series of Slack channels aimed to solve for "
+        f"the following use case(s) for the company called {customer_name}: "
+        f"{use_case}. Provided suggested channel names and descriptions. "
+        "Use a consistent naming pattern and prefix."
+    )
+    return prompts.Prompt(prompts.CREATE_CHANNELS, prompts.EXPERIENCE_ARCHITECT, content, max_tokens=2048, source="postman")
+
 def fetch_channels(customer_name: str, use_case: str):
-    url = API_BASE_URL
-
-    payload = json.dumps({
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a Slack experience architect."
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"I need to design a series of Slack channels aimed to solve for "
-                    f"the following use case(s) for the company called {customer_name}: "
-                    f"{use_case}. Provided suggested channel names and descriptions. "
-                    "Use a consistent naming pattern and prefix."
-                )
-            }
-        ],
-        "source": "postman",
-        "max_tokens": 2048,
-        "tools": [{
-            "name": "create_channels",
-            "description": "Creates a set of Slack channels for a specific use case.",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "channels": {
-                        "type": "array",
-                        "description": "The parameters to define a new channel in Slack",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": {
-                                    "type": "string",
-                                    "description": "The name of the channel in the format supported by Slack channel names"
-                                },
-                                "description": {
-                                    "type": "string",
-                                    "description": "A human-friendly description of the channel"
-                                },
-                                "topic": {
-                                    "type": "string",
-                                    "description": "What the topic of the channel is currently about. Slack markdown format supported."
-                                },
-                                "is_private": {
-                                    "type": "integer",
-                                    "description": "Indicates if the channel should be private or public. Use 1 for private or 0 for public."
-                                }
-                            },
-                            "required": ["name", "description", "is_private"]
-                        }
-                    }
-                },
-                "required": ["channels"]
-            }
-        }],
-        "tool_choice": {
-            "type": "tool",
-            "name": "create_channels"
-        }
-    })
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + os.environ["DEVXP_API_KEY"]
-    }
-
-    response = requests.request("POST", url, headers=headers, data=payload)
-
-    logger.info(response.json())
-
-    channels_list = response.json()["content"][0]["content"][0]["input"]["channels"]
+    channels_list = ai_client.tool_input("fetch_channels", fetch_channels_payload(customer_name, use_case), bearer=True)["channels"]
+
+    logger.info(channels_list)
 
     return channels_list
 
 
 
-def fetch_canvas(channel_name: str = "", channel_purpose: str = "", channel_topic: str = "", member_list: list = [None]):
+def fetch_canvas_payload(channel_name: str = "", channel_purpose: str = "", channel_topic: str = "", member_list: list = [None]):
 
 
     if isinstance(member_list, list):
@@ -478,80 +343,32 @@ def fetch_canvas(channel_name: str = "", channel_purpose: str = "", channel_topi
     member_string = ", ".join(formatted_members)
     logger.debug(f"Member string: {member_string}")
     
-    url = API_BASE_URL
-
-    payload = json.dumps({
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a Slack Connect experience architect."
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Create a canvas for the {channel_name} channel.\n"
-                    f"The channel description is: {channel_purpose}\n"
-                    f"The current topic is: {channel_topic}\n"
-                    f"The following users are members of this channel: {member_string} - use exacly this formate to mention them in the canvas content. "
-                    "and may be used in the canvas content as key contacts. "
-                    "RULE: do not nest bullet points. "
-                    "RULE: use rich markdown format. "
-                    "RULE: make sure the title of the canvas is the first line in the body. "
-                    "RULE: for bullet points use an *"
-                )
-            }
-        ],
-        "source": "postman",
-        "max_tokens": 4096,
-        "tools": [{
-            "name": "create_canvas",
-            "description": "Creates Slack canvas content and attaches to a Slack channel.",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "canvas": {
-                        "type": "object",
-                        "properties": {
-                            "title": {
-                                "type": "string",
-                                "description": "The heading for the canvas. Keep it relatively short."
-                            },
-                            "body": {
-                                "type": "string",
-                                "description": "Rich content using Slack simple markdown format and emoji."
-                            }
-                        },
-                        "required": ["title", "body"]
-                    }
-                },
-                "description": "A canvas using rich Slack markdown format.",
-                "required": ["canvas"]
-            }
-        }],
-        "tool_choice": {
-            "type": "tool",
-            "name": "create_canvas"
-        }
-    })
-    
-    logger.info("BUILD CANVAS PAYLOAD")
-    logger.info(payload)
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + os.environ["DEVXP_API_KEY"]
-        }
+    content = (
+        f"Create a canvas for the {channel_name} channel.\n"
+        f"The channel description is: {channel_purpose}\n"
+        f"The current topic is: {channel_topic}\n"
+        f"The following users are members of this channel: {member_string} - use exacly this formate to mention them in the canvas content. "
+        "and may be used in the canvas content as key contacts. "
+        "RULE: do not nest bullet points. "
+        "RULE: use rich markdown format. "
+        "RULE: make sure the title of the canvas is the first line in the body. "
+        "RULE: for bullet points use an *"
+    )
+    payload = prompts.Prompt(prompts.CREATE_CANVAS, prompts.CONNECT_ARCHITECT, content, max_tokens=4096, source="postman")
 
-    response = requests.request("POST", url, headers=headers, data=payload)
+    logger.info("BUILD CANVAS PAYLOAD")
+    logger.info(content)
+    return payload
 
-    content = response.json()["content"][0]["content"][0]["input"]["canvas"]
+def fetch_canvas(*args, **kwargs):
+    """Generate canvas content for a channel; arguments as for fetch_canvas_payload"""
+    content = ai_client.tool_input("fetch_canvas", fetch_canvas_payload(*args, **kwargs), bearer=True)["canvas"]
 
     return content
 
 
 
-def design_channel(channel_name: str, channel_topic: str, channel_description: str):
-    url = API_BASE_URL
-
+def design_channel_payload(channel_name: str, channel_topic: str, channel_description: str):
     prompt = (
         "Design the parameters needed to simulate a Slack channel for a Slack demonstration. Assume the type of personas in the conversation based on the following details. "
         "\nBased on the details of the channel, determine the variables required to design a simulated conversation. "
@@ -566,87 +383,13 @@ def design_channel(channel_name: str, channel_topic: str, channel_description: s
             f"\nCHANNEL DESCRIPTION: {channel_description}"
         )
 
-    payload = {
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a Slack channel designer."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "source": "converse_demo_app",
-        "max_tokens": 2000,
-        "tools": [{
-            "name": "design_channel",
-            "description": "Design a Slack channel with inputs for conversation simulation.",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "canvas": {
-                        "type": "string",
-                        "description": "Should this channel have a generated Slack canvas document attached to it: yes/no"
-                    },
-                    "topics": {
-                        "type":"array",
-                        "items":{"type": "string"},
-                        "description": "A list of topics to be dicussed in the simulated conversation. Minimum 0, maximum 5 values."
-                    },
-                    "custom_prompt": {
-                        "type": "string",
-                        "description": "A customised intruction to be sent to the LLM for simulating conversation data"
-                    },
-                    "num_participants": {
-                        "type": "string",
-                        "description": "The range of people to include in the conversation. Values are: 2-3, 5-10, 11-20"
-                    },
-                    "num_posts": {
-                        "type": "string",
-                        "description": "The range of channel posts to include in the conversation. Values are: 1-10, 1-20, 1-30, 1-50"
-                    },
-                    "post_length": {
-                        "type": "string",
-                        "description": "The range of the length of each channel post. Values are: short, medium, long"
-                    },
-                    "tone": {
-                        "type": "string",
-                        "description": "The tone of the conversation to be used. Values are: formal, casual, professional, technical, executive, legal, social fun"
-                    },
-                    "emoji_density": {
-                        "type": "string",
-                        "description": "The approximate density of emoji to be included in each post of the conversation. Values are: few, average, many"
-                    },
-                    "thread_replies": {
-                        "type": "string",
-                        "description": "The approximate number replies to add to each post in the channel. Values are: 0-2, 0-5, 0-10, 0-15"
-                    },
-                },
-                "required": ["canvas", "num_participants", "num_posts", "post_length", "tone", "emoji_density", "thread_replies"],
-                "optional": ["topics", "custom_prompt"]
-            }
-        }],
-        "tool_choice": {
-            "type": "tool",
-            "name": "design_channel"
-        }
-    }
-
-
-    logger.info(payload)
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': os.environ.get('DEVXP_API_KEY', '')
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()  # Raise an exception for bad status codes
-
-    # TODO: handle errors better here and make sure the structure has the 'conversations' object
-    
-    parameters = response.json()["content"][0]["content"][0]["input"]
+    payload = prompts.Prompt(prompts.DESIGN_CHANNEL, prompts.CHANNEL_DESIGNER, prompt, max_tokens=2000)
+
+    logger.info(prompt)
+    return payload
+
+def design_channel(channel_name: str, channel_topic: str, channel_description: str):
+    parameters = ai_client.tool_input("design_channel", design_channel_payload(channel_name, channel_topic, channel_description))
 
     logger.info(parameters)
 
@@ -656,6 +399,10 @@ def design_channel(channel_name: str, channel_topic: str, channel_description: s
 def _build_mention_string(user_list):
     return ", ".join([f"<@{user_id}>" for user_id in random.sample(user_list, len(user_list))])
 
+def _sentence_count(length: str) -> int:
+    ranges = {"short": (1, 2), "medium": (1, 5), "long": (1, 10)}
+    return random.randrange(*ranges.get(length, ranges["medium"]))
+
 def _parse_range(range: str):
     # ints = range.split('-')
     try:
@@ -0,0 +1,342 @@
+import os
+import json
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# Static parts of the AI API payloads: system messages and tool schemas are defined once
+# here and serialised once at import, ai.devxp only builds the user prompt per call.
+
+CONVERSATION_BUILDER = "You are a conversation builder for Slack that can simulate conversations between humans."
+EXPERIENCE_ARCHITECT = "You are a Slack experience architect."
+CONNECT_ARCHITECT = "You are a Slack Connect experience architect."
+CHANNEL_DESIGNER = "You are a Slack channel designer."
+
+_MESSAGE_FORMAT = "Bold text is enclosed in single *, Underlined text is inclosed in _, Code is inclosed in `, blocks of code or highly technical details are inclosed in ```, and text to strike through is enclosed in ~."
+_REACJIS = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "A list of emojis used in response to this Slack message. Emojis must be named only."
+}
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+_TYPES = {"array": list, "object": dict, "string": str, "integer": int}
+
+
+class Tool:
+    """A tool definition and its tool_choice, with both pre-serialised"""
+    def __init__(self, name: str, description: str, input_schema: dict, non_empty: tuple = ()):
+        self.name = name
+        self.input_schema = input_schema
+        self.non_empty = non_empty
+        self.tools = [{"name": name, "description": description, "input_schema": input_schema}]
+        self.tool_choice = {"type": "tool", "name": name}
+        self.fragment = b',"tools":' + _dumps(self.tools) + b',"tool_choice":' + _dumps(self.tool_choice)
+
+    def check(self, tool_input) -> Optional[str]:
+        """What's wrong with the top level of a tool input the model produced, None if nothing"""
+        if not isinstance(tool_input, dict):
+            return "not an object"
+        for field in self.input_schema.get("required", []):
+            if field not in tool_input:
+                return f"{field} is missing"
+        for field, spec in self.input_schema.get("properties", {}).items():
+            expected = _TYPES.get(spec.get("type"))
+            if field in tool_input and expected and not isinstance(tool_input[field], expected):
+                return f"{field} is not of type {spec['type']}"
+        for field in self.non_empty:
+            if not tool_input.get(field):
+                return f"{field} is empty"
+        return None
+
+
+@lru_cache(maxsize=16)
+def _system_message(system: str) -> bytes:
+    return _dumps({"role": "system", "content": system})
+
+
+class Prompt(dict):
+    """
+    A request payload for the AI API. It is the payload dict (for logging and the response
+    cache key) but body() only encodes the user prompt and splices it between the
+    pre-serialised system message and tool schema. The tool definition is shared by every
+    Prompt for that tool, so don't mutate it.
+    """
+    def __init__(self, tool: Tool, system: str, content: str, max_tokens: int, temperature: Optional[float] = None, source: str = "converse_demo_app"):
+        fields = {"messages": [{"role": "system", "content": system}, {"role": "user", "content": content}]}
+        if temperature is not None:
+            fields["temperature"] = temperature
+        fields["source"] = source
+        fields["max_tokens"] = max_tokens
+        fields["tools"] = tool.tools
+        fields["tool_choice"] = tool.tool_choice
+        super().__init__(fields)
+        self.tool = tool
+        self._head = b"".join((
+            b'{"messages":[', _system_message(system), b',{"role":"user","content":', _dumps(content), b'}]',
+            b',"temperature":' + _dumps(temperature) if temperature is not None else b"",
+            b',"source":', _dumps(source),
+            b',"max_tokens":', str(int(max_tokens)).encode("ascii"),
+            tool.fragment
+        ))
+
+    def body(self, stream: bool = False) -> bytes:
+        """The JSON request body, optionally asking for a streamed (server-sent events) answer"""
+        return self._head + (b',"stream":true}' if stream else b"}")
+
+
+def _message_item(author_description: str, required: list, **extra) -> dict:
+    return {
+        "type": "object",
+        "properties": {
+            **extra,
+            "author": {"type": "string", "description": author_description},
+            "message": {"type": "string", "description": f"The content of the Slack message posted by the author. {_MESSAGE_FORMAT} Use the number of sentences given in the prompt."},
+            "reacjis": _REACJIS
+        },
+        "required": required
+    }
+
+
+GET_MESSAGE = Tool("get_message", "Format a Slack post as returned from Claude.", {
+    "type": "object",
+    "properties": {
+        "channel_post": {
+            "type": "array",
+            "items": _message_item("The name of the author posting the message. This is alphanumeric only.", ["author", "message"]),
+            "description": "A structured Slack message."
+        }
+    },
+    "required": ["channel_post"]
+}, non_empty=("channel_post",))
+
+GET_MESSAGES = Tool("get_messages", "Format a list of Slack posts as returned from Claude.", {
+    "type": "object",
+    "properties": {
+        "channel_post": {
+            "type": "array",
+            "items": _message_item(
+                "The user id of the author of this post, as given in the POSTS list. This is alphanumeric only.",
+                ["index", "author", "message"],
+                index={"type": "integer", "description": "The number of the entry in the POSTS list this post was written for."}
+            ),
+            "description": "One structured Slack message per entry in the POSTS list."
+        }
+    },
+    "required": ["channel_post"]
+})
+
+_THREAD_MESSAGE = {
+    "type": "object",
+    "properties": {
+        "author": {"type": "string", "description": "The user id of the author of the message. This is alphanumeric only."},
+        "message": {"type": "string", "description": f"The content of the Slack message. {_MESSAGE_FORMAT}"},
+        "reacjis": _REACJIS
+    },
+    "required": ["author", "message"]
+}
+
+GET_POST_WITH_REPLIES = Tool("get_post_with_replies", "Format a Slack post and its threaded replies as returned from Claude.", {
+    "type": "object",
+    "properties": {
+        "post": {**_THREAD_MESSAGE, "description": "The channel post."},
+        "replies": {
+            "type": "array",
+            "items": _THREAD_MESSAGE,
+            "description": "The threaded replies to the post, in the order they are posted."
+        }
+    },
+    "required": ["post", "replies"]
+})
+
+GET_CONVERSATION = Tool("get_conversation", "Format a Slack conversation as returned from Claude.", {
+    "type": "object",
+    "properties": {
+        "conversations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "author": {
+                        "type": "string",
+                        "description": "The name of the author posting the message. This is alphanumeric only."
+                    },
+                    "message": {
+                        "type": "string",
+                        "description": "The content of the message posted by the author. "
+                                       "Bold text is enclosed in single *, Underlined text is inclosed in _, "
+                                       "Code is inclosed in `, and text to strike through is enclosed in ~. "
+                    },
+                    "reacjis": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "A list of emojis used in response to this Slack message."
+                    },
+                    "replies": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "author": {
+                                    "type": "string",
+                                    "description": "The name of the author posting the reply message."
+                                },
+                                "message": {
+                                    "type": "string",
+                                    "description": "The reply message"
+                                },
+                                "reacjis": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                    "description": "An optional list of emojis used in response to this Slack message."
+                                }
+                            },
+                            "required": ["author", "message"]
+                        },
+                        "description": "A structured set of messages sent in reply to the previous message, as many as the Structure in the prompt asks for."
+                    }
+                },
+                "required": ["author", "message"]
+            },
+            "description": "A structured Slack conversation message."
+        }
+    },
+    "required": ["conversations"]
+})
+
+EXTEND_THREAD = Tool("extend_thread", "Extend an existing Slack thread.", {
+    "type": "object",
+    "properties": {
+        "replies": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "author": {
+                        "type": "string",
+                        "description": "The name of the author posting the reply message. This is alphanumeric only."
+                    },
+                    "message": {
+                        "type": "string",
+                        "description": f"The reply Slack message. {_MESSAGE_FORMAT}"
+                    },
+                    "reacjis": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "An optional list of emojis used in response to this Slack message. Emojis must be named only."
+                    }
+                },
+                "required": ["author", "message"]
+            },
+            "description": "A structured message message send in reply to the previous message. Use a random number between 0 and 10 as the number of replies to generate."
+        }
+    },
+    "required": ["replies"]
+})
+
+CREATE_CHANNELS = Tool("create_channels", "Creates a set of Slack channels for a specific use case.", {
+    "type": "object",
+    "properties": {
+        "channels": {
+            "type": "array",
+            "description": "The parameters to define a new channel in Slack",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "The name of the channel in the format supported by Slack channel names"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "A human-friendly description of the channel"
+                    },
+                    "topic": {
+                        "type": "string",
+                        "description": "What the topic of the channel is currently about. Slack markdown format supported."
+                    },
+                    "is_private": {
+                        "type": "integer",
+                        "description": "Indicates if the channel should be private or public. Use 1 for private or 0 for public."
+                    }
+                },
+                "required": ["name", "description", "is_private"]
+            }
+        }
+    },
+    "required": ["channels"]
+})
+
+CREATE_CANVAS = Tool("create_canvas", "Creates Slack canvas content and attaches to a Slack channel.", {
+    "type": "object",
+    "properties": {
+        "canvas": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "The heading for the canvas. Keep it relatively short."
+                },
+                "body": {
+                    "type": "string",
+                    "description": "Rich content using Slack simple markdown format and emoji."
+                }
+            },
+            "required": ["title", "body"]
+        }
+    },
+    "description": "A canvas using rich Slack markdown format.",
+    "required": ["canvas"]
+})
+
+DESIGN_CHANNEL = Tool("design_channel", "Design a Slack channel with inputs for conversation simulation.", {
+    "type": "object",
+    "properties": {
+        "canvas": {
+            "type": "string",
+            "description": "Should this channel have a generated Slack canvas document attached to it: yes/no"
+        },
+        "topics": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "A list of topics to be dicussed in the simulated conversation. Minimum 0, maximum 5 values."
+        },
+        "custom_prompt": {
+            "type": "string",
+            "description": "A customised intruction to be sent to the LLM for simulating conversation data"
+        },
+        "num_participants": {
+            "type": "string",
+            "description": "The range of people to include in the conversation. Values are: 2-3, 5-10, 11-20"
+        },
+        "num_posts": {
+            "type": "string",
+            "description": "The range of channel posts to include in the conversation. Values are: 1-10, 1-20, 1-30, 1-50"
+        },
+        "post_length": {
+            "type": "string",
+            "description": "The range of the length of each channel post. Values are: short, medium, long"
+        },
+        "tone": {
+            "type": "string",
+            "description": "The tone of the conversation to be used. Values are: formal, casual, professional, technical, executive, legal, social fun"
+        },
+        "emoji_density": {
+            "type": "string",
+            "description": "The approximate density of emoji to be included in each post of the conversation. Values are: few, average, many"
+        },
+        "thread_replies": {
+            "type": "string",
+            "description": "The approximate number replies to add to each post in the channel. Values are: 0-2, 0-5, 0-10, 0-15"
+        },
+    },
+    "required": ["canvas", "num_participants", "num_posts", "post_length", "tone", "emoji_density", "thread_replies"],
+    "optional": ["topics", "custom_prompt"]
+})
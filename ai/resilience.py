@@ -0,0 +1,184 @@
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+import httpx
+import requests
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.environ.get("AI_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.environ.get("AI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("AI_BACKOFF_MAX", "8"))
+# send a second, identical request when the first is slower than this latency percentile
+# of the endpoint (0 turns hedging off); only once there are enough samples to trust it
+HEDGE_PERCENTILE = float(os.environ.get("AI_HEDGE_PERCENTILE", "0"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("AI_HEDGE_MIN_SAMPLES", "20"))
+# consecutive failed calls that open the circuit, and how long it stays open
+BREAKER_THRESHOLD = int(os.environ.get("AI_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("AI_BREAKER_COOLDOWN", "30"))
+# how many times a malformed tool answer is asked for again
+SCHEMA_RETRIES = int(os.environ.get("AI_SCHEMA_RETRIES", "1"))
+
+
+class CircuitOpenError(RuntimeError):
+    """The AI API is failing, calls are refused until the breaker's cooldown has passed"""
+
+
+class MalformedResponseError(ValueError):
+    """The model's answer doesn't have the shape the tool schema asks for"""
+
+
+def retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, 429s and 5xxs; anything else is the request's fault"""
+    if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive retryable failures and then refuses calls for
+    `cooldown` seconds, so callers fail fast instead of queueing on a dead AI_API. After
+    the cooldown a single trial call is let through: success closes the circuit, failure
+    opens it again, and a trial that ends any other way is released for the next caller.
+    """
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.opened = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("AI circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        """End a trial call that neither proved the API up nor down, so another can be tried"""
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened += 1
+                self.opened_at = time.monotonic()
+                self._trial = False
+                logger.error(f"AI circuit open for {self.cooldown}s after {self.failures} consecutive failures")
+
+
+class ResiliencePolicy:
+    """
+    Retry, hedging, circuit breaker and output validation decisions for the AI clients,
+    with counters per endpoint. One policy (and so one breaker) is shared by the sync and
+    async clients since they talk to the same API.
+    """
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_min_samples: int = HEDGE_MIN_SAMPLES,
+        schema_retries: int = SCHEMA_RETRIES,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_retries = max_retries
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.schema_retries = schema_retries
+        self.breaker = breaker or CircuitBreaker()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, endpoint: str, counter: str, amount: int = 1):
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, {"retried": 0, "failed": 0, "short_circuited": 0, "hedged": 0, "hedge_won": 0, "malformed": 0, "reasked": 0})
+            counters[counter] += amount
+
+    def before_call(self, endpoint: str):
+        if not self.breaker.allow():
+            self.count(endpoint, "short_circuited")
+            raise CircuitOpenError(f"AI API circuit is open, not calling {endpoint}")
+
+    def succeeded(self):
+        self.breaker.success()
+
+    def failed(self, endpoint: str, error: Exception):
+        """Record a failed call that won't be retried"""
+        if retryable(error):
+            self.breaker.failure()
+        elif getattr(error, "response", None) is not None:
+            # the API answered (a 400, 401, 413...), so it's up even if this request was bad
+            self.breaker.success()
+        else:
+            self.breaker.release()
+        self.count(endpoint, "failed")
+
+    def abandoned(self):
+        """Record a call given up on without an answer either way, e.g. a cancelled task"""
+        self.breaker.release()
+
+    def retry_backoff(self, endpoint: str, error: Exception, attempt: int) -> float:
+        """Raises `error` if the call shouldn't be retried, otherwise returns the jittered backoff in seconds"""
+        if not retryable(error) or attempt > self.max_retries:
+            self.failed(endpoint, error)
+            raise error
+        self.breaker.failure()
+        self.count(endpoint, "retried")
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        logger.warning(f"AI {endpoint} failed ({error}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def hedge_delay(self, latency) -> Optional[float]:
+        """Seconds to wait for the first request before hedging, None to not hedge; `latency` is the endpoint's LatencyStats"""
+        if self.hedge_percentile <= 0 or latency is None or latency.count < self.hedge_min_samples:
+            return None
+        return latency.percentile(self.hedge_percentile)
+
+    def tool_input(self, endpoint: str, response: Any, check: Optional[Callable[[dict], Optional[str]]] = None) -> dict:
+        """The tool input of a response, raising MalformedResponseError if it's missing or fails `check`"""
+        try:
+            tool_input = response["content"][0]["content"][0]["input"]
+        except (KeyError, IndexError, TypeError) as e:
+            self.count(endpoint, "malformed")
+            raise MalformedResponseError(f"No tool input in {endpoint} response: {e}")
+        problem = check(tool_input) if check else None
+        if problem:
+            self.count(endpoint, "malformed")
+            raise MalformedResponseError(f"Malformed {endpoint} tool input: {problem}")
+        return tool_input
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+        return {"breaker": {"state": self.breaker.state, "opened": self.breaker.opened}, "endpoints": endpoints}
+
+
+policy = ResiliencePolicy()
@@ -0,0 +1,126 @@
+import os
+import json
+import logging
+from typing import Any, Iterable, Iterator, List, Optional
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# stream generation calls that support it; the API answering with plain JSON is handled too
+STREAMING = os.environ.get("AI_STREAMING", "true").lower() == "true"
+
+
+class ArrayItemParser:
+    """
+    Incremental parser for a tool input that is still being generated.
+
+    Feed it the partial JSON as it arrives and it returns every element of the top-level
+    `key` array (e.g. "channel_post" or "replies") that has been completed since the
+    last call, so posting can start before the model has finished the whole answer.
+    Only object elements are returned; anything else in the array is ignored.
+    """
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None  # (start, end) of the last complete string at the top level
+        self._current_key = None
+        self._array_depth = None  # stack depth inside the `key` array
+        self._item_start = None
+
+    def feed(self, text: str) -> List[dict]:
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = (self._string_start, pos + 1)
+                continue
+
+            depth = len(self._stack)
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":" and depth == 1 and self._last_string:
+                self._current_key = json.loads(buffer[self._last_string[0]:self._last_string[1]])
+            elif char == "," and depth == 1:
+                self._current_key = None
+                self._last_string = None
+            elif char in "{[":
+                if char == "[" and depth == 1 and self._current_key == self.key:
+                    self._array_depth = depth + 1
+                elif char == "{" and self._array_depth is not None and depth == self._array_depth:
+                    self._item_start = pos
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if char == "}" and self._item_start is not None and depth == self._array_depth:
+                    items.append(self._decode(buffer[self._item_start:pos + 1]))
+                    self._item_start = None
+                elif char == "]" and self._array_depth is not None and depth == self._array_depth - 1:
+                    self._array_depth = None
+        self._pos = len(buffer)
+        return [item for item in items if item is not None]
+
+    @staticmethod
+    def _decode(text: str) -> Optional[dict]:
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            logger.warning(f"Skipping unparseable streamed item: {e}")
+            return None
+
+
+def sse_events(lines: Iterable[str]) -> Iterator[dict]:
+    """Decode server-sent event lines into the JSON data of each event"""
+    data = []
+    for line in lines:
+        if line is None:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r")
+        if not line:
+            if data:
+                yield from _decode_event("\n".join(data))
+                data = []
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    if data:
+        yield from _decode_event("\n".join(data))
+
+def _decode_event(data: str) -> Iterator[dict]:
+    if data == "[DONE]":
+        return
+    try:
+        yield json.loads(data)
+    except ValueError:
+        logger.warning(f"Ignoring malformed stream event: {data[:200]}")
+
+def tool_input_delta(event: dict) -> Optional[str]:
+    """The partial tool input JSON carried by a streaming event, if any; raises on error events"""
+    if event.get("type") == "error":
+        raise RuntimeError(f"AI stream error: {event.get('error')}")
+    if event.get("type") == "content_block_delta":
+        delta = event.get("delta") or {}
+        if delta.get("type") == "input_json_delta":
+            return delta.get("partial_json", "")
+    return None
+
+def non_streamed_tool_input(result: Any) -> str:
+    """The tool input of a plain JSON answer, as text, for APIs that ignore "stream" """
+    return json.dumps(result["content"][0]["content"][0]["input"])
@@ -13,12 +13,16 @@ from flask import Flask, request, jsonify, Response, render_template, redirect,
 from slack_bolt.request import BoltRequest
 import requests
 
+import health
 from listeners import register_listeners
+from utils import oauth
 
 logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
 logger = logging.getLogger(__name__)
 
 mode = os.environ.get("SLACK_APP_MODE", "socket").lower()
+# "async" runs the Slack app on AsyncApp/asyncio instead (see async_app.py)
+runtime = os.environ.get("SLACK_APP_RUNTIME", "sync").lower()
 
 if mode != "socket":
     logger.info("NOT in socket mode! Let's go!")
@@ -57,32 +61,7 @@ if mode != "socket":
         client_id=client_id,
         client_secret=client_secret,
         state_store=oauth_state_store,
-        scopes=[
-            "canvases:read",
-            "canvases:write",
-            "channels:history",
-            "channels:join",
-            "channels:manage",
-            "channels:read",
-            "channels:write.invites",
-            "channels:write.topic",
-            "chat:write",
-            "chat:write.customize",
-            "files:read",
-            "groups:history",
-            "groups:read",
-            "groups:write",
-            "im:history",
-            "im:read",
-            "mpim:history",
-            "mpim:read",
-            "mpim:write",
-            "search:read.private",
-            "users:read",
-            "reactions:write",
-            "commands",
-            "app_mentions:read"
-        ],
+        scopes=oauth.SCOPES,
         redirect_uri=f"https://{os.environ['APP_DOMAIN']}/slack/oauth_redirect",
         install_page_rendering_enabled=False,
         install_path="/slack/install/"
@@ -153,6 +132,22 @@ def oauth_redirect():
         logging.error(f"Error in OAuth redirect: {str(e)}", exc_info=True)
         return "An error occurred during the OAuth process", 500
 
+@flask_app.route("/health/db", methods=["GET"])
+def db_health():
+    return jsonify(health.db())
+
+@flask_app.route("/health/ai", methods=["GET"])
+def ai_health():
+    return jsonify(health.ai())
+
+@flask_app.route("/health/slack", methods=["GET"])
+def slack_health():
+    return jsonify(health.slack())
+
+@flask_app.route("/health/cache", methods=["GET"])
+def cache_health():
+    return jsonify(health.cache())
+
 @flask_app.route("/index.html")
 @flask_app.route("/")
 def landing():
@@ -191,10 +186,18 @@ def serve_static(filename):
         logger.error(f"Error serving static file {filename}: {str(e)}", exc_info=True)
         abort(500)
 
+if os.environ.get("DASHBOARD_PASSWORD"):
+    # internal usage dashboard, see dashboard.py
+    import dashboard
+    dashboard.mount(flask_app)
+
 # Start Bolt app
 if __name__ == "__main__":
     
-    if mode == "socket":
+    if runtime == "async":
+        import async_app
+        async_app.main()
+    elif mode == "socket":
         # Socket mode (no public endpoints needed)
         logger.info("Starting socket mode handler!")
         SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start()
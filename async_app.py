@@ -0,0 +1,166 @@
+import os
+import asyncio
+import logging
+import requests
+from aiohttp import web
+from slack_bolt.async_app import AsyncApp, AsyncAck
+from slack_bolt.app.async_server import AsyncSlackAppServer
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+
+import health
+from ai.client import async_ai_client
+from listeners import register_async_listeners
+from utils import oauth
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+mode = os.environ.get("SLACK_APP_MODE", "socket").lower()
+
+# Run with SLACK_APP_RUNTIME=async python app.py (or python async_app.py). Bolt, the Slack
+# Web API, the AI API and Postgres are driven from one event loop, so a single process can
+# serve many generations at once instead of holding an OS thread per request.
+
+
+def build_app() -> AsyncApp:
+    if mode == "socket":
+        logger.info("IN socket mode! Let's go (async)!")
+        return AsyncApp(token=os.environ.get("SLACK_BOT_TOKEN"))
+
+    logger.info("NOT in socket mode! Let's go (async)!")
+    import sqlalchemy
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from slack_bolt.oauth.async_oauth_settings import AsyncOAuthSettings
+    from slack_sdk.oauth.installation_store.sqlalchemy import AsyncSQLAlchemyInstallationStore
+    from slack_sdk.oauth.state_store.sqlalchemy import SQLAlchemyOAuthStateStore
+
+    database_url = os.environ["DATABASE_URL"].replace("postgres://", "postgresql://")
+    client_id, client_secret, signing_secret = (
+        os.environ["SLACK_CLIENT_ID"],
+        os.environ["SLACK_CLIENT_SECRET"],
+        os.environ["SLACK_SIGNING_SECRET"],
+    )
+
+    # same slack_bots/slack_installations tables as the sync runtime, through asyncpg
+    installation_store = AsyncSQLAlchemyInstallationStore(
+        client_id=client_id,
+        engine=create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://")),
+        logger=logger
+    )
+    oauth_state_store = oauth.ThreadedOAuthStateStore(SQLAlchemyOAuthStateStore(
+        expiration_seconds=120,
+        engine=sqlalchemy.create_engine(database_url),
+        logger=logger
+    ))
+
+    oauth_settings = AsyncOAuthSettings(
+        client_id=client_id,
+        client_secret=client_secret,
+        installation_store=installation_store,
+        state_store=oauth_state_store,
+        scopes=oauth.SCOPES,
+        redirect_uri=f"https://{os.environ['APP_DOMAIN']}/slack/oauth_redirect",
+        install_page_rendering_enabled=False,
+        install_path="/slack/install/"
+    )
+
+    return AsyncApp(
+        logger=logger,
+        signing_secret=signing_secret,
+        oauth_settings=oauth_settings
+    )
+
+
+app = build_app()
+register_async_listeners(app)
+
+@app.action("do_nothing")
+async def do_nothing(ack: AsyncAck):
+    await ack()
+
+
+# The routes app.py serves with Flask besides Bolt's own, so health checks and the landing
+# page keep working with SLACK_APP_RUNTIME=async. The usage dashboard is Flask only.
+ASSETS_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "block_kit", "assets"))
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+
+def _page(name: str, status: int) -> web.Response:
+    with open(os.path.join(TEMPLATES_DIR, name), "r") as file:
+        return web.Response(text=file.read(), status=status, content_type="text/html")
+
+@web.middleware
+async def error_pages(request: web.Request, handler):
+    try:
+        return await handler(request)
+    except web.HTTPNotFound:
+        logger.error(f"404 error: {request.path}")
+        return _page("404.html", 404)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"500 error: {e}", exc_info=True)
+        return _page("500.html", 500)
+
+async def db_health(request: web.Request) -> web.Response:
+    return web.json_response(health.db())
+
+async def ai_health(request: web.Request) -> web.Response:
+    return web.json_response(health.ai(async_ai_client))
+
+async def slack_health(request: web.Request) -> web.Response:
+    return web.json_response(health.slack())
+
+async def cache_health(request: web.Request) -> web.Response:
+    return web.json_response(health.cache())
+
+def landing(server: AsyncSlackAppServer):
+    async def handle(request: web.Request) -> web.Response:
+        if request.query.get("code"):
+            # post an install result
+            await asyncio.to_thread(
+                requests.get,
+                url="https://hooks.slack.com/triggers/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"
+            )
+            return await server.handle_get_requests(request)
+        raise web.HTTPFound("https://converse-install-faa964a4e3f2.herokuapp.com/")
+    return handle
+
+async def serve_static(request: web.Request) -> web.FileResponse:
+    filename = request.match_info["filename"]
+    logger.info(f"Attempting to serve static file: {filename}")
+    path = os.path.realpath(os.path.join(ASSETS_DIR, filename))
+    if not path.startswith(ASSETS_DIR + os.sep) or not os.path.isfile(path):
+        logger.error(f"File not found: {filename}")
+        raise web.HTTPNotFound()
+    return web.FileResponse(path, headers={"Cache-Control": "public, max-age=2592000"})
+
+def build_server(port: int) -> AsyncSlackAppServer:
+    """Bolt's aiohttp server (/slack/events and the OAuth paths) plus the routes above"""
+    server = AsyncSlackAppServer(port=port, path="/slack/events", app=app)
+    server.web_app.middlewares.append(error_pages)
+    server.web_app.add_routes([
+        web.get("/health/db", db_health),
+        web.get("/health/ai", ai_health),
+        web.get("/health/slack", slack_health),
+        web.get("/health/cache", cache_health),
+        web.get("/", landing(server)),
+        web.get("/index.html", landing(server)),
+        web.get("/assets/{filename:.+}", serve_static),
+    ])
+    return server
+
+
+async def run_socket_mode():
+    await AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start_async()
+
+def main():
+    if mode == "socket":
+        logger.info("Starting async socket mode handler!")
+        asyncio.run(run_socket_mode())
+    else:
+        logger.info("STARTING AIOHTTP!")
+        build_server(int(os.environ.get("PORT", 3000))).start()
+
+if __name__ == "__main__":
+    main()
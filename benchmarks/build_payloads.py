@@ -0,0 +1,126 @@
+"""
+Micro-benchmark: building and serialising a fetch_message payload with the prompt builder
+(static tool schema serialised once in ai.prompts) vs the original per-call dict + json.dumps.
+
+Run from the repository root:
+    python benchmarks/build_payloads.py [iterations]
+"""
+import os
+import sys
+import json
+import random
+import logging
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AI_CACHE_BACKEND", "off")
+logging.disable(logging.INFO)  # measure the payloads, not the log handlers
+
+from ai import devxp  # noqa: E402
+
+ARGS = {
+    "author": "<@U00000001>",
+    "conversation_participants": [f"U{index:08d}" for index in range(8)],
+    "purpose": "Coordinate the spring product launch",
+    "channel_topic": "Launch readiness",
+    "topic": "Press release review",
+    "length": "medium",
+    "tone": "casual",
+    "emoji_density": "average",
+    "custom_prompt": ""
+}
+
+
+def legacy_fetch_message_payload(author, conversation_participants, purpose, channel_topic, topic, length, tone, emoji_density="average", custom_prompt=""):
+    """The implementation the prompt builder replaced, serialised the way requests' json= did"""
+    content = (
+        "I am a Solution Engineer at Slack, creating a demo to showcase Slack's features using realistic conversations. "
+        f"Generate a Slack post from the user: {author}. The post may optionally mention any of the following users: {devxp._build_mention_string(conversation_participants)}. "
+    )
+    if purpose:
+        content += f"The purpose of this channel is: {purpose}."
+    if channel_topic:
+        content += f"The current channel topic is: '{channel_topic}'. "
+    if topic:
+        content += f"The topic of this post is: {topic}. "
+
+    length_opts = {
+        "short": random.randrange(1, 2),
+        "medium": random.randrange(1, 5),
+        "long": random.randrange(1, 10)
+    }
+    content += (
+        f"The length of the post should be {length_opts[length]} sentences, and can optionally use simple markdown (*bold*, _italic_, `inline code`, ```code block```) if appropriate. "
+        "RULES: \n"
+        f"- TONE: The tone of the post is {tone}. \n"
+        "- VOICE: Ensure this author has a unique voice and the post sounds authentic. \n"
+        f"- EMOJI: Standard Slack emoji only. Use a {emoji_density} number of emojis in the message content. \n"
+        "- REACJI: Limit reactions (0-4 reacjis per message).\n"
+        "MENTIONS: User Mentions: Mention only the specified users, with no additional names. \n"
+        "FORMAT: Do not format topics or keywords with ** marks.\\ n"
+    )
+    if custom_prompt:
+        content += f"\n\n CUSTOM INSTRUCTIONS: {custom_prompt}."
+
+    payload = {
+        "messages": [
+            {"role": "system", "content": "You are a conversation builder for Slack that can simulate conversations between humans."},
+            {"role": "user", "content": content}
+        ],
+        "temperature": 1,
+        "source": "converse_demo_app",
+        "max_tokens": 2000,
+        "tools": [{
+            "name": "get_message",
+            "description": "Format a Slack post as returned from Claude.",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "channel_post": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "author": {
+                                    "type": "string",
+                                    "description": "The name of the author posting the message. This is alphanumeric only."
+                                },
+                                "message": {
+                                    "type": "string",
+                                    "description": f"The content of the Slack message posted by the author. Bold text is enclosed in single *, Underlined text is inclosed in _, Code is inclosed in `, blocks of code or highly technical details are inclosed in ```, and text to strike through is enclosed in ~. There should be {length_opts[length]} sentences."
+                                },
+                                "reacjis": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                    "description": "A list of emojis used in response to this Slack message. Emojis must be named only."
+                                }
+                            },
+                            "required": ["author", "message"]
+                        },
+                        "description": "A structured Slack message."
+                    }
+                },
+                "required": ["channel_post"]
+            }
+        }],
+        "tool_choice": {"type": "tool", "name": "get_message"}
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def main(iterations: int = 10000):
+    built = json.loads(devxp.fetch_message_payload(**ARGS).body())
+    legacy = json.loads(legacy_fetch_message_payload(**ARGS))
+    assert built.keys() == legacy.keys() and built["tool_choice"] == legacy["tool_choice"]
+
+    results = {
+        "legacy": timeit.timeit(lambda: legacy_fetch_message_payload(**ARGS), number=iterations),
+        "prompts": timeit.timeit(lambda: devxp.fetch_message_payload(**ARGS).body(), number=iterations),
+    }
+    for name, seconds in results.items():
+        print(f"{name:>12}: {seconds / iterations * 1e6:8.1f} us/payload")
+    print(f"{'speedup':>12}: {results['legacy'] / results['prompts']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
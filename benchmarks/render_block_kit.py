@@ -0,0 +1,52 @@
+"""
+Micro-benchmark: precompiled Block Kit rendering vs the original read/dumps/replace/loads.
+
+Run from the repository root:
+    python benchmarks/render_block_kit.py [iterations]
+"""
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import helper  # noqa: E402
+
+DATA = {
+    "users": 12,
+    "posts": "3/10",
+    "replies": "14 so far",
+    "canvas": ":white_check_mark: Complete",
+    "current": ":speech_balloon: Generating replies"
+}
+
+
+def legacy_render_block_kit(template, data):
+    """The implementation render_block_kit replaced"""
+    if isinstance(template, str) and template.endswith(".json"):
+        view_path = os.path.join("block_kit", template)
+        with open(view_path, 'r') as file:
+            template = json.load(file)
+
+    json_string = json.dumps(template)
+    for key, value in data.items():
+        json_string = json_string.replace("{" + key + "}", str(value))
+    return json.loads(json_string)
+
+
+def main(iterations: int = 10000):
+    expected = legacy_render_block_kit("loading_details.json", DATA)
+    assert helper.render_block_kit("loading_details.json", DATA) == expected
+
+    results = {
+        "legacy": timeit.timeit(lambda: legacy_render_block_kit("loading_details.json", DATA), number=iterations),
+        "precompiled": timeit.timeit(lambda: helper.render_block_kit("loading_details.json", DATA), number=iterations),
+    }
+    for name, seconds in results.items():
+        print(f"{name:>12}: {seconds / iterations * 1e6:8.1f} us/render")
+    print(f"{'speedup':>12}: {results['legacy'] / results['precompiled']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -1,6 +1,7 @@
 from objects import Database, DatabaseConfig
 from typing import Dict, Any
 import utils.worker as worker
+from utils import analytics
 import logistics
 import factory
 import logging
@@ -106,7 +107,8 @@ def extend_thread(client, member_id, channel_id, message_ts):
                     client=client,
                     channel_id=channel_id,
                     message_ts=reply_result["ts"],
-                    reacji=reply["reacjis"]
+                    reacji=reply["reacjis"],
+                    history_id=history_row["id"]
                 )
         except Exception as e:
             logger.error(f"Error sending reply: {e}")
@@ -114,11 +116,7 @@ def extend_thread(client, member_id, channel_id, message_ts):
     # Delete the temp message
     client.chat_delete(channel=temp_message["channel"], ts=temp_message["ts"])
 
-    # Update the history for query time
+    # Record the query time and the run's counters on history, analytics and the daily rollups
     query_time = worker.get_time() - start_time
     logger.info(f"Start time = {start_time}; query time: {query_time}")
-    db.update("history", {"query_time": query_time}, {"id": history_row["id"]})
-
-    # Log an entry to the analytics table
-    total_posts_sent = db.fetch_one("SELECT COUNT(*) AS total_posts_sent FROM messages WHERE history_id = %s", (history_row["id"],))["total_posts_sent"]
-    db.insert("analytics", {"user_id": current_user["id"], "messages": total_posts_sent})
\ No newline at end of file
+    analytics.finish_run(history_row["id"], current_user["id"], query_time, team_id=current_user.get("team_id"))
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import hmac
+import logging
+import pandas as pd
+import plotly.express as px
+from dash import Dash, Input, Output, dash_table, dcc, html
+from flask import Flask, Response, request
+
+from utils.usage import rollups
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# Internal usage dashboard, only mounted when DASHBOARD_PASSWORD is set (HTTP basic auth, any user name)
+DASHBOARD_PATH = os.environ.get("DASHBOARD_PATH", "/dashboard/")
+DASHBOARD_PASSWORD = os.environ.get("DASHBOARD_PASSWORD")
+# workspaces shown individually in the runs chart, the rest are summed as "other"
+TOP_TEAMS = int(os.environ.get("DASHBOARD_TOP_TEAMS", "10"))
+
+_RANGES = [{"label": "Last 7 days", "value": 7}, {"label": "Last 30 days", "value": 30}, {"label": "Last 90 days", "value": 90}]
+_TEAM_COLUMNS = ["team_id", "runs", "posts", "replies", "reactions", "messages_per_run", "p50_query_time", "p95_query_time"]
+
+
+def _seconds(milliseconds):
+    return round(milliseconds / 1000, 1) if milliseconds is not None else None
+
+
+def _layout():
+    return html.Div([
+        html.H2("Converse usage"),
+        dcc.Dropdown(id="range", options=_RANGES, value=30, clearable=False, style={"width": "200px"}),
+        # re-render from the in-process rollups as they refresh, see utils.usage
+        dcc.Interval(id="tick", interval=int(rollups.refresh * 1000)),
+        dcc.Graph(id="runs"),
+        dcc.Graph(id="messages"),
+        dcc.Graph(id="query-time"),
+        dash_table.DataTable(
+            id="teams",
+            columns=[{"name": column.replace("_", " "), "id": column} for column in _TEAM_COLUMNS],
+            sort_action="native",
+            page_size=25
+        ),
+        html.P(id="refreshed", style={"color": "#888"})
+    ], style={"fontFamily": "sans-serif", "margin": "24px"})
+
+
+def _runs_figure(days: int):
+    runs = pd.DataFrame(rollups.team_days(days), columns=["day", "team_id", "runs"])
+    top = runs.groupby("team_id")["runs"].sum().nlargest(TOP_TEAMS).index
+    runs.loc[~runs["team_id"].isin(top), "team_id"] = "other"
+    runs = runs.groupby(["day", "team_id"], as_index=False)["runs"].sum()
+    return px.bar(runs, x="day", y="runs", color="team_id", title="Generations per workspace")
+
+
+def _messages_figure(by_day: pd.DataFrame):
+    return px.line(by_day, x="day", y=["messages_per_run", "reactions_per_run"], markers=True, title="Messages and reactions per run")
+
+
+def _query_time_figure(by_day: pd.DataFrame):
+    figure = px.line(by_day, x="day", y=["p50_query_time", "p95_query_time"], markers=True, title="Query time (seconds)")
+    figure.update_yaxes(title="seconds")
+    return figure
+
+
+def _render(days: int, _):
+    by_day = pd.DataFrame(rollups.by_day(days), columns=["day", "runs", "reactions", "messages_per_run", "p50_query_time", "p95_query_time"])
+    by_day["reactions_per_run"] = (by_day["reactions"] / by_day["runs"].where(by_day["runs"] > 0)).round(2)
+    for column in ("p50_query_time", "p95_query_time"):
+        by_day[column] = by_day[column].map(_seconds)
+
+    teams = rollups.by_team(days)
+    for team in teams:
+        team["p50_query_time"] = _seconds(team["p50_query_time"])
+        team["p95_query_time"] = _seconds(team["p95_query_time"])
+
+    stats = rollups.stats()
+    return (
+        _runs_figure(days),
+        _messages_figure(by_day),
+        _query_time_figure(by_day),
+        [{column: team[column] for column in _TEAM_COLUMNS} for team in teams],
+        f"Rollups through {stats['newest_day']}, refreshed every {rollups.refresh:.0f}s"
+    )
+
+
+def _authorised() -> bool:
+    auth = request.authorization
+    return auth is not None and auth.password is not None and hmac.compare_digest(auth.password.encode("utf-8"), DASHBOARD_PASSWORD.encode("utf-8"))
+
+
+def mount(server: Flask) -> Dash:
+    """Serve the dashboard from `server` at DASHBOARD_PATH, behind basic auth"""
+    @server.before_request
+    def _dashboard_auth():
+        if not request.path.startswith(DASHBOARD_PATH):
+            return None
+        if not _authorised():
+            return Response("Authentication required", 401, {"WWW-Authenticate": 'Basic realm="dashboard"'})
+        # loads the rollups on first use, then keeps them fresh in the background
+        rollups.start()
+        return None
+
+    dashboard = Dash(__name__, server=server, url_base_pathname=DASHBOARD_PATH, title="Converse usage")
+    dashboard.layout = _layout
+    dashboard.callback(
+        Output("runs", "figure"),
+        Output("messages", "figure"),
+        Output("query-time", "figure"),
+        Output("teams", "data"),
+        Output("refreshed", "children"),
+        Input("range", "value"),
+        Input("tick", "n_intervals")
+    )(_render)
+
+    logger.info(f"Usage dashboard mounted at {DASHBOARD_PATH}")
+    return dashboard
@@ -0,0 +1,28 @@
+from utils import database, builder, user
+from ai.client import ai_client
+from ai.cache import response_cache
+from utils.rate_limit import scheduler
+
+# Payloads of the /health/* monitoring endpoints, served by both the Flask app (app.py)
+# and the aiohttp server of the async runtime (async_app.py)
+
+
+def db() -> dict:
+    # connection pool statistics for monitoring
+    return {"pools": database.pool_stats()}
+
+def ai(client=ai_client) -> dict:
+    # per-endpoint AI API latency for monitoring
+    return {"endpoints": client.stats(), "resilience": client.resilience.stats()}
+
+def slack() -> dict:
+    # Slack Web API call, throttle and retry counters for monitoring
+    return {"methods": scheduler.stats()}
+
+def cache() -> dict:
+    # hit/miss counters for the in-process caches
+    return {
+        "builder_selections": builder.cache.stats(),
+        "users": user.identities.stats(),
+        "ai_responses": response_cache.stats() if response_cache else None
+    }
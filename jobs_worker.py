@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import traceback
+import multiprocessing
+from slack_sdk import WebClient
+
+import listeners # importing the listeners registers their job handlers
+from utils import jobs, partitions, threads # threads registers the extend_thread handler
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+mode = os.environ.get("SLACK_APP_MODE", "socket").lower()
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "30"))
+# how often the partitions of history/messages are created ahead and archived, see utils.partitions
+PARTITION_MAINTENANCE_INTERVAL = float(os.environ.get("PARTITION_MAINTENANCE_INTERVAL", "21600"))
+
+_installation_store = None
+_clients = {}
+
+
+def _get_installation_store():
+    global _installation_store
+    if _installation_store is None:
+        import sqlalchemy
+        from slack_sdk.oauth.installation_store.sqlalchemy import SQLAlchemyInstallationStore
+        database_url = os.environ["DATABASE_URL"].replace("postgres", "postgresql")
+        _installation_store = SQLAlchemyInstallationStore(
+            client_id=os.environ["SLACK_CLIENT_ID"],
+            engine=sqlalchemy.create_engine(database_url),
+            logger=logger
+        )
+    return _installation_store
+
+def get_client(job: jobs.Job) -> WebClient:
+    """A WebClient for the workspace the job was submitted from"""
+    if mode == "socket":
+        token = os.environ.get("SLACK_BOT_TOKEN")
+    else:
+        bot = _get_installation_store().find_bot(
+            enterprise_id=job.enterprise_id,
+            team_id=job.team_id,
+            is_enterprise_install=job.is_enterprise_install
+        )
+        if bot is None:
+            raise RuntimeError(f"No installation found for team {job.team_id} / enterprise {job.enterprise_id}")
+        token = bot.bot_token
+
+    # reuse clients so the per-token caches (identity, directory) stay warm
+    if token not in _clients:
+        _clients[token] = WebClient(token=token)
+    return _clients[token]
+
+
+def _heartbeat(job: jobs.Job, done: threading.Event):
+    while not done.wait(HEARTBEAT_INTERVAL):
+        try:
+            jobs.queue.heartbeat(job)
+        except Exception as e:
+            logger.error(f"Heartbeat failed for job {job.id}: {e}")
+
+def run_job(job: jobs.Job):
+    logger.info(f"Running {job.kind} job {job.id} (attempt {job.attempts}{', resumed' if job.resumed else ''})")
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job, done), daemon=True)
+    heartbeat.start()
+    client = None
+    try:
+        client = get_client(job)
+        jobs.get_handler(job.kind)(client, job, logger)
+        jobs.queue.complete(job)
+        logger.info(f"Finished {job.kind} job {job.id}")
+    except Exception as e:
+        logger.error(f"{job.kind} job {job.id} failed: {e}\n{traceback.format_exc()}")
+        status = jobs.queue.fail(job, str(e))
+        logger.info(f"Job {job.id} is now {status}")
+        if status == "failed":
+            # out of attempts, don't leave the user on the loading modal
+            jobs.show_failure(client, job, e)
+    finally:
+        done.set()
+
+def fail_stale_job(job: jobs.Job):
+    """Show the error view of a job whose last attempt took its worker down"""
+    try:
+        client = get_client(job)
+    except Exception as e:
+        logger.error(f"No client to show the failure of job {job.id}: {e}")
+        return
+    jobs.show_failure(client, job, RuntimeError("the job stopped responding"))
+
+def work(index: int):
+    """Child process loop: claim a job, run it, repeat"""
+    worker = jobs.worker_name()
+    current = {"job": None}
+
+    def shutdown(signum, frame):
+        job = current["job"]
+        if job is not None:
+            logger.info(f"Worker {worker} shutting down, releasing job {job.id}")
+            jobs.queue.release(job)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # the parent handles Ctrl-C
+    logger.info(f"Worker {index} ({worker}) started")
+
+    while True:
+        try:
+            for stale in jobs.queue.fail_stale():
+                logger.error(f"{stale.kind} job {stale.id} failed, its worker stopped responding on attempt {stale.attempts}")
+                fail_stale_job(stale)
+        except Exception as e:
+            logger.error(f"Worker {worker} could not fail stale jobs: {e}")
+
+        try:
+            job = jobs.queue.claim(worker)
+        except Exception as e:
+            logger.error(f"Worker {worker} could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        current["job"] = job
+        run_job(job)
+        current["job"] = None
+
+
+def maintain_partitions():
+    """Child process: create upcoming partitions and archive old ones"""
+    # stopping mid-archive is safe, the next run picks up the detached partitions
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    result = partitions.manager.maintain()
+    logger.info(f"Partition maintenance created {len(result['created'])}, archived {len(result['archived'])}")
+
+
+def main():
+    processes = {}
+    stopping = threading.Event()
+    maintenance = None
+    next_maintenance = time.monotonic()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def spawn(index: int):
+        process = multiprocessing.Process(target=work, args=(index,), name=f"job-worker-{index}")
+        process.start()
+        processes[index] = process
+
+    for index in range(JOB_WORKERS):
+        spawn(index)
+
+    while not stopping.is_set():
+        for index, process in list(processes.items()):
+            if not process.is_alive():
+                logger.warning(f"Worker {index} exited with {process.exitcode}, restarting")
+                spawn(index)
+        # in its own process, an archive export can take a while and must not hold up the supervisor
+        if time.monotonic() >= next_maintenance and (maintenance is None or not maintenance.is_alive()):
+            maintenance = multiprocessing.Process(target=maintain_partitions, name="partition-maintenance")
+            maintenance.start()
+            next_maintenance = time.monotonic() + PARTITION_MAINTENANCE_INTERVAL
+        stopping.wait(POLL_INTERVAL)
+
+    logger.info("Stopping job workers")
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join()
+    if maintenance is not None and maintenance.is_alive():
+        maintenance.terminate()
+        maintenance.join()
+
+if __name__ == "__main__":
+    main()
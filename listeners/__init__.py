@@ -8,3 +8,17 @@ def register_listeners(app):
     events.register(app)
     shortcuts.register(app)
     views.register(app)
+
+
+def register_async_listeners(app):
+    """
+    Register the listeners on an AsyncApp. Listeners with a native async version are
+    registered as such, the rest run on the sync listener bridge.
+    """
+    from .async_bridge import SyncListenerBridge
+    from .events.app_mentioned import app_mentioned_callback, async_app_mentioned_callback
+
+    bridge = SyncListenerBridge(app, overrides={
+        app_mentioned_callback: async_app_mentioned_callback
+    })
+    register_listeners(bridge)
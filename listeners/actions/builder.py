@@ -7,7 +7,6 @@ from slack_sdk.errors import SlackApiError
 from slack_bolt import Ack
 from utils.database import Database, DatabaseConfig
 from utils import user
-from datetime import datetime, timezone
 from listeners.events import app_home_opened
 from utils.app_view import render_app_view
 
@@ -60,11 +59,7 @@ def _builder_step_one(ack: Ack, body, client: WebClient, mode, logger: Logger):
             block["element"]["initial_value"] = config[block["block_id"]]
     
     # set the mode to builder
-    db.update(
-        "user_builder_selections", 
-        {"mode": 'builder', "last_updated": datetime.now(timezone.utc)},
-        {"user_id": user_id, "app_installed_team_id": app_installed_team_id}
-    )
+    builder.set_mode(user_id, app_installed_team_id, "builder")
 
     client.views_publish(user_id=user_id, view=step_one)
 
@@ -400,18 +395,7 @@ def save_exit_builder_mode(ack: Ack, body, client: WebClient, mode, logger: Logg
             "view": {"app_installed_team_id": app_installed_team_id}
         }
 
-        if body["actions"][0]["value"] == "clear":
-            db.update(
-                "user_builder_selections", 
-                {"builder_options": None, "mode": 'home', "last_updated": datetime.now(timezone.utc)},
-                {"user_id": user_id, "app_installed_team_id": app_installed_team_id}
-            )
-        else:
-            db.update(
-                "user_builder_selections", 
-                {"mode": 'home', "last_updated": datetime.now(timezone.utc)},
-                {"user_id": user_id, "app_installed_team_id": app_installed_team_id}
-            )
+        builder.set_mode(user_id, app_installed_team_id, "home", clear_options=body["actions"][0]["value"] == "clear")
         logger.debug(f"Successfully updated mode to {mode} for user_id {user_id}")
 
         # Call update_home_tab with the correct parameters
@@ -3,6 +3,7 @@ from slack_bolt import Ack
 from logging import Logger
 import json
 import os
+from utils import identity
 
 def app_home_popup(ack: Ack, body, client: WebClient, logger: Logger):
     ack()
@@ -10,7 +11,7 @@ def app_home_popup(ack: Ack, body, client: WebClient, logger: Logger):
     # with open(view_path, 'r') as file:
     #     app_home_preview_modal = json.load(file)
 
-    bot = client.auth_test()
+    bot = identity.bot_identity(client)
     app_home_preview_modal = {
         "type": "modal",
         "title": {
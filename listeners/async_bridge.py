@@ -0,0 +1,66 @@
+import os
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+from slack_sdk import WebClient
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+LISTENER_THREADS = int(os.environ.get("ASYNC_LISTENER_THREADS", "16"))
+
+# Bolt utilities that are coroutines on AsyncApp and plain calls on App
+_ASYNC_UTILITIES = {"ack", "say", "respond", "complete", "fail"}
+
+
+class SyncListenerBridge:
+    """
+    Stands in for an AsyncApp when registering the existing sync listeners, so the whole
+    app runs on the async runtime without porting every listener at once.
+
+    `app.action(...)(fn)` and friends are forwarded to the AsyncApp with `fn` wrapped in a
+    coroutine that runs it on a bounded thread pool, handing it a sync WebClient and sync
+    ack/say/respond that call back into the event loop. Listeners in `overrides` are
+    replaced by their native async version instead.
+    """
+    def __init__(self, app, overrides: Dict[Callable, Callable] = None, max_workers: int = LISTENER_THREADS):
+        self.app = app
+        self.overrides = overrides or {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sync-listener")
+        self._clients: Dict[str, WebClient] = {}
+
+    def __getattr__(self, name: str):
+        register = getattr(self.app, name)
+
+        def decorator_factory(*args, **kwargs):
+            def decorator(fn: Callable):
+                return register(*args, **kwargs)(self.wrap(fn))
+            return decorator
+        return decorator_factory
+
+    def wrap(self, fn: Callable) -> Callable:
+        if fn in self.overrides:
+            return self.overrides[fn]
+
+        # functools.wraps keeps __wrapped__, which Bolt unwraps to decide which arguments to pass
+        @functools.wraps(fn)
+        async def listener(**kwargs):
+            loop = asyncio.get_running_loop()
+            sync_kwargs = {name: self._to_sync(name, value, loop) for name, value in kwargs.items()}
+            return await loop.run_in_executor(self.executor, functools.partial(fn, **sync_kwargs))
+        return listener
+
+    def _to_sync(self, name: str, value, loop: asyncio.AbstractEventLoop):
+        if name == "client":
+            # one sync client per bot token so the per-token caches keep working
+            client = self._clients.get(value.token)
+            if client is None:
+                client = self._clients[value.token] = WebClient(token=value.token, base_url=value.base_url)
+            return client
+        if name in _ASYNC_UTILITIES and value is not None:
+            def call(*args, **kwargs):
+                return asyncio.run_coroutine_threadsafe(value(*args, **kwargs), loop).result()
+            return call
+        return value
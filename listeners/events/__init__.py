@@ -1,8 +1,11 @@
 from slack_bolt import App
 from .app_home_opened import app_home_opened_callback
 from .app_mentioned import app_mentioned_callback
+from .app_uninstalled import app_uninstalled_callback, tokens_revoked_callback
 
 
 def register(app: App):
     app.event("app_home_opened")(app_home_opened_callback)
-    app.event("app_mention")(app_mentioned_callback)
\ No newline at end of file
+    app.event("app_mention")(app_mentioned_callback)
+    app.event("app_uninstalled")(app_uninstalled_callback)
+    app.event("tokens_revoked")(tokens_revoked_callback)
\ No newline at end of file
@@ -7,6 +7,7 @@ from slack_sdk.errors import SlackApiError
 from utils.database import Database, DatabaseConfig
 from listeners.actions import builder
 from utils import builder as util_builder # avoid conflicts
+from utils import identity
 
 db = Database(DatabaseConfig())
 
@@ -15,14 +16,10 @@ def app_home_opened_callback(client: WebClient, event: dict, logger: Logger):
         # Fetch builder options from the database for this user
         user_id = event["user"]
         
-        # Get the team ID from the client's auth test
-        auth_test = client.auth_test()
-        app_installed_team_id = auth_test["team_id"]
+        # Get the team ID from the cached bot identity
+        app_installed_team_id = identity.bot_identity(client)["team_id"]
         
-        query = "SELECT mode FROM user_builder_selections WHERE user_id = %s AND app_installed_team_id = %s"
-        result = db.fetch_one(query, (user_id, app_installed_team_id))
-
-        mode = result["mode"] if result else None
+        mode = util_builder.get_mode(user_id, app_installed_team_id)
         logger.info(f"Query result for user {user_id} in team {app_installed_team_id}: {mode}")
     
         if mode == "builder":
@@ -1,18 +1,35 @@
 from logging import Logger
 from slack_sdk import WebClient
-from slack_bolt import Say
-from utils import threads
+from slack_bolt import Say, BoltContext
+from slack_bolt.context.async_context import AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+from utils import jobs, threads
+import asyncio
 
-def app_mentioned_callback(event: dict, client: WebClient, logger: Logger, say: Say):
+def app_mentioned_callback(event: dict, client: WebClient, logger: Logger, say: Say, context: BoltContext):
     logger.debug("EVENT APP MENTIONED!")
 
     # say("Hi! Thanks for the mention. Time to extend the thread!")
     # conversation.extend_thread(client, member_id=member_id, channel_id=channel_id, message_ts=message_ts)
-    threads.extend_thread(
-        client=client, 
-        member_id=event["user"],
-        channel_id=event["channel"], 
-        message_ts=event["ts"], 
-        say=say, 
+    jobs.submit(
+        "extend_thread",
+        {
+            "member_id": event["user"],
+            "channel_id": event["channel"],
+            "message_ts": event["ts"]
+        },
+        context=context,
+        client=client,
         logger=logger
-    )
\ No newline at end of file
+    )
+
+async def async_app_mentioned_callback(event: dict, client: AsyncWebClient, logger: Logger, context: AsyncBoltContext):
+    payload = {
+        "member_id": event["user"],
+        "channel_id": event["channel"],
+        "message_ts": event["ts"]
+    }
+    if jobs.JOB_RUNNER == "inline":
+        await threads.async_extend_thread(client=client, logger=logger, **payload)
+    else:
+        await asyncio.to_thread(jobs.submit, "extend_thread", payload, context=context, logger=logger)
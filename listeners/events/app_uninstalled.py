@@ -0,0 +1,20 @@
+from logging import Logger
+from utils import identity, directory
+
+
+def app_uninstalled_callback(body: dict, logger: Logger):
+    logger.info(f"App uninstalled from team {body.get('team_id')}")
+    _forget_team(body)
+
+
+def tokens_revoked_callback(body: dict, logger: Logger):
+    logger.info(f"Tokens revoked for team {body.get('team_id')}")
+    _forget_team(body)
+
+
+def _forget_team(body: dict):
+    team_id = body.get("team_id")
+    enterprise_id = body.get("enterprise_id")
+    identity.invalidate(team_id=team_id, enterprise_id=enterprise_id)
+    if team_id:
+        directory.directory.invalidate(team_id)
@@ -1,11 +1,11 @@
 from logging import Logger
-from slack_bolt import Ack, Say
+from slack_bolt import Ack, Say, BoltContext
 from slack_sdk import WebClient
 import os
 import json
-from utils import threads, channel, helper
+from utils import jobs, channel, helper, identity
 
-def extend_thread_callback(ack: Ack, shortcut: dict, client: WebClient, say: Say, logger: Logger):
+def extend_thread_callback(ack: Ack, shortcut: dict, client: WebClient, say: Say, logger: Logger, context: BoltContext):
     try:
 
         if "thread_ts" in shortcut:
@@ -37,7 +37,7 @@ def extend_thread_callback(ack: Ack, shortcut: dict, client: WebClient, say: Say
                 )
             else:
                 # unable to add bot to channel!
-                bot = client.auth_test()
+                bot = identity.bot_identity(client)
                 error = f"Unable to add <@{bot['user_id']}> to <#{channel_id}>. If this is a private channel, please manually add <@{bot['user_id']}> then try again."
                 # client.chat_postEphemeral(channel=channel_id, user=body["user"]["id"], text=error)
                 logger.error(error)
@@ -56,12 +56,15 @@ def extend_thread_callback(ack: Ack, shortcut: dict, client: WebClient, say: Say
         ack()
         # TODO: this needs to call the common extend_thread function, yet to be placed
         # conversation.extend_thread(client, shortcut["user"]["id"], shortcut["channel"]["id"], main_ts)
-        threads.extend_thread(
-            client=client, 
-            member_id=shortcut["user"]["id"], 
-            channel_id=shortcut["channel"]["id"], 
-            message_ts=main_ts, 
-            say=say, 
+        jobs.submit(
+            "extend_thread",
+            {
+                "member_id": shortcut["user"]["id"],
+                "channel_id": shortcut["channel"]["id"],
+                "message_ts": main_ts
+            },
+            context=context,
+            client=client,
             logger=logger
         )
 
@@ -1,13 +1,14 @@
 import os
 from logging import Logger
-from slack_bolt import Ack, Say
+from slack_bolt import Ack, Say, BoltContext
 from slack_sdk import WebClient
 import json
 from utils.conversation_model import Conversation
 from ai import devxp
 import random
-from utils import message, worker, channel, helper
+from utils import analytics, message, worker, channel, directory, helper, identity, jobs, pipeline
 from utils.database import Database, DatabaseConfig
+from utils.progress import ProgressReporter
 from datetime import timedelta
 from functools import lru_cache
 
@@ -21,9 +22,7 @@ from functools import lru_cache
 
 def load_modal_template(template_name: str) -> dict:
     """Load modal templates from JSON files."""
-    view_path = os.path.join("block_kit", f"{template_name}.json")
-    with open(view_path, 'r') as file:
-        return json.load(file)
+    return helper.load_block_kit(f"{template_name}.json")
 
 # ORIGINAL
 # def get_channel_info_with_bot_status(client: WebClient, channel_id: str, logger: Logger) -> tuple[dict, bool]:
@@ -68,8 +67,7 @@ def get_channel_info_with_bot_status(client: WebClient, channel_id: str, logger:
             return None, False
             
         # Get bot's user ID
-        bot_info = client.auth_test()
-        bot_user_id = bot_info["user_id"]
+        bot_user_id = identity.bot_identity(client)["user_id"]
         
         # Handle pagination for members
         all_members = []
@@ -118,7 +116,7 @@ def single_channel_form(ack: Ack, body, client: WebClient, view, logger: Logger,
         channel_info, is_bot_member = get_channel_info_with_bot_status(client, channel_id, logger)
         
         if not channel_info:
-            bot = client.auth_test()
+            bot = identity.bot_identity(client)
             error_modal = load_modal_template("error_modal")
             error_data = {
                 "title": "An error has occurred",
@@ -134,7 +132,7 @@ def single_channel_form(ack: Ack, body, client: WebClient, view, logger: Logger,
                     client.conversations_join(channel=channel_id)
                 except Exception as e:
                     logger.error(f"Error adding bot to channel: {e}")
-                    bot = client.auth_test()
+                    bot = identity.bot_identity(client)
                     error = f"Unable to add <@{bot['user_id']}> to <#{channel_id}>. Please try again."
                     error_modal = load_modal_template("error_modal")
                     error_data = {
@@ -144,6 +142,7 @@ def single_channel_form(ack: Ack, body, client: WebClient, view, logger: Logger,
                     rendered = helper.render_block_kit(template=error_modal, data=error_data)
                     return ack(response_action="update", view=rendered)
             else:
+                bot = identity.bot_identity(client)
                 error = f"Unable to add <@{bot['user_id']}> to <#{channel_id}>. If this is a private channel, please manually add <@{bot['user_id']}> then try again."
                 error_modal = load_modal_template("error_modal")
                 error_data = {
@@ -185,7 +184,7 @@ def single_channel_form(ack: Ack, body, client: WebClient, view, logger: Logger,
         # Still need to acknowledge even if there's an error
         return False
     
-def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logger, say: Say):
+def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logger, say: Say, context: BoltContext):
     logger.info("TIME TO GENERATE THE CONVERSATION!")
     
     # First validate all required fields are present
@@ -245,21 +244,62 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
     logger.info("LOADING VIEW")
     logger.info(loading)
 
+    # The generation itself runs in a job worker so the listener returns straight away
+    jobs.submit(
+        "conversation_generate",
+        {
+            "view_id": view_id,
+            "user_id": body["user"]["id"],
+            "channel_id": body["view"]["private_metadata"],
+            "app_installed_team_id": body["view"].get("app_installed_team_id"),
+            "state_values": view["state"]["values"]
+        },
+        context=context,
+        client=client,
+        logger=logger
+    )
+
+
+def error_view(error) -> dict:
+    """The error modal shown in place of the loading modal when a generation fails"""
+    return helper.render_block_kit(template=load_modal_template("error_modal"), data={
+        "title": "An error has occurred",
+        "error": f"❌ Error generating conversation: {error}" if isinstance(error, Exception) else error
+    })
+
+
+@jobs.handler("conversation_generate", error_view=error_view)
+def generate_conversation(client: WebClient, job: jobs.Job, logger: Logger):
+    """
+    Generate the conversation submitted from the conversation modal. Runs in a job worker,
+    writing progress to the loading modal and checkpointing after every post so a run
+    that dies part way through resumes instead of starting over.
+    """
+    payload = job.payload
+    view_id = payload["view_id"]
+    channel_id = payload["channel_id"]
     db = Database(DatabaseConfig()) # so that we can log history events
-    current_user = worker.get_user(client, body["user"]["id"])
-    channel_id = body["view"]["private_metadata"]
-
-    # Prep the message history log
-    history_entry = {
-        "conversation_id": None,
-        "channel_id": channel_id,
-        "user_id": current_user["id"]
-    }
-    history_row = db.insert("history", history_entry)
-    start_time = worker.get_time()
-    
+
+    if "history_id" in job.checkpoint:
+        logger.info(f"Resuming conversation generation job {job.id}")
+        current_user = {"id": job.checkpoint["user_id"]}
+        history_row = {"id": job.checkpoint["history_id"]}
+        start_time = job.checkpoint["start_time"]
+    else:
+        current_user = worker.get_user(client, payload["user_id"])
+
+        # Prep the message history log
+        history_entry = {
+            "conversation_id": None,
+            "channel_id": channel_id,
+            "user_id": current_user["id"]
+        }
+        history_row = db.insert("history", history_entry)
+        start_time = worker.get_time()
+        job.save_checkpoint(history_id=history_row["id"], user_id=current_user["id"], start_time=start_time)
+
     # 0. map all submitted values
-    state_values = view["state"]["values"] # submitted value store
+    state_values = payload["state_values"] # submitted value store
     channel_purpose = state_values["channel_description"]["channel_description_input"]["value"]
     channel_topic = state_values["channel_topic"]["channel_topic_input"]["value"]
     topics = state_values["topics"]["topics_select"]["value"]
@@ -276,6 +316,252 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
     except Exception as e:
         canvas = False
 
+    # Progress updates are sent from a background thread and throttled per view
+    progress = ProgressReporter(client, view_id)
+
+    try:
+        if "post_plan" not in job.checkpoint:
+            # Steps 1-5a: prepare the channel, pick participants and plan the posts
+            prepared = _prepare_generation(
+                client=client,
+                channel_id=channel_id,
+                progress=progress,
+                channel_purpose=channel_purpose,
+                channel_topic=channel_topic,
+                topics=topics,
+                num_participants=num_participants,
+                num_posts=num_posts,
+                thread_replies=thread_replies,
+                canvas=canvas,
+                team_id=payload.get("app_installed_team_id"),
+                logger=logger
+            )
+            if prepared is None:
+                return
+            job.save_checkpoint(next_post=0, data_counter={"posts": 0, "replies": 0}, **prepared)
+
+        participants = job.checkpoint["participants"]
+        custom_topics = job.checkpoint["custom_topics"]
+        canvas_result = job.checkpoint["canvas_result"]
+        post_plan = job.checkpoint["post_plan"]
+        total_posts = len(post_plan)
+        participant_ids = [participant['id'] for participant in participants]
+        participants_by_id = {participant['id']: participant for participant in participants}
+        data_counter = dict(job.checkpoint["data_counter"])
+        next_post = job.checkpoint["next_post"]
+
+        loading_modal_data = {
+            "users": len(participants),
+            "posts":f"{data_counter['posts']}/{total_posts}",
+            "replies":"Calculating..." if not data_counter["replies"] else f"{data_counter['replies']} so far",
+            "canvas":canvas_result,
+            "current":":speech_balloon: Generating messages"
+        }
+        progress.update(loading_modal_data)
+
+        # Fetch posts and their replies from the LLM concurrently while posting them to Slack in order
+        generation_settings = {
+            "participant_ids": participant_ids,
+            "channel_purpose": channel_purpose,
+            "channel_topic": channel_topic,
+            "post_length": post_length,
+            "tone": tone,
+            "emoji_density": emoji_density,
+            "custom_prompt": custom_prompt
+        }
+
+        strategy = payload.get("generation_strategy") or pipeline.GENERATION_STRATEGY
+        if strategy not in pipeline.GENERATION_STRATEGIES:
+            logger.warning(f"Unknown generation strategy {strategy}, using batched")
+            strategy = "batched"
+        if job.checkpoint.get("posted"):
+            logger.info(f"All {total_posts} posts were sent before job {job.id} was retried, finishing the run")
+        else:
+            logger.info(f"Generating {total_posts - next_post} posts with the {strategy} strategy")
+
+        for index, (plan, generated) in enumerate(_generation_pipeline(strategy, post_plan[next_post:], generation_settings, logger), start=next_post):
+            if data_counter["posts"] > 0:
+                loading_modal_data = {
+                    "users": len(participants),
+                    "posts":f"{data_counter['posts']}/{total_posts}",
+                    "replies":f"{data_counter['replies']} so far",
+                    "canvas":canvas_result,
+                    "current":":speech_balloon: Generating message"
+                }
+                progress.update(loading_modal_data)
+
+            # some basic error handling in case the LLM throws a wobbly
+            if isinstance(generated, Exception) or not generated:
+                job.save_checkpoint(next_post=index + 1, data_counter=data_counter)
+                continue
+            message_content = generated["post"]
+            author = participants_by_id[plan["author_id"]]
+
+            logger.info(f"MESSAGE_CONTENT {message_content}")
+
+            # 5b. Send the post
+            message_result = message.send_message(
+                client=client,
+                selected_channel=channel_id,
+                post=message_content,
+                participant=author,
+                history_id=history_row["id"]
+            )
+
+            logger.info(f"MESSAGE_RESULT {message_result}")
+
+            if not message_result or not message_result.get("ok"):
+                job.save_checkpoint(next_post=index + 1, data_counter=data_counter)
+                continue
+
+            data_counter["posts"] += 1
+            # 5c. Attach reacjis
+            message.send_reacjis(
+                client=client,
+                channel_id=channel_id,
+                message_ts=message_result["ts"],
+                reacji=message_content.get("reacjis", []),
+                history_id=history_row["id"]
+            )
+            loading_modal_data = {
+                "users": len(participants),
+                "posts":f"{data_counter['posts']}/{total_posts}",
+                "replies":f"{data_counter['replies']} so far",
+                "canvas":canvas_result,
+                "current":":speech_balloon: Generating replies"
+            }
+            progress.update(loading_modal_data)
+
+            # 5d. Send replies
+            for r in generated["replies"]:
+                logger.debug(f"REPLY: {r}")
+                reply_participant = participants_by_id.get(r["author"])
+                if not reply_participant:
+                    logger.error(f"Failed to find a matching conversation participant for author {r['author']}! Skipping")
+                    continue
+
+                replies_result = message.send_message(
+                    client=client,
+                    selected_channel=channel_id,
+                    post=r,
+                    participant=reply_participant,
+                    thread_ts=message_result["ts"],
+                    history_id=history_row["id"]
+                )
+
+                if replies_result and replies_result.get("ok"):
+                    data_counter["replies"] += 1
+                    loading_modal_data = {
+                        "users": len(participants),
+                        "posts":f"{data_counter['posts']}/{total_posts}",
+                        "replies":f"{data_counter['replies']} so far",
+                        "canvas":canvas_result,
+                        "current":":speech_balloon: Generating replies"
+                    }
+                    progress.update(loading_modal_data)
+                    message.send_reacjis(
+                        client=client,
+                        channel_id=channel_id,
+                        message_ts=replies_result["ts"],
+                        reacji=r.get("reacjis", []),
+                        history_id=history_row["id"]
+                    )
+
+            # this post and its replies are in the channel, a resumed run starts after them
+            job.save_checkpoint(next_post=index + 1, data_counter=data_counter)
+
+        # a retry from here on only redoes the bookkeeping below, never the posting
+        job.save_checkpoint(next_post=total_posts, data_counter=data_counter, posted=True)
+
+        # 6. Show results modal
+        # record the query time and the run's counters on history, analytics and the daily rollups
+        query_time = worker.get_time() - start_time
+        logger.info(f"Start time = {start_time}; query time: {query_time}")
+        analytics.finish_run(history_row["id"], current_user["id"], query_time, team_id=identity.bot_identity(client)["team_id"])
+
+        time_in_seconds = query_time/1000
+        minutes, seconds = divmod(time_in_seconds, 60)
+        formatted_time = f"{int(minutes):2d}:{int(seconds):02d}"
+        logger.info(f"Formatted time: {formatted_time}")
+    
+        # Update modal to show success
+        progress.finish(
+            view={
+                "type": "modal",
+                "title": {
+                    "type": "plain_text",
+                    "text": "Conversation Generated"
+                },
+                "close": {
+                    "type": "plain_text",
+                    "text": "Close",
+                    "emoji": True
+                },
+                "blocks": [
+                    {
+                        "type": "header",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "✅ Conversation generated successfully!",
+                            "emoji": True
+                        }
+                    },
+                    {
+                        "type": "context",
+                        "elements": [
+                            {
+                                "type": "mrkdwn",
+                                "text": f":stopwatch: _Conversation created in {formatted_time}_"
+                            }
+                        ]
+                    },
+                    {
+                        "type": "section",
+                        "fields": [
+                            {
+                                "type": "mrkdwn",
+                                "text": f"*Posts:* {data_counter['posts']}"
+                            },
+                            {
+                                "type": "mrkdwn",
+                                "text": f"*Total Replies:* {data_counter['replies']}"
+                            },
+                            {
+                                "type": "mrkdwn",
+                                "text": f"*Participants:* {len(participants)}"
+                            }
+                        ]
+                    },
+                    {
+                        "type": "section",
+                        "text": {
+                            "type": "mrkdwn",
+                            "text": f"*Topics:* {', '.join(custom_topics) if custom_topics else channel_topic}"
+                        }
+                    },
+                    {
+                        "type": "section",
+                        "text": {
+                            "type": "mrkdwn",
+                            "text": f"👉 *View the conversation in the <#{channel_id}> to see the results!*"
+                        }
+                    }
+                ]
+            }
+        )
+    finally:
+        # never leave the reporter thread waiting, whichever way the run ends; if it fails the
+        # job is retried from the checkpoint, and jobs.show_failure shows error_view once it
+        # has failed for good
+        progress.finish()
+
+
+def _prepare_generation(client: WebClient, channel_id: str, progress: ProgressReporter, channel_purpose: str, channel_topic: str, topics, num_participants: str, num_posts: str, thread_replies: str, canvas: bool, team_id: str, logger: Logger):
+    """
+    Steps 1-5a of a conversation generation: join the channel, find participants, update
+    the topic/purpose and canvas, then plan every post. Returns the plan, or None if the
+    run cannot continue (the loading modal already shows the error).
+    """
     # 1. make sure the app is part of this channel and handle if it's a private channel without membership
     channel_info = channel.get_info(
         client=client,
@@ -293,17 +579,10 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
             )
         else:
             # unable to add bot to channel!
-            bot = client.auth_test()
+            bot = identity.bot_identity(client)
             error = f"Unable to add <@{bot['user_id']}> to <#{channel_id}>. If this is a private channel, please manually add <@{bot['bot_id']}> then try again."
-            view_path = os.path.join("block_kit", "error_modal.json")
-            with open(view_path, 'r') as file:
-                error_modal = json.load(file)
-            error_data = {
-                "title": "An error has occurred",
-                "error": error
-            }
-            rendered = helper.render_block_kit(template=error_modal, data=error_data)
-            return ack(response_action="update", view=rendered)
+            progress.finish(view=error_view(error))
+            return None
     
     # ---------------------------------------
 
@@ -313,8 +592,6 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
     else:
         canvas_result = "Not selected"
 
-    # Initialize counter
-    processed = 0
     total_members = channel_info['num_members']
 
     # Show initial loading state
@@ -323,30 +600,12 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
         "posts": "Calculating...",
         "replies": "Calculating...",
         "canvas": canvas_result,
-        "current": f":mag: Checking channel members (0/{total_members})"
+        "current": f":mag: Checking {total_members} channel members"
     }
-    loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-    client.views_update(view_id=view_id, view=loading_view)
-
-    # Get users with progress updates
-    humans = []
-    members_response = client.conversations_members(channel=channel_id)
-    for member_id in members_response["members"]:
-        user_info = client.users_info(user=member_id)["user"]
-        if not user_info.get("is_bot", False):
-            humans.append(user_info)
-        
-        processed += 1
-        if processed % 10 == 0:  # Update every 10 users
-            loading_modal_data = {
-                "users": "Processing...",
-                "posts": "Calculating...",
-                "replies": "Calculating...",
-                "canvas": canvas_result,
-                "current": f":mag: Checking channel members ({processed}/{total_members})"
-            }
-            loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-            client.views_update(view_id=view_id, view=loading_view)
+    progress.update(loading_modal_data)
+
+    # Get human members from the cached user directory
+    humans = directory.human_members(client, channel_id, team_id=team_id)
 
     # Show final count
     loading_modal_data = {
@@ -356,8 +615,7 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
         "canvas": canvas_result,
         "current": f":white_check_mark: Found {len(humans)} human users"
     }
-    loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-    client.views_update(view_id=view_id, view=loading_view)
+    progress.update(loading_modal_data)
 
     logger.info(f"RETRIEVED {len(humans)} HUMANS")
 
@@ -414,8 +672,7 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
             "canvas":"Generating...",
             "current":":writing_hand: Designing canvas"
         }
-        loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-        client.views_update(view_id=view_id, view=loading_view)
+        progress.update(loading_modal_data)
 
         # 4a. select up to 5 random users to show up as mentions in the canvas
         if len(participants) > 5:
@@ -468,275 +725,175 @@ def conversation_generate(ack: Ack, body, client: WebClient, view, logger: Logge
                 "canvas":canvas_result,
                 "current":":speech_balloon: Generating messages"
             }
-            loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-            client.views_update(view_id=view_id, view=loading_view)
+            progress.update(loading_modal_data)
 
 
     # 5. Build the conversation - one post at a time
     # determine how many posts are required
     total_posts = helper.rand_from_range_string(num_posts)
-    participant_ids = [participant['id'] for participant in participants]
     if topics is None or not isinstance(topics, str):
         custom_topics = [channel_topic]
     else:
         custom_topics = helper.string_to_list(topics)
     # length = helper.rand_from_range_string(post_length)
-    participant_info = []
 
-    data_counter = {
-        "posts": 0,
-        "replies": 0
+    # 5a. Plan every post up front (author, topic and number of replies)
+    post_plan = [
+        {
+            "author_id": random.choice(participants)["id"],
+            "topic": random.choice(custom_topics),
+            "total_replies": helper.rand_from_range_string(thread_replies)
+        }
+        for _ in range(total_posts)
+    ]
+    return {
+        # only what posting needs, this is stored in the job checkpoint
+        "participants": [_participant_info(participant) for participant in participants],
+        "custom_topics": custom_topics,
+        "canvas_result": canvas_result,
+        "post_plan": post_plan
     }
 
-    # loading_view = helper.loading_formatter(
-    #     posts=f"0/{total_posts}",
-    #     replies="Calculating...",
-    #     canvas=canvas_result,
-    #     current="Generating messages"
-    # )
-    # client.views_update(view_id=view_id, view=loading_view)
-    loading_modal_data = {
-        "users": len(participants),
-        "posts":f"0/{total_posts}",
-        "replies":"Calculating...",
-        "canvas":canvas_result,
-        "current":":speech_balloon: Generating messages"
+
+def _participant_info(user: dict) -> dict:
+    return {
+        'id': user["id"],
+        'name': user['name'],
+        'real_name': user['real_name'],
+        'display_name': user['profile'].get('display_name', ''),
+        'title': user['profile'].get('title', ''),
+        'avatar': user['profile'].get('image_192', '')
     }
-    loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-    client.views_update(view_id=view_id, view=loading_view)
 
-    for _ in range(total_posts):
-        if data_counter["posts"] > 0:
-            # loading_view = helper.loading_formatter(
-            #     posts=f"{data_counter['posts']}/{total_posts}",
-            #     replies=f"{data_counter['replies']} so far",
-            #     canvas=canvas_result,
-            #     current="Generating message"
-            # )
-            # client.views_update(view_id=view_id, view=loading_view)
-            loading_modal_data = {
-                "users": len(participants),
-                "posts":f"{data_counter['posts']}/{total_posts}",
-                "replies":f"{data_counter['replies']} so far",
-                "canvas":canvas_result,
-                "current":":speech_balloon: Generating message"
-            }
-            loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-            client.views_update(view_id=view_id, view=loading_view)
-
-        # 5a. Fetch a post
-        # selecte a random user to be the author
-        author = random.choice(participants)
-        participant_info = {
-            'id': author["id"],
-            'name': author['name'],
-            'real_name': author['real_name'],
-            'display_name': author['profile'].get('display_name', ''),
-            'title': author['profile'].get('title', ''),
-            'avatar': author['profile'].get('image_192', '')
-        }
-        post_topic = random.choice(custom_topics)
-        message_content = devxp.fetch_message(
-            author=f"<@{author['id']}>",
-            conversation_participants=participant_ids,
-            purpose=channel_purpose,
-            channel_topic=channel_topic,
-            topic=post_topic,
-            length=post_length,
-            tone=tone,
-            emoji_density=emoji_density,
-            custom_prompt=custom_prompt
-        )
 
-        # some basic error handling in case the LLM throws a wobbly
-        if "author" not in message_content or "message" not in message_content:
-            continue
+def _generation_pipeline(strategy: str, plans: list, settings: dict, logger: Logger):
+    """Yield (plan, {"post", "replies"} or None) for each plan, in order, generated ahead of posting"""
+    if strategy == "single_shot":
+        yield from pipeline.ordered_map(lambda plan: _generate_post_with_replies(plan, settings, logger), plans)
+        return
 
-        logger.info(f"MESSAGE_CONTENT {message_content}")
+    def generated_posts():
+        # several posts per streamed LLM call, each handed on as soon as the model has written it
+        batches = pipeline.chunked(plans, pipeline.GENERATION_BATCH_SIZE)
+        current, done = None, 0
+        for batch, value in pipeline.ordered_stream(lambda batch: _stream_batch(batch, settings, logger), batches, lookahead=pipeline.GENERATION_CONCURRENCY):
+            if batch is not current:
+                current, done = batch, 0
+            if isinstance(value, Exception):
+                yield from ((plan, None) for plan in batch[done:])
+                continue
+            done += 1
+            yield value
 
-        # 5b. Send the post
-        message_result = message.send_message(
-            client=client,
-            selected_channel=channel_id,
-            post=message_content,
-            participant=participant_info,
-            history_id=history_row["id"]
+    # replies are generated per post, again ahead of posting
+    for (plan, _), generated in pipeline.ordered_map(lambda item: _generate_replies(item[0], item[1], settings, logger), generated_posts()):
+        yield plan, generated
+
+
+def _generate_post_with_replies(plan: dict, settings: dict, logger: Logger):
+    """
+    Fetch a post with its thread replies and reacjis in one LLM call, falling back to the
+    batched calls (post, then replies) if the model's answer is unusable. Runs on the
+    pipeline's worker threads.
+    """
+    try:
+        generated = devxp.fetch_post_with_replies(
+            author=plan["author_id"],
+            conversation_participants=settings["participant_ids"],
+            purpose=settings["channel_purpose"],
+            channel_topic=settings["channel_topic"],
+            topic=plan["topic"],
+            length=settings["post_length"],
+            tone=settings["tone"],
+            emoji_density=settings["emoji_density"],
+            custom_prompt=settings["custom_prompt"],
+            replies=plan["total_replies"]
         )
+    except Exception as e:
+        logger.error(f"Single-shot generation failed, falling back to separate calls: {e}")
+        generated = None
+
+    if generated is not None:
+        generated["replies"] = generated["replies"][:plan["total_replies"]]
+        return generated
+
+    post = _fetch_post(plan, _post_settings(settings), logger)
+    return _generate_replies(plan, post, settings, logger)
+
+
+def _post_settings(settings: dict) -> dict:
+    return {
+        "conversation_participants": settings["participant_ids"],
+        "purpose": settings["channel_purpose"],
+        "channel_topic": settings["channel_topic"],
+        "length": settings["post_length"],
+        "tone": settings["tone"],
+        "emoji_density": settings["emoji_density"],
+        "custom_prompt": settings["custom_prompt"]
+    }
 
-        thread_messages = [{
-            "text": message_result["message"]["text"],
-            "author_type": "bot",
-            "user": {"id": author["id"]}
-        }]
 
-        logger.info(f"MESSAGE_RESULT {message_result}")
+def _stream_batch(plans: list, settings: dict, logger: Logger):
+    """
+    Yield (plan, post) for several plans, in order, from one streamed LLM call: each post
+    is yielded as soon as it and the ones before it have been written, while the model is
+    still writing the rest. Posts the model left out or got wrong are fetched with one
+    call each. Runs on the pipeline's worker threads, so it must not touch Slack or the
+    loading modal.
+    """
+    common = _post_settings(settings)
+    posts = [None] * len(plans)
+    next_position = 0
+    if len(plans) > 1:
+        try:
+            for position, post in devxp.stream_messages([{"author": plan["author_id"], "topic": plan["topic"]} for plan in plans], **common):
+                posts[position] = post
+                while next_position < len(plans) and posts[next_position] is not None:
+                    yield plans[next_position], posts[next_position]
+                    next_position += 1
+        except Exception as e:
+            logger.error(f"Batched post generation failed, falling back to one call per post: {e}")
 
-        if "ok" in message_result and message_result["ok"]:
-            data_counter["posts"] += 1
-            # 5c. Attach reacjis
-            message.send_reacjis(
-                client=client,
-                channel_id=channel_id,
-                message_ts=message_result["ts"],
-                reacji=message_content["reacjis"]
-            )
-            # loading_view = helper.loading_formatter(
-            #     posts=f"{data_counter['posts']}/{total_posts}",
-            #     replies=f"{data_counter['replies']} so far",
-            #     canvas=canvas_result,
-            #     current="Generating replies"
-            # )
-            # client.views_update(view_id=view_id, view=loading_view)
-            loading_modal_data = {
-                "users": len(participants),
-                "posts":f"{data_counter['posts']}/{total_posts}",
-                "replies":f"{data_counter['replies']} so far",
-                "canvas":canvas_result,
-                "current":":speech_balloon: Generating replies"
-            }
-            loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-            client.views_update(view_id=view_id, view=loading_view)
+    for position in range(next_position, len(plans)):
+        if posts[position] is None:
+            posts[position] = _fetch_post(plans[position], common, logger)
+        yield plans[position], posts[position]
 
-        total_replies = helper.rand_from_range_string(thread_replies)
 
-        if total_replies > 0:
-            # 5c. Fetch replies
-            reply_content = devxp.thread(
-                description=channel_purpose,
-                topic=channel_topic,
-                thread=thread_messages,
-                members=participant_ids,
-                replies=total_replies
-            )
-            # 5d. Send replies
-            for r in reply_content:
-                logger.debug(f"REPLY: {r}")
-                reply_participant = next((p for p in participants if p['id'] == r["author"]), False)
-                if not reply_participant:
-                    logger.error(f"Failed to find a matching conversation participant for author {r['author']}! Skipping")
-                    continue
+def _fetch_post(plan: dict, common: dict, logger: Logger):
+    try:
+        post = devxp.fetch_message(author=f"<@{plan['author_id']}>", topic=plan["topic"], **common)
+        if "author" in post and "message" in post:
+            return post
+    except Exception as e:
+        logger.error(f"Post generation failed: {e}")
+    return None
 
-                reply_participant_info = {
-                    'id': reply_participant["id"],
-                    'name': reply_participant['name'],
-                    'real_name': reply_participant['real_name'],
-                    'display_name': reply_participant['profile'].get('display_name', ''),
-                    'title': reply_participant['profile'].get('title', ''),
-                    'avatar': reply_participant['profile'].get('image_192', '')
-                }
-                replies_result = message.send_message(
-                    client=client,
-                    selected_channel=channel_id,
-                    post=r,
-                    participant=reply_participant_info,
-                    thread_ts=message_result["ts"],
-                    history_id=history_row["id"]
-                )
 
-                if "ok" in replies_result and replies_result["ok"]:
-                    data_counter["replies"] += 1
-                    # loading_view = helper.loading_formatter(
-                    #     posts=f"{data_counter['posts']}/{total_posts}",
-                    #     replies=f"{data_counter['replies']} so far",
-                    #     canvas=canvas_result,
-                    #     current="Generating replies"
-                    # )
-                    # client.views_update(view_id=view_id, view=loading_view)
-                    loading_modal_data = {
-                        "users": len(participants),
-                        "posts":f"{data_counter['posts']}/{total_posts}",
-                        "replies":f"{data_counter['replies']} so far",
-                        "canvas":canvas_result,
-                        "current":":speech_balloon: Generating replies"
-                    }
-                    loading_view = helper.render_block_kit(template="loading_details.json", data=loading_modal_data)
-                    client.views_update(view_id=view_id, view=loading_view)
-                    message.send_reacjis(
-                        client=client,
-                        channel_id=channel_id,
-                        message_ts=replies_result["ts"],
-                        reacji=r["reacjis"]
-                    )
+def _generate_replies(plan: dict, message_content: dict, settings: dict, logger: Logger):
+    """
+    Fetch the thread replies for a generated post; runs on the pipeline's worker threads.
+    If the replies can't be generated the post is still returned, without replies.
+    """
+    if not message_content:
+        return None
 
-    # 6. Show results modal
-     # update the history for query time
-    query_time = worker.get_time() - start_time
-    logger.info(f"Start time = {start_time}; query time: {query_time}")
-    db.update("history", {"query_time": query_time}, {"id": history_row["id"]})
-
-    # log an entry to the analytics table
-    # total_posts_sent = db.fetch_one("SELECT COUNT(*) AS total_posts_sent FROM messages WHERE history_id = %s", (history_row["id"],))["total_posts_sent"]
-    total_posts_sent = data_counter["posts"] + data_counter["replies"]
-    db.insert("analytics", {"user_id": current_user["id"], "messages": total_posts_sent})
-
-    time_in_seconds = query_time/1000
-    minutes, seconds = divmod(time_in_seconds, 60)
-    formatted_time = f"{int(minutes):2d}:{int(seconds):02d}"
-    logger.info(f"Formatted time: {formatted_time}")
-    
-    # Update modal to show success
-    client.views_update(
-        view_id=view_id,
-        view={
-            "type": "modal",
-            "title": {
-                "type": "plain_text",
-                "text": "Conversation Generated"
-            },
-            "close": {
-                "type": "plain_text",
-                "text": "Close",
-                "emoji": True
-            },
-            "blocks": [
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "✅ Conversation generated successfully!",
-                        "emoji": True
-                    }
-                },
-                {
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f":stopwatch: _Conversation created in {formatted_time}_"
-                        }
-                    ]
-                },
-                {
-                    "type": "section",
-                    "fields": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Posts:* {data_counter['posts']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Total Replies:* {data_counter['replies']}"
-                        },
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Participants:* {len(participants)}"
-                        }
-                    ]
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"*Topics:* {', '.join(custom_topics) if custom_topics else channel_topic}"
-                    }
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"👉 *View the conversation in the <#{channel_id}> to see the results!*"
-                    }
-                }
-            ]
-        }
-    )
+    replies = []
+    if plan["total_replies"] > 0:
+        thread_messages = [{
+            "text": message_content["message"],
+            "author_type": "bot",
+            "user": {"id": plan["author_id"]}
+        }]
+        try:
+            replies = devxp.thread(
+                description=settings["channel_purpose"],
+                topic=settings["channel_topic"],
+                thread=thread_messages,
+                members=settings["participant_ids"],
+                replies=plan["total_replies"]
+            )
+        except Exception as e:
+            logger.error(f"Error generating replies, posting without them: {e}")
+
+    return {"post": message_content, "replies": replies}
@@ -1,22 +1,22 @@
 from logging import Logger
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from slack_bolt import Ack, Say
+from slack_bolt import Ack, Say, BoltContext
 from ai import devxp
 from utils.database import Database, DatabaseConfig
-from utils import builder
+from utils import builder, helper, jobs
 from utils.conversation_model import Conversation
 from utils.app_view import render_app_view
-import json, os
 
 db = Database(DatabaseConfig())
 
-def create_channels(ack: Ack, body, client: WebClient, view, logger: Logger, say: Say):
+def create_channels(ack: Ack, body, client: WebClient, view, logger: Logger, say: Say, context: BoltContext):
     ack()
     # Move the channel generation logic from handle_generate_channels here
     user_id = body["user"]["id"]
     # Fetch team ID
     app_installed_team_id = body["view"]["app_installed_team_id"]
+    view_modal = None
     try:
         state_values = view["state"]["values"]
 
@@ -38,177 +38,171 @@ def create_channels(ack: Ack, body, client: WebClient, view, logger: Logger, say
         customer_name = state_values.get("customer_name_input", {}).get("customer_name", {}).get("value")
         user_inputs[user_id]["customer_name"] = customer_name
         
-        # Rest of your existing channel generation logic from handle_generate_channels...
         # Show loading modal
-        # view_modal = client.views_open(
-        #     trigger_id=body["trigger_id"],
-        #     view={
-        #         "type": "modal",
-        #         "title": {
-        #             "type": "plain_text",
-        #             "text": "Figuring out channels..."
-        #         },
-        #         "blocks": [
-        #             {
-        #                 "type": "section",
-        #                 "text": {
-        #                     "type": "mrkdwn",
-        #                     "text": "🔄 Generating channels based on your input...\nThis may take a few moments."
-        #                 }
-        #             }
-        #         ]
-        #     }
-        # )
-
-        view_path = os.path.join("block_kit", "loading.json")
-        with open(view_path, 'r') as file:
-            loading_modal = json.load(file)
-        view_modal =client.views_open(trigger_id=body["trigger_id"], view=loading_modal)
-
-        try:
+        view_modal = client.views_open(trigger_id=body["trigger_id"], view=helper.load_block_kit("loading.json"))
 
-            channels_list = devxp.fetch_channels(customer_name, use_case)
-            # created_channels = logistics._send_channels(client, user_id, channels_list)
-            created_channels = []
-            blocks = []
-            for channel_def in channels_list:
-                logger.info(channel_def)
-                try:
-                    # channel_created = client.conversations_create(
-                    #     name=channel_def["name"],
-                    #     is_private=channel_def["is_private"]==1
-                    # )
-                    # # Set channel topic and purpose if provided
-                    # if "topic" in channel_def:
-                    #     client.conversations_setTopic(
-                    #         channel=channel_created["channel"]["id"],
-                    #         topic=channel_def["topic"]
-                    #     )
-                    
-                    # if "description" in channel_def:
-                    #     client.conversations_setPurpose(
-                    #         channel=channel_created["channel"]["id"], 
-                    #         purpose=channel_def["description"]
-                    #     )
-                    
-                    # # Add user as member and channel owner
-                    # client.conversations_invite(
-                    #     channel=channel_created["channel"]["id"],
-                    #     users=user_id
-                    # )
-
-                    conversation = Conversation(
-                        channel_name=channel_def["name"],
-                        channel_topic=channel_def["topic"],
-                        channel_description=channel_def["description"],
-                        channel_is_private=channel_def["is_private"]
-                    ).format()
-                    created_channels.append(conversation)
+        # The LLM call can take longer than Slack will wait, so it runs as a background job
+        jobs.submit(
+            "create_channels",
+            {
+                "view_id": view_modal["view"]["id"],
+                "user_id": user_id,
+                "app_installed_team_id": app_installed_team_id,
+                "use_case": use_case,
+                "customer_name": customer_name
+            },
+            context=context,
+            client=client,
+            logger=logger
+        )
 
-                    blocks.append(
-                        {
-                            "type": "rich_text_section",
-                            "elements": [
-                                {
-                                    "type": "text",
-                                    "text": f"#{channel_def['name']}{' (private)' if channel_def['is_private'] else ''}"
-                                }
-                            ]
-                        }
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error creating channel {channel_def['name']}: {e}")
-                    continue
-            
-            result = builder.get_user_selections(user_id=user_id, app_installed_team_id=app_installed_team_id, logger=logger)
-            logger.debug(created_channels)
+    except Exception as e:
+        logger.error(f"Error in channel creator submission: {e}")
+        if view_modal:
+            _show_error(client, view_modal["view"]["id"], e)
 
-            # Fix: Store both the channels and use case in a dictionary
-            result["channels"]["create"] = {
-                "channels": created_channels,
-                "use_case": use_case
+def _error_view(error: Exception) -> dict:
+    return {"type": "modal", "title": {"type": "plain_text", "text": "Creating Channels"}, "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"❌ Error creating channels: {str(error)}"
+                }
             }
+        ]}
 
-            # now update the database row
-            builder.save_user_selections(
-                user_id=user_id,
-                app_installed_team_id=app_installed_team_id,
-                selections=result,
-                logger=logger
-            )
-            
+@jobs.handler("create_channels", error_view=_error_view)
+def generate_channels(client: WebClient, job: jobs.Job, logger: Logger):
+    view_id = job.payload["view_id"]
+    user_id = job.payload["user_id"]
+    app_installed_team_id = job.payload["app_installed_team_id"]
+    use_case = job.payload["use_case"]
+    customer_name = job.payload["customer_name"]
+    try:
+        channels_list = devxp.fetch_channels(customer_name, use_case)
+        # created_channels = logistics._send_channels(client, user_id, channels_list)
+        created_channels = []
+        blocks = []
+        for channel_def in channels_list:
+            logger.info(channel_def)
+            try:
+                # channel_created = client.conversations_create(
+                #     name=channel_def["name"],
+                #     is_private=channel_def["is_private"]==1
+                # )
+                # # Set channel topic and purpose if provided
+                # if "topic" in channel_def:
+                #     client.conversations_setTopic(
+                #         channel=channel_created["channel"]["id"],
+                #         topic=channel_def["topic"]
+                #     )
+                
+                # if "description" in channel_def:
+                #     client.conversations_setPurpose(
+                #         channel=channel_created["channel"]["id"], 
+                #         purpose=channel_def["description"]
+                #     )
+                
+                # # Add user as member and channel owner
+                # client.conversations_invite(
+                #     channel=channel_created["channel"]["id"],
+                #     users=user_id
+                # )
 
-            # TODO: Could store this in some temporary place to reference on the builder main view
-            # Close loading modal
-            client.views_update(
-                view_id=view_modal["view"]["id"],
-                view={
-                    "type": "modal", 
-                    "title": {
-                        "type": "plain_text", 
-                        "text": "Creating Channels"
-                    }, 
-                    "close": {
-                        "type": "plain_text", 
-                        "text": "OK"
-                    },
-                    "callback_id": "modal_channel_creater_result",
-                    "notify_on_close": True,
-                    "blocks": [
-                        {
-                            "type": "section",
-                            "text": {
-                                "type": "mrkdwn",
-                                "text": f"{len(created_channels)} channels to be created. Note that these channels have not been created yet. They will be created when the demo content is generated.\n" 
+                conversation = Conversation(
+                    channel_name=channel_def["name"],
+                    channel_topic=channel_def["topic"],
+                    channel_description=channel_def["description"],
+                    channel_is_private=channel_def["is_private"]
+                ).format()
+                created_channels.append(conversation)
+
+                blocks.append(
+                    {
+                        "type": "rich_text_section",
+                        "elements": [
+                            {
+                                "type": "text",
+                                "text": f"#{channel_def['name']}{' (private)' if channel_def['is_private'] else ''}"
                             }
-                        },
-                        {
-                            "type": "rich_text",
-                            "elements": [
-                                {
-                                    "type": "rich_text_list",
-                                    "style": "bullet",
-                                    "indent": 0,
-                                    "elements": blocks
-                                }
-                            ]
-                        }
-                    ]
+                        ]
                     }
-            )
-            # render_app_view(
-            #     client=client,
-            #     user_id=user_id,
-            #     app_installed_team_id=app_installed_team_id,
-            #     view_type="builder_step_1",
-            #     logger=logger
-            # )
-        except Exception as e:
-            logger.error(f"Error in channel creation: {e}")
+                )
+                
+            except Exception as e:
+                logger.error(f"Error creating channel {channel_def['name']}: {e}")
+                continue
+        
+        result = builder.get_user_selections(user_id=user_id, app_installed_team_id=app_installed_team_id, logger=logger)
+        logger.debug(created_channels)
 
-    except Exception as e:
-        logger.error(f"Error in channel creator submission: {e}")
-        # client.chat_postMessage(
-        #     channel=user_id,
-        #     text=f"❌ Error creating channels: {str(e)}"
-        # )
-        # say(
-        #     channel=user_id,
-        #     text=f"❌ Error creating channels: {str(e)}"
-        # )
+        # Fix: Store both the channels and use case in a dictionary
+        result["channels"]["create"] = {
+            "channels": created_channels,
+            "use_case": use_case
+        }
+
+        # now update the database row
+        builder.save_user_selections(
+            user_id=user_id,
+            app_installed_team_id=app_installed_team_id,
+            selections=result,
+            logger=logger
+        )
+        
+
+        # TODO: Could store this in some temporary place to reference on the builder main view
+        # Close loading modal
         client.views_update(
-            view_id=view_modal["view"]["id"],
-            view={"type": "modal", "title": {"type": "plain_text", "text": "Creating Channels"}, "blocks": [
+            view_id=view_id,
+            view={
+                "type": "modal", 
+                "title": {
+                    "type": "plain_text", 
+                    "text": "Creating Channels"
+                }, 
+                "close": {
+                    "type": "plain_text", 
+                    "text": "OK"
+                },
+                "callback_id": "modal_channel_creater_result",
+                "notify_on_close": True,
+                "blocks": [
                     {
                         "type": "section",
                         "text": {
                             "type": "mrkdwn",
-                            "text": f"❌ Error creating channels: {str(e)}"
+                            "text": f"{len(created_channels)} channels to be created. Note that these channels have not been created yet. They will be created when the demo content is generated.\n" 
                         }
+                    },
+                    {
+                        "type": "rich_text",
+                        "elements": [
+                            {
+                                "type": "rich_text_list",
+                                "style": "bullet",
+                                "indent": 0,
+                                "elements": blocks
+                            }
+                        ]
                     }
-                ]}
+                ]
+                }
         )
+        # render_app_view(
+        #     client=client,
+        #     user_id=user_id,
+        #     app_installed_team_id=app_installed_team_id,
+        #     view_type="builder_step_1",
+        #     logger=logger
+        # )
+    except Exception as e:
+        logger.error(f"Error in channel creation: {e}")
+        _show_error(client, view_id, e)
+
+def _show_error(client: WebClient, view_id: str, error: Exception):
+    client.views_update(view_id=view_id, view=_error_view(error))
 
 def select_channels(ack: Ack, body, client: WebClient, view, logger: Logger, say: Say):
     ack()
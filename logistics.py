@@ -2,8 +2,9 @@ from slack_sdk.errors import SlackApiError
 from objects import Database, DatabaseConfig
 from typing import Dict, Any
 import logging
-import time
 import utils.worker as worker
+from utils.rate_limit import scheduler
+from utils import reactions, message_log
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -72,7 +73,9 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
         if "reacjis" in post and post["reacjis"]:
             for reaction in post["reacjis"]:
                 try:
-                    client.reactions_add(
+                    scheduler.call(
+                        client=client,
+                        method="reactions_add",
                         channel=selected_channel,
                         timestamp=main_post["ts"],
                         name=reaction.strip(':')
@@ -130,7 +133,9 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
                 if "reacjis" in reply and reply["reacjis"]:
                     for reaction in reply["reacjis"]:
                         try:
-                            client.reactions_add(
+                            scheduler.call(
+                                client=client,
+                                method="reactions_add",
                                 channel=selected_channel,
                                 timestamp=reply_post["ts"],
                                 name=reaction.strip(':')
@@ -139,9 +144,6 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
                             logger.error(f"Error adding reaction {reaction} to reply post {reply_post['ts']}: {e}")
                             continue
 
-        # Add slight delay between posts to avoid rate limits
-        time.sleep(1)
-
     except SlackApiError as e:
         logger.error(f"Error posting message to channel: {e}")
     
@@ -219,11 +221,12 @@ def _send_channels(client: dict, user_id: str, channels_list: list):
 
 def send_message(client, selected_channel: str, post: dict, participant: dict = None, thread_ts: str = False, history_id: int = None):
     event_type = "converse_reply_posted" if thread_ts else "converse_message_posted"
-    db = Database(DatabaseConfig())
     try:
         if participant:
             if thread_ts:
-                api_result = client.chat_postMessage(
+                api_result = scheduler.call(
+                    client=client,
+                    method="chat_postMessage",
                     channel=selected_channel,
                     text=post["message"],
                     username=participant["real_name"],
@@ -239,7 +242,9 @@ def send_message(client, selected_channel: str, post: dict, participant: dict =
                     }
                 )
             else:
-                api_result = client.chat_postMessage(
+                api_result = scheduler.call(
+                    client=client,
+                    method="chat_postMessage",
                     channel=selected_channel,
                     text=post["message"],
                     username=participant["real_name"],
@@ -254,15 +259,13 @@ def send_message(client, selected_channel: str, post: dict, participant: dict =
                     }
                 )
 
-            # Log the message to the database
-            message_ts = api_result["ts"]
-            db.insert("messages", {
-                "message_ts": message_ts,
-                "history_id": history_id if history_id else 0
-            })
+            # Log the message to the database (written in batches, see message_log.flush)
+            message_log.record(api_result["ts"], history_id, reply=bool(thread_ts))
             return api_result
         else:
-            api_result = client.chat_postMessage(
+            api_result = scheduler.call(
+                client=client,
+                method="chat_postMessage",
                 channel=selected_channel,
                 text=post["message"],
                 thread_ts=thread_ts if thread_ts else False,
@@ -275,17 +278,7 @@ def send_message(client, selected_channel: str, post: dict, participant: dict =
         logger.error(f"Error in send_message: {e}")
     
 
-def send_reacjis(client, channel_id, message_ts: str, reacji):
-    if not isinstance(reacji, list):
-        reacji = [reacji]
-    
-    for r in reacji:
-        try:
-            client.reactions_add(
-                channel=channel_id,
-                timestamp=message_ts,
-                name=r.strip(':')
-            )
-        except Exception as e:
-            logger.error(f"Error adding reaction {reacji} to post {message_ts}: {e}")
-            continue
\ No newline at end of file
+def send_reacjis(client, channel_id, message_ts: str, reacji, history_id: int = None):
+    results = reactions.dispatcher.add(client, channel_id, message_ts, reacji)
+    message_log.record_reactions(history_id, sum(1 for result in results if result["ok"]))
+    return results
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import sys
+import logging
+import argparse
+
+from utils.database import Database, DatabaseConfig
+from utils.migrations import Migrator
+from utils.partitions import PartitionManager
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply the database migrations in migrations/")
+    parser.add_argument("--status", action="store_true", help="list the migrations and whether they have been applied")
+    parser.add_argument("--target", type=int, help="only migrate up to this version")
+    parser.add_argument("--dry-run", action="store_true", help="show what would be applied without applying it")
+    parser.add_argument("--check-indexes", action="store_true", help="EXPLAIN the hot queries and fail if one can't use its index")
+    parser.add_argument("--archive", action="store_true", help="also archive the partitions older than ARCHIVE_AFTER_MONTHS")
+    args = parser.parse_args(argv)
+
+    db = Database(DatabaseConfig())
+    migrator = Migrator(db)
+
+    if args.status:
+        for migration in migrator.status():
+            state = f"applied {migration['applied_at']:%Y-%m-%d %H:%M}" if migration["applied_at"] else "pending"
+            print(f"{migration['version']:04d}_{migration['name']}: {state}{' (modified since)' if migration['modified'] else ''}")
+        return 0
+
+    if args.check_indexes:
+        results = migrator.check_indexes()
+        for result in results:
+            via = f" via {result['via']}" if result["used"] else ""
+            print(f"{'ok     ' if result['used'] else 'MISSING'} {result['index']}{via}: {result['query']}")
+        return 0 if all(result["used"] for result in results) else 1
+
+    applied = migrator.migrate(target=args.target, dry_run=args.dry_run)
+    logger.info(f"{'Would apply' if args.dry_run else 'Applied'} {len(applied)} migration(s)")
+
+    if not args.dry_run:
+        # the partitioned tables need their upcoming months to exist before anything is written
+        result = PartitionManager(db).maintain(archive=args.archive)
+        logger.info(f"Created {len(result['created'])} partition(s), archived {len(result['archived'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
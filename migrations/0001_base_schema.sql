@@ -0,0 +1,41 @@
+-- Tables the app has always used, as the code reads and writes them. IF NOT EXISTS so
+-- databases created before migrations existed are adopted as they are.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    member_id TEXT NOT NULL,
+    team_id TEXT,
+    enterprise_id TEXT,
+    api_key TEXT,
+    date_updated TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS history (
+    id SERIAL PRIMARY KEY,
+    conversation_id INTEGER,
+    channel_id TEXT,
+    user_id INTEGER,
+    query_time BIGINT -- milliseconds
+);
+
+-- history_id is 0 for messages posted outside a logged run, so there is no foreign key
+CREATE TABLE IF NOT EXISTS messages (
+    id SERIAL PRIMARY KEY,
+    message_ts TEXT NOT NULL,
+    history_id INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS analytics (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    messages INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS user_builder_selections (
+    id SERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    app_installed_team_id TEXT,
+    builder_options JSONB,
+    mode TEXT,
+    last_updated TIMESTAMPTZ DEFAULT now()
+);
@@ -0,0 +1,30 @@
+-- users.member_id and user_builder_selections.user_id are looked up on every request and
+-- are the conflict targets of the get-or-create and upsert writes, so they must be unique.
+
+-- users: keep the oldest row per member and repoint history/analytics at it
+CREATE TEMP TABLE users_duplicates ON COMMIT DROP AS
+    SELECT id, MIN(id) OVER (PARTITION BY member_id) AS keep_id FROM users;
+DELETE FROM users_duplicates WHERE id = keep_id;
+UPDATE history SET user_id = d.keep_id FROM users_duplicates d WHERE history.user_id = d.id;
+UPDATE analytics SET user_id = d.keep_id FROM users_duplicates d WHERE analytics.user_id = d.id;
+DELETE FROM users USING users_duplicates d WHERE users.id = d.id;
+
+-- builder selections: keep the most recently updated row per user
+DELETE FROM user_builder_selections a
+    USING user_builder_selections b
+    WHERE a.user_id = b.user_id
+    AND (COALESCE(a.last_updated, '-infinity'), a.ctid) < (COALESCE(b.last_updated, '-infinity'), b.ctid);
+
+-- databases where the upsert already worked have a unique constraint on user_id under some name
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = 'user_builder_selections'::regclass AND i.indisunique AND i.indnatts = 1 AND a.attname = 'user_id'
+    ) THEN
+        CREATE UNIQUE INDEX user_builder_selections_user_id_key ON user_builder_selections (user_id);
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS users_member_id_key ON users (member_id);
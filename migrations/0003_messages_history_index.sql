@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- messages grows with every post; build the index without blocking the message log writes.
+-- Looking up a run's messages filters on history_id. Once 0008 partitions messages by month
+-- this index is adopted by the legacy partition and each partition gets its own copy of
+-- the partitioned messages_history_id_idx, which utils.migrations.HOT_QUERIES checks.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS messages_history_id_idx ON messages (history_id);
@@ -0,0 +1,19 @@
+-- Job queue used by utils.jobs and jobs_worker.py
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    checkpoint JSONB,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    team_id TEXT,
+    enterprise_id TEXT,
+    is_enterprise_install BOOLEAN NOT NULL DEFAULT FALSE,
+    worker TEXT,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    heartbeat_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS jobs_status_id_idx ON jobs (status, id);
@@ -0,0 +1,12 @@
+-- Content-addressed AI response cache used by ai.cache (AI_CACHE_BACKEND=postgres)
+
+CREATE TABLE IF NOT EXISTS ai_response_cache (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    response JSONB NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_hit_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ai_response_cache_last_hit_idx ON ai_response_cache (last_hit_at);
@@ -0,0 +1,42 @@
+-- Counters kept up to date as runs post (utils.message_log) and as they finish
+-- (utils.analytics), so neither the end-of-run accounting nor reporting has to count
+-- rows of messages or analytics.
+
+CREATE TABLE IF NOT EXISTS history_counters (
+    history_id INTEGER PRIMARY KEY,
+    posts INTEGER NOT NULL DEFAULT 0,
+    replies INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- one row per user and day, added to as each run finishes
+CREATE TABLE IF NOT EXISTS daily_user_usage (
+    day DATE NOT NULL,
+    user_id INTEGER NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    posts INTEGER NOT NULL DEFAULT 0,
+    replies INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    query_time BIGINT NOT NULL DEFAULT 0, -- milliseconds
+    PRIMARY KEY (day, user_id)
+);
+
+-- the same per workspace the app was used in
+CREATE TABLE IF NOT EXISTS daily_team_usage (
+    day DATE NOT NULL,
+    team_id TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    posts INTEGER NOT NULL DEFAULT 0,
+    replies INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    query_time BIGINT NOT NULL DEFAULT 0, -- milliseconds
+    PRIMARY KEY (day, team_id)
+);
+
+-- Runs logged before there were counters. messages doesn't record whether a message was
+-- a reply, so they are all counted as posts; history has no dates to backfill the daily
+-- tables from.
+INSERT INTO history_counters (history_id, posts)
+SELECT history_id, COUNT(*) FROM messages WHERE history_id <> 0 GROUP BY history_id
+ON CONFLICT (history_id) DO NOTHING;
@@ -0,0 +1,11 @@
+-- Runs per workspace, day and query time bucket, added to by utils.analytics.finish_run.
+-- Bucket b holds query times in [1.2^b, 1.2^(b+1)) milliseconds, so the dashboard can read
+-- p50/p95 query times off a few dozen rows per day instead of the history table.
+
+CREATE TABLE IF NOT EXISTS daily_query_time_histogram (
+    day DATE NOT NULL,
+    team_id TEXT NOT NULL,
+    bucket SMALLINT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, team_id, bucket)
+);
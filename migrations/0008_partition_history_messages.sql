@@ -0,0 +1,70 @@
+-- history and messages grow by a row per run / posted message forever. Make both
+-- partitioned by month on a new created_at column so old months can be detached and
+-- archived (see utils.partitions) instead of the tables and their indexes growing
+-- without bound.
+--
+-- The existing tables become the first partition of each, covering everything before
+-- the current month; their rows get a created_at of 1970-01-01 since nothing recorded
+-- when they were written. A default partition catches rows for a month whose partition
+-- wasn't created in time, utils.partitions moves them out when it creates it.
+
+-- history
+ALTER TABLE history RENAME TO history_legacy;
+ALTER INDEX IF EXISTS history_pkey RENAME TO history_legacy_pkey;
+ALTER TABLE history_legacy ADD COLUMN created_at TIMESTAMPTZ NOT NULL DEFAULT '1970-01-01 00:00:00+00';
+ALTER TABLE history_legacy ALTER COLUMN created_at DROP DEFAULT;
+
+CREATE TABLE history (
+    id INTEGER NOT NULL DEFAULT nextval('history_id_seq'),
+    conversation_id INTEGER,
+    channel_id TEXT,
+    user_id INTEGER,
+    query_time BIGINT, -- milliseconds
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE history_id_seq OWNED BY history.id;
+
+-- messages; history_id is 0 for messages posted outside a logged run, so there is no foreign key
+ALTER TABLE messages RENAME TO messages_legacy;
+ALTER INDEX IF EXISTS messages_pkey RENAME TO messages_legacy_pkey;
+ALTER INDEX IF EXISTS messages_history_id_idx RENAME TO messages_legacy_history_id_idx;
+ALTER TABLE messages_legacy ADD COLUMN created_at TIMESTAMPTZ NOT NULL DEFAULT '1970-01-01 00:00:00+00';
+ALTER TABLE messages_legacy ALTER COLUMN created_at DROP DEFAULT;
+
+CREATE TABLE messages (
+    id INTEGER NOT NULL DEFAULT nextval('messages_id_seq'),
+    message_ts TEXT NOT NULL,
+    history_id INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE messages_id_seq OWNED BY messages.id;
+-- created before attaching so messages_legacy_history_id_idx is adopted rather than rebuilt
+CREATE INDEX messages_history_id_idx ON messages (history_id);
+
+DO $$
+DECLARE
+    parent TEXT;
+    month TIMESTAMPTZ := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['history', 'messages'] LOOP
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)', parent, parent || '_legacy', month);
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_p' || to_char(month AT TIME ZONE 'UTC', 'YYYYMM'), parent, month, month + interval '1 month');
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END LOOP;
+END $$;
+
+-- partitions detached and exported by utils.partitions.PartitionManager.archive
+CREATE TABLE IF NOT EXISTS archived_partitions (
+    name TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    range_start TIMESTAMPTZ,
+    range_end TIMESTAMPTZ NOT NULL,
+    status TEXT NOT NULL DEFAULT 'detached', -- detached, then archived once exported and dropped
+    row_count BIGINT,
+    path TEXT,
+    detached_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    archived_at TIMESTAMPTZ
+);
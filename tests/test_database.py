@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+from unittest import mock
+
+from utils.database import AsyncDatabase, ConnectionPool, Database, DatabaseConfig
+from utils.partitions import PartitionManager
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 2, 1, tzinfo=timezone.utc)
+
+
+def test_range_query_bounds_created_at_on_both_sides():
+    query, params = Database.range_query("messages", START, END, where={"history_id": 7}, columns=["message_ts"], order_by="id")
+
+    assert query == "SELECT message_ts FROM messages WHERE created_at >= %s AND created_at < %s AND history_id = %s ORDER BY id"
+    assert params == (START, END, 7)
+
+
+def test_fetch_range_runs_the_bounded_query():
+    db = Database(DatabaseConfig())
+    with mock.patch.object(db, "fetch_all", return_value=[]) as fetch_all:
+        db.fetch_range("history", START, END)
+
+    fetch_all.assert_called_once_with("SELECT * FROM history WHERE created_at >= %s AND created_at < %s", (START, END))
+
+
+def test_async_fetch_range_runs_the_bounded_query():
+    db = AsyncDatabase(DatabaseConfig())
+    with mock.patch.object(db, "fetch_all", mock.AsyncMock(return_value=[])) as fetch_all:
+        asyncio.run(db.fetch_range("history", START, END, where={"user_id": 3}))
+
+    fetch_all.assert_awaited_once_with(
+        "SELECT * FROM history WHERE created_at >= %s AND created_at < %s AND user_id = %s", (START, END, 3)
+    )
+
+
+def test_new_partition_takes_only_its_month_from_the_default_partition():
+    db = mock.MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = {"stray": True}
+
+    PartitionManager(db)._create("messages", "messages_p202501", START, END, "messages_default")
+
+    statements = [(call.args[0], call.args[1] if len(call.args) > 1 else None) for call in cursor.execute.call_args_list]
+    assert ("SELECT EXISTS (SELECT 1 FROM messages_default WHERE created_at >= %s AND created_at < %s) AS stray", (START, END)) in statements
+    assert ("INSERT INTO messages_p202501 SELECT * FROM messages_default WHERE created_at >= %s AND created_at < %s", (START, END)) in statements
+
+
+def test_health_check_runs_without_holding_the_pool_lock():
+    pool = ConnectionPool(DatabaseConfig(pool_min_size=0, pool_max_size=1))
+    conn = mock.MagicMock(closed=False)
+    pool._idle.append((conn, 0))
+    locked = []
+
+    def try_lock():
+        acquired = pool._cond.acquire(blocking=False)
+        locked.append(not acquired)
+        if acquired:
+            pool._cond.release()
+
+    def select_one(query):
+        # other threads can check connections out and return them meanwhile
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+
+    conn.cursor.return_value.__enter__.return_value.execute.side_effect = select_one
+
+    assert pool.getconn() is conn
+    assert locked == [False]
+    assert pool.stats()["in_use"] == 1
@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+
+from utils.database import Database, DatabaseConfig
+from utils.message_log import MessageLogBuffer
+
+
+def normalised(query: str) -> str:
+    return " ".join(query.split())
+
+
+@pytest.fixture
+def db():
+    db = Database(DatabaseConfig())
+    db.cursor = mock.MagicMock()
+    return db
+
+
+def test_flush_writes_rows_and_counts_in_one_transaction(db):
+    buffer = MessageLogBuffer(db)
+    buffer._ensure_started = lambda: None
+    buffer.record("1.1", history_id=7)
+    buffer.record("1.2", history_id=7, reply=True)
+    buffer.record_reactions(7, 3)
+
+    with mock.patch("utils.database.execute_values") as execute_values:
+        assert buffer.flush() == 2
+
+    assert db.cursor.call_count == 1
+    cursor = db.cursor.return_value.__enter__.return_value
+    (insert, upsert) = execute_values.call_args_list
+    assert insert.args[0] is cursor and upsert.args[0] is cursor
+    assert insert.args[1] == "INSERT INTO messages (message_ts, history_id) VALUES %s"
+    assert insert.args[2] == [("1.1", 7), ("1.2", 7)]
+    assert "ON CONFLICT (history_id) DO UPDATE SET posts = history_counters.posts + EXCLUDED.posts, replies = history_counters.replies + EXCLUDED.replies, reactions = history_counters.reactions + EXCLUDED.reactions, updated_at = EXCLUDED.updated_at" in normalised(upsert.args[1])
+    assert [values[:4] for values in upsert.args[2]] == [(7, 1, 1, 3)]
+    assert buffer.pending() == 0
+
+
+def test_failed_flush_raises_and_keeps_everything_queued(db):
+    buffer = MessageLogBuffer(db)
+    buffer._ensure_started = lambda: None
+    buffer.record("1.1", history_id=7)
+
+    with mock.patch("utils.database.execute_values", side_effect=RuntimeError("db down")):
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+
+    assert buffer.pending() == 2
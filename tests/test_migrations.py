@@ -0,0 +1,67 @@
+import os
+import uuid
+from urllib.parse import urlparse
+
+import psycopg2
+import pytest
+
+from utils.database import Database, DatabaseConfig
+from utils.migrations import Migrator
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="needs DATABASE_URL pointing at a Postgres server")
+
+
+@pytest.fixture
+def scratch_db():
+    """A new, empty database on the DATABASE_URL server, dropped afterwards"""
+    url = urlparse(DATABASE_URL)
+    name = f"migrations_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(DATABASE_URL)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE {name}")
+    db = Database(DatabaseConfig(
+        host=url.hostname,
+        port=str(url.port or 5432),
+        database=name,
+        user=url.username,
+        password=url.password or "",
+        pool_min_size=0
+    ))
+    try:
+        yield db
+    finally:
+        db.pool.closeall()
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {name}")
+        admin.close()
+
+
+def missing(results):
+    return [f"{result['index']}: {result['query']}" for result in results if not result["used"]]
+
+
+def test_hot_queries_use_their_indexes(scratch_db):
+    migrator = Migrator(scratch_db)
+    migrator.migrate()
+
+    results = migrator.check_indexes()
+
+    assert results
+    assert not missing(results)
+
+
+def test_existing_unique_index_under_another_name_is_recognised(scratch_db):
+    migrator = Migrator(scratch_db)
+    migrator.migrate(target=1)
+    # as on databases where the upsert on user_id already worked before migrations existed
+    scratch_db.execute("CREATE UNIQUE INDEX legacy_selections_user_id ON user_builder_selections (user_id)")
+    migrator.migrate()
+
+    results = migrator.check_indexes()
+
+    assert not missing(results)
+    selections = next(result for result in results if result["index"] == "user_builder_selections (user_id)")
+    assert selections["via"] == "legacy_selections_user_id"
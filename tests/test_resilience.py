@@ -0,0 +1,71 @@
+import pytest
+import requests
+
+from ai.resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def half_open_policy() -> ResiliencePolicy:
+    # a zero cooldown makes the breaker half open as soon as it opens
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    policy = ResiliencePolicy(max_retries=0, breaker=breaker)
+    breaker.failure()
+    assert breaker.state == "half_open"
+    return policy
+
+
+@pytest.mark.parametrize("status", [400, 401, 413])
+def test_non_retryable_trial_closes_the_circuit(status):
+    policy = half_open_policy()
+    policy.before_call("fetch_channels")
+
+    error = http_error(status)
+    with pytest.raises(requests.HTTPError):
+        policy.retry_backoff("fetch_channels", error, 1)
+
+    assert policy.breaker.state == "closed"
+    assert policy.breaker.allow()
+
+
+def test_trial_without_an_answer_lets_another_trial_through():
+    policy = half_open_policy()
+    policy.before_call("fetch_channels")
+
+    with pytest.raises(ValueError):
+        policy.retry_backoff("fetch_channels", ValueError("bad payload"), 1)
+
+    assert policy.breaker.state == "half_open"
+    policy.before_call("fetch_channels")
+
+
+def test_abandoned_trial_lets_another_trial_through():
+    policy = half_open_policy()
+    policy.before_call("fetch_channels")
+    policy.abandoned()
+    policy.before_call("fetch_channels")
+
+
+def test_only_one_trial_at_a_time():
+    policy = half_open_policy()
+    policy.before_call("fetch_channels")
+    with pytest.raises(CircuitOpenError):
+        policy.before_call("fetch_channels")
+
+
+def test_retryable_trial_failure_opens_the_circuit_again():
+    policy = half_open_policy()
+    policy.breaker.cooldown = 60
+    policy.breaker.opened_at -= 60
+    policy.before_call("fetch_channels")
+
+    with pytest.raises(requests.HTTPError):
+        policy.retry_backoff("fetch_channels", http_error(503), 1)
+
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        policy.before_call("fetch_channels")
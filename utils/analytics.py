@@ -0,0 +1,118 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+from .database import Database, AsyncDatabase, DatabaseConfig
+from . import message_log
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+db = Database(DatabaseConfig())
+async_db = AsyncDatabase(DatabaseConfig())
+
+_COUNTERS = ("posts", "replies", "reactions")
+# query time histogram buckets grow by this factor, see migration 0007
+BUCKET_BASE = 1.2
+# times finish_run tries to write the buffered message log before giving up on the run
+FLUSH_ATTEMPTS = int(os.environ.get("FINISH_RUN_FLUSH_ATTEMPTS", "3"))
+
+
+def latency_bucket(query_time: int) -> int:
+    """The daily_query_time_histogram bucket of a query time in milliseconds"""
+    return int(math.log(max(query_time, 1), BUCKET_BASE))
+
+
+def bucket_upper_bound(bucket: int) -> float:
+    """The largest query time, in milliseconds, counted in a histogram bucket"""
+    return BUCKET_BASE ** (bucket + 1)
+
+
+def _rollup(table: str, key: str, key_type: str) -> str:
+    increments = ", ".join(f"{c} = d.{c} + EXCLUDED.{c}" for c in _COUNTERS + ("query_time",))
+    return f"""
+        INSERT INTO {table} AS d (day, {key}, runs, {', '.join(_COUNTERS)}, query_time)
+        SELECT current_date, %s::{key_type}, 1, {', '.join(_COUNTERS)}, %s::bigint FROM counts
+        WHERE %s::{key_type} IS NOT NULL
+        ON CONFLICT (day, {key}) DO UPDATE SET runs = d.runs + 1, {increments}
+    """
+
+
+# Closes a run in one statement: reads the run's counters (a primary key lookup), records
+# the query time on history, logs the analytics row and adds the run to the daily rollups
+# and the query time histogram.
+_FINISH_RUN = f"""
+    WITH counts AS (
+        SELECT {', '.join(f'COALESCE(SUM({c}), 0)::integer AS {c}' for c in _COUNTERS)}
+        FROM history_counters WHERE history_id = %s::integer
+    ), run AS (
+        UPDATE history SET query_time = %s::bigint
+        -- history is partitioned by month: bounding created_at (the row was written just
+        -- before the run started) lets the update skip the older partitions. Rows from
+        -- before migration 0008 have created_at 1970-01-01, so a run that was in flight
+        -- during the migration is matched in the legacy partition explicitly.
+        WHERE id = %s::integer AND (
+            created_at >= now() - make_interval(secs => %s::bigint / 1000.0 + 3600)
+            OR created_at = '1970-01-01 00:00:00+00'
+        )
+    ), logged AS (
+        INSERT INTO analytics (user_id, messages) SELECT %s::integer, posts + replies FROM counts
+    ), by_user AS ({_rollup("daily_user_usage", "user_id", "integer")}
+    ), by_team AS ({_rollup("daily_team_usage", "team_id", "text")}
+    ), latency AS (
+        INSERT INTO daily_query_time_histogram AS h (day, team_id, bucket, runs)
+        SELECT current_date, %s::text, %s::smallint, 1 WHERE %s::text IS NOT NULL
+        ON CONFLICT (day, team_id, bucket) DO UPDATE SET runs = h.runs + 1
+    )
+    SELECT {', '.join(_COUNTERS)} FROM counts
+"""
+
+
+def _params(history_id: int, user_id: int, query_time: int, team_id: Optional[str]) -> tuple:
+    return (
+        history_id,
+        query_time, history_id, query_time,
+        user_id,
+        user_id, query_time, user_id,
+        team_id, query_time, team_id,
+        team_id, latency_bucket(query_time), team_id,
+    )
+
+
+def _flush_message_log(history_id: int):
+    """
+    Writes the buffered message log, retrying with the buffer's flush interval between
+    attempts. Raises the last error so the run isn't closed with its posts uncounted.
+    """
+    for attempt in range(1, FLUSH_ATTEMPTS + 1):
+        try:
+            message_log.flush()
+            return
+        except Exception as e:
+            if attempt == FLUSH_ATTEMPTS:
+                logger.error(f"Run {history_id} not finished, message log still not written after {attempt} attempts: {e}")
+                raise
+            time.sleep(message_log.buffer.flush_interval)
+
+
+def finish_run(history_id: int, user_id: int, query_time: int, team_id: str = None) -> Dict[str, int]:
+    """
+    End-of-run accounting for a generation or thread extension: writes the buffered
+    message log (raising, and leaving the run open, if that keeps failing), then updates history, analytics, the daily user/team rollups and the
+    query time histogram.
+    Returns the run's {"posts", "replies", "reactions"}.
+    """
+    _flush_message_log(history_id)
+    counts = db.fetch_one(_FINISH_RUN, _params(history_id, user_id, query_time, team_id))
+    logger.info(f"Run {history_id} finished in {query_time}ms: {counts}")
+    return counts
+
+
+async def async_finish_run(history_id: int, user_id: int, query_time: int, team_id: str = None) -> Dict[str, int]:
+    """finish_run for the async runtime"""
+    await asyncio.to_thread(_flush_message_log, history_id)
+    counts = await async_db.fetch_one(_FINISH_RUN, _params(history_id, user_id, query_time, team_id))
+    logger.info(f"Run {history_id} finished in {query_time}ms: {counts}")
+    return counts
@@ -4,7 +4,6 @@ from logging import Logger
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from utils import builder
-from datetime import datetime, timezone
 from utils.database import Database, DatabaseConfig
 
 db = Database(DatabaseConfig())
@@ -56,11 +55,7 @@ def render_app_view(client: WebClient, user_id: str, app_installed_team_id: str,
                     block["element"]["initial_value"] = config[block["block_id"]]
             
             # Update the mode in the database
-            db.update(
-                "user_builder_selections", 
-                {"mode": 'builder', "last_updated": datetime.now(timezone.utc)},
-                {"user_id": user_id, "app_installed_team_id": app_installed_team_id}
-            )
+            builder.set_mode(user_id, app_installed_team_id, "builder")
 
             # TODO: FIX UP THIS! MAKE IT PRETTIER AND HANDLE ALL OTHER TYPES!
             # build custom_data from selected and to-create channels and apps
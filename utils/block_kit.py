@@ -0,0 +1,87 @@
+import os
+import re
+import glob
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+BLOCK_KIT_DIR = "block_kit"
+PLACEHOLDER = re.compile(r"\{([^{}\"]+)\}")
+
+# A compiled node is a function that takes the render data and returns a fresh copy of
+# that part of the template with its placeholders filled in.
+Node = Callable[[Dict[str, Any]], Any]
+
+
+def _compile_string(value: str) -> Node:
+    parts = PLACEHOLDER.split(value)
+    if len(parts) == 1:
+        return lambda data: value
+    # parts alternates literal text and placeholder names: [text, key, text, key, text]
+    literals = parts[0::2]
+    keys = parts[1::2]
+
+    def render(data):
+        out = [literals[0]]
+        for key, literal in zip(keys, literals[1:]):
+            out.append(str(data[key]) if key in data else "{" + key + "}")
+            out.append(literal)
+        return "".join(out)
+    return render
+
+
+def compile_template(template: Any) -> Node:
+    """
+    Precompile a Block Kit template into a tree of render functions. Only strings that
+    contain `{key}` placeholders do any work at render time; everything else is copied.
+    Values are inserted into Python strings (not JSON text), so quotes, backslashes and
+    newlines in them need no escaping.
+    """
+    if isinstance(template, dict):
+        items = [(key, compile_template(value)) for key, value in template.items()]
+        return lambda data: {key: node(data) for key, node in items}
+    if isinstance(template, list):
+        nodes = [compile_template(value) for value in template]
+        return lambda data: [node(data) for node in nodes]
+    if isinstance(template, str):
+        return _compile_string(template)
+    return lambda data: template
+
+
+class TemplateEngine:
+    """Loads and compiles every block_kit/*.json template once, then renders from the compiled form"""
+    def __init__(self, directory: str = BLOCK_KIT_DIR):
+        self.directory = directory
+        self._compiled: Dict[str, Node] = {}
+        self._lock = threading.Lock()
+
+    def preload(self):
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                self._get(os.path.basename(path))
+            except Exception as e:
+                logger.error(f"Error compiling Block Kit template {path}: {e}")
+
+    def _get(self, name: str) -> Node:
+        node = self._compiled.get(name)
+        if node is None:
+            with open(os.path.join(self.directory, name), 'r') as file:
+                node = compile_template(json.load(file))
+            with self._lock:
+                self._compiled[name] = node
+        return node
+
+    def load(self, name: str) -> Any:
+        """A fresh, mutable copy of a template with its placeholders left as-is"""
+        return self._get(name)({})
+
+    def render(self, name: str, data: Dict[str, Any]) -> Any:
+        return self._get(name)(data)
+
+
+engine = TemplateEngine()
+engine.preload()
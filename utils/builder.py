@@ -1,27 +1,185 @@
 import os
+import copy
 import json
+import time
+import select
+import logging
+import threading
+import psycopg2
 from logging import Logger
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from slack_sdk import WebClient
 from utils.database import Database, DatabaseConfig
 from datetime import datetime, timezone
 
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+module_logger = logging.getLogger(__name__)
+
 db = Database(DatabaseConfig())
 
+CACHE_TTL = float(os.environ.get("BUILDER_CACHE_TTL", "300"))
+CACHE_SIZE = int(os.environ.get("BUILDER_CACHE_SIZE", "5000"))
+# Postgres NOTIFY channel used to invalidate the cache in the other processes (web, workers)
+NOTIFY_CHANNEL = "user_builder_selections"
+CACHE_NOTIFY = os.environ.get("BUILDER_CACHE_NOTIFY", "true").lower() == "true"
+
+
+class SelectionsCache:
+    """
+    Cache-aside for user_builder_selections, keyed by (user_id, app_installed_team_id) and
+    holding both `builder_options` and `mode`. Writes through this module update the entry in
+    place; entries expire after `ttl` seconds and the least recently used are evicted past
+    `max_size`. With `notify` every write is also broadcast with pg NOTIFY so other processes
+    drop their copy, keeping e.g. the web dyno and job workers consistent.
+    """
+    def __init__(self, ttl: float = CACHE_TTL, max_size: int = CACHE_SIZE, notify: bool = CACHE_NOTIFY):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.notify = notify
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "invalidations": 0}
+        self._listener: Optional[threading.Thread] = None
+        self._pid = None
+
+    def get(self, user_id: str, app_installed_team_id: str) -> Dict[str, Any]:
+        """The cached row as {"builder_options", "mode"} (both None when there is no row)"""
+        self._listen()
+        key = (user_id, app_installed_team_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return copy.deepcopy(entry[1])
+            self._counters["misses"] += 1
+
+        row = db.fetch_one(
+            "SELECT builder_options, mode FROM user_builder_selections WHERE user_id = %s AND app_installed_team_id = %s",
+            (user_id, app_installed_team_id)
+        )
+        value = {"builder_options": row["builder_options"], "mode": row["mode"]} if row else {"builder_options": None, "mode": None}
+        self._store(key, value)
+        return copy.deepcopy(value)
+
+    def put(self, user_id: str, app_installed_team_id: str, **fields):
+        """Write-through after a successful database write; `fields` are the columns written"""
+        key = (user_id, app_installed_team_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            self._counters["writes"] += 1
+        if entry is not None or set(fields) >= {"builder_options", "mode"}:
+            value = copy.deepcopy(entry[1]) if entry is not None else {}
+            value.update(copy.deepcopy(fields))
+            self._store(key, value)
+        self._broadcast(key)
+
+    def invalidate(self, user_id: str = None, app_installed_team_id: str = None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((user_id, app_installed_team_id), None)
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _broadcast(self, key):
+        if not self.notify:
+            return
+        try:
+            # pid lets our own listener skip the notification it caused
+            db.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, json.dumps({"pid": os.getpid(), "key": key})))
+        except Exception as e:
+            module_logger.error(f"Could not broadcast builder selections change: {e}")
+
+    def _listen(self):
+        """Start (once per process) the thread that applies other processes' invalidations"""
+        if not self.notify or (self._listener is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._entries.clear() # anything inherited over fork() missed notifications
+            self._listener = threading.Thread(target=self._run_listener, name="builder-cache-listener", daemon=True)
+            self._listener.start()
+
+    def _run_listener(self):
+        config = db.config
+        while True:
+            try:
+                conn = psycopg2.connect(host=config.host, port=config.port, database=config.database, user=config.user, password=config.password)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # anything written while we weren't listening may be stale
+                self.invalidate()
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        if message["pid"] != os.getpid():
+                            self.invalidate(*message["key"])
+            except Exception as e:
+                module_logger.error(f"Builder cache listener lost its connection, retrying: {e}")
+                self.invalidate()
+                time.sleep(5)
+
+
+cache = SelectionsCache()
+
+
 # Retrieve "builder mode" users selections
 def get_user_selections(user_id, app_installed_team_id, logger: Logger):
     try:
         # query = text("SELECT builder_options FROM user_builder_selections WHERE user_id = :user_id AND app_installed_team_id = :app_installed_team_id")
         # with engine.connect() as conn:
         #     result = conn.execute(query, {"user_id": user_id, "app_installed_team_id": app_installed_team_id}).fetchone()
-        result = db.fetch_one("SELECT builder_options FROM user_builder_selections WHERE user_id = %s AND app_installed_team_id = %s", (user_id, app_installed_team_id))
+        result = cache.get(user_id, app_installed_team_id)
         logger.info(f"Query result for user {user_id} in team {app_installed_team_id}: {result}")
-        if result and result["builder_options"]:
+        if result["builder_options"]:
             return result["builder_options"]
         return {}
     except Exception as e:
         logger.error(f"Error getting user selections: {e}")
         return None
 
+def get_mode(user_id, app_installed_team_id) -> Optional[str]:
+    """The user's App Home mode ("builder", "home" or None)"""
+    return cache.get(user_id, app_installed_team_id)["mode"]
+
+def set_mode(user_id, app_installed_team_id, mode: str, clear_options: bool = False):
+    """Switch the user's App Home mode, optionally clearing their builder options"""
+    data = {"mode": mode, "last_updated": datetime.now(timezone.utc)}
+    if clear_options:
+        data["builder_options"] = None
+    row = db.update("user_builder_selections", data, {"user_id": user_id, "app_installed_team_id": app_installed_team_id})
+    if row is None:
+        cache.invalidate(user_id, app_installed_team_id) # nothing to update yet
+    elif clear_options:
+        cache.put(user_id, app_installed_team_id, mode=mode, builder_options=None)
+    else:
+        cache.put(user_id, app_installed_team_id, mode=mode)
+
 def save_user_selections(user_id, app_installed_team_id, selections, logger: Logger):
     try:
         db.upsert(
@@ -33,8 +191,9 @@ def save_user_selections(user_id, app_installed_team_id, selections, logger: Log
                 "app_installed_team_id": app_installed_team_id,
                 "mode": "builder"
             },
-            where={"user_id": user_id}
+            conflict=["user_id"]
         )
+        cache.put(user_id, app_installed_team_id, builder_options=selections, mode="builder")
         logger.debug(f"Successfully saved selections for user_id {user_id}")
     except Exception as e:
         logger.error(f"Error saving builder mode selections and mode: {e}")
\ No newline at end of file
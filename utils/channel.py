@@ -3,6 +3,7 @@ from logging import Logger
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import logging
+from . import directory, identity
 
 logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
 logger = logging.getLogger(__name__)
@@ -14,8 +15,7 @@ def is_bot_in_channel(client: WebClient, channel_id: str):
         member_ids = members_response["members"]
 
         # Get bot's own user ID
-        bot_info = client.auth_test()
-        bot_user_id = bot_info["user_id"]
+        bot_user_id = identity.bot_identity(client)["user_id"]
 
         return bot_user_id in member_ids
         
@@ -47,25 +47,15 @@ def get_info(client: WebClient, channel_id: str):
         # raise
     return False
 
-def get_users(client: WebClient, channel_id: str, exclude_bots: bool = True):
+def get_users(client: WebClient, channel_id: str, exclude_bots: bool = True, team_id: str = None):
     logger.info("Getting users")
     try:
-        info = get_info(
+        return directory.channel_members(
             client=client,
-            channel_id=channel_id
+            channel_id=channel_id,
+            team_id=team_id,
+            exclude_bots=exclude_bots
         )
-        members = client.conversations_members(
-            channel=channel_id,
-            limit=info["num_members"]
-        )
-
-        member_list = []
-        for member_id in members["members"]:
-            member_info = client.users_info(user=member_id)["user"]
-            if (exclude_bots and member_info["is_bot"]) or member_info.get('deleted', False):
-                continue
-            member_list.append(member_info)
-        return member_list
     except Exception as e:
         logger.error(f"Error getting channel members: {e}")
         raise
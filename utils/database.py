@@ -1,10 +1,17 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Optional, List, Dict, Any
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime
 import os
+import re
+import json
+import time
+import asyncio
 import logging
+import threading
+from collections import deque
 from dotenv import load_dotenv
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 
 load_dotenv()  
 
@@ -19,17 +26,240 @@ class DatabaseConfig:
         database: str = os.getenv("DB_NAME", "postgres"),
         user: str = os.getenv("DB_USER", "postgres"),
         password: str = os.getenv("DB_PASSWORD", ""),
+        pool_min_size: int = int(os.getenv("DB_POOL_MIN", "1")),
+        pool_max_size: int = int(os.getenv("DB_POOL_MAX", "10")),
+        pool_idle_timeout: float = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),
+        pool_check_interval: float = float(os.getenv("DB_POOL_CHECK_INTERVAL", "30")),
+        pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30")),
     ):
         self.host = host
         self.port = port
         self.database = database
         self.user = user
         self.password = password
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_idle_timeout = pool_idle_timeout
+        self.pool_check_interval = pool_check_interval
+        self.pool_timeout = pool_timeout
+
+    @property
+    def key(self) -> tuple:
+        """Identifies the server/database/role a pool connects to"""
+        return (self.host, str(self.port), self.database, self.user, self.password)
+
+    @property
+    def label(self) -> str:
+        """Password-free name for logs and monitoring"""
+        return f"{self.user}@{self.host}:{self.port}/{self.database}"
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived psycopg2 connections.
+
+    Connections are opened on demand up to `pool_max_size`. Idle connections are
+    health checked on checkout (if they have not been used for `pool_check_interval`
+    seconds) and anything above `pool_min_size` that has sat idle for longer than
+    `pool_idle_timeout` seconds is closed.
+    """
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self.min_size = max(0, config.pool_min_size)
+        self.max_size = max(1, config.pool_max_size, self.min_size)
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._in_use = 0
+        self._pid = os.getpid()
+        self._next_reap = time.monotonic() + config.pool_idle_timeout
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "reaped": 0,
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=self.config.host,
+            port=self.config.port,
+            database=self.config.database,
+            user=self.config.user,
+            password=self.config.password
+        )
+        self._stats["created"] += 1
+        return conn
+
+    def _close(self, conn):
+        self._stats["closed"] += 1
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+
+    def _check_fork(self):
+        # connections must never be shared across processes (e.g. gunicorn workers)
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._in_use = 0
+            self._pid = os.getpid()
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.config.pool_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy pooled connection to {self.config.label}: {e}")
+            return False
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check a connection out of the pool, opening a new one if there is capacity"""
+        timeout = self.config.pool_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                self._check_fork()
+                while True:
+                    # either way the slot is reserved first so we never exceed max_size
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.max_size:
+                        conn = None
+                        self._in_use += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(f"Timed out waiting for a connection to {self.config.label}")
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+            # the health check is a round trip, so it runs without holding up other checkouts
+            if self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._stats["checkouts"] += 1
+                return conn
+            with self._cond:
+                self._in_use -= 1
+                self._stats["health_check_failures"] += 1
+                self._stats["closed"] += 1
+                self._cond.notify()
+            try:
+                conn.close()
+            except Exception as e:
+                logger.debug(f"Error closing pooled connection: {e}")
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["checkouts"] += 1
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool, closing it if it is broken or `discard` is set"""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._in_use = max(0, self._in_use - 1)
+            if discard or conn.closed:
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._reap()
+            self._cond.notify()
+
+    def _reap(self):
+        now = time.monotonic()
+        if now < self._next_reap:
+            return
+        self._next_reap = now + self.config.pool_idle_timeout
+        # oldest connections are on the left
+        while len(self._idle) + self._in_use > self.min_size and self._idle:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.config.pool_idle_timeout:
+                break
+            self._idle.popleft()
+            self._stats["reaped"] += 1
+            self._close(conn)
+
+    def reap(self):
+        """Close connections that have been idle for longer than the idle timeout"""
+        with self._cond:
+            self._next_reap = 0
+            self._reap()
+
+    def closeall(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pool": self.config.label,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                **self._stats
+            }
+
+
+_pools: Dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(config: DatabaseConfig) -> ConnectionPool:
+    """Return the process-wide pool for this config, creating it on first use"""
+    with _pools_lock:
+        pool = _pools.get(config.key)
+        if pool is None:
+            pool = ConnectionPool(config)
+            _pools[config.key] = pool
+            logger.info(f"Created connection pool for {config.label} (min={pool.min_size}, max={pool.max_size})")
+        return pool
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """Statistics for every connection pool in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
 
 class Database:
     def __init__(self, config: DatabaseConfig):
         self.config = config
-        self._conn = None
+        self.pool = get_pool(config)
         # logger.info(f"DB HOST: {config.host}")
         # logger.info(f"DB port: {config.port}")
         # logger.info(f"DB database: {config.database}")
@@ -38,19 +268,21 @@ class Database:
 
     @contextmanager
     def connection(self):
-        """Context manager for database connections"""
+        """Context manager for database connections, borrowed from the shared pool"""
+        conn = self.pool.getconn()
+        discard = False
         try:
-            conn = psycopg2.connect(
-                host=self.config.host,
-                port=self.config.port,
-                database=self.config.database,
-                user=self.config.user,
-                password=self.config.password
-            )
             yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # the connection itself is likely broken, don't hand it out again
+            discard = True
+            raise
         finally:
-            if conn is not None:
-                conn.close()
+            self.pool.putconn(conn, discard=discard)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Statistics for the pool backing this database"""
+        return self.pool.stats()
 
     @contextmanager
     def cursor(self):
@@ -97,6 +329,18 @@ class Database:
         
         return self.fetch_one(query, tuple(values))
 
+    def insert_many(self, table: str, columns: List[str], rows: List[tuple], page_size: int = 500, cursor=None) -> int:
+        """
+        Insert many rows with multi-row INSERT statements and return the number of rows
+        written. Runs on `cursor` if given, as part of the caller's transaction.
+        """
+        if not rows:
+            return 0
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        with nullcontext(cursor) if cursor is not None else self.cursor() as cursor:
+            execute_values(cursor, query, rows, page_size=page_size)
+        return len(rows)
+
     def update(self, table: str, data: Dict[str, Any], where: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update rows in the database and return the updated row"""
         set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
@@ -125,31 +369,232 @@ class Database:
         return self.fetch_one(query, tuple(where.values()))
     
     
-    def upsert(self, table: str, data: Dict[str, Any], where: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Upsert a record into the database and return the upserted record"""
-        # First, delete the record if it exists
-        # where_clause = ' AND '.join([f"{k} = %s" for k in where.keys()])
-        # delete_query = f"""
-        #     DELETE FROM {table}
-        #     WHERE {where_clause}
-        #     RETURNING *
-        # """
-        # delete_params = tuple(where.values())
-        # self.fetch_one(delete_query, delete_params)
-
-        self.delete(table, where)
-        return self.insert(table, data)
-
-        # # Then, insert the record
-        # columns = list(data.keys())
-        # values = list(data.values())
-        # placeholders = [f'%s' for _ in values]
-        # insert_query = f"""
-        #     INSERT INTO {table} ({', '.join(columns)})
-        #     VALUES ({', '.join(placeholders)})
-        #     RETURNING *
-        # """
-        # logger.debug(insert_query)
-        # logger.debug(values)
-
-        # return self.fetch_one(insert_query, values)
+    def upsert(self, table: str, data: Dict[str, Any], conflict: List[str], update: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Insert a row, or update the existing row that conflicts on the `conflict` columns,
+        in a single statement and return the resulting row. `conflict` should match a unique
+        index or constraint on the table (see migrations/); until it does, the row is
+        updated or inserted in one transaction instead. `update` limits which columns are
+        overwritten on conflict (defaults to every non-conflict column in `data`).
+        """
+        columns = list(data.keys())
+        placeholders = ['%s' for _ in columns]
+
+        query = f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join(placeholders)})
+            {self._on_conflict_clause(columns, conflict, update)}
+            RETURNING *
+        """
+
+        try:
+            return self.fetch_one(query, tuple(data.values()))
+        except psycopg2.errors.InvalidColumnReference:
+            # no unique index on the conflict columns, the migrations haven't been applied
+            logger.warning(f"No unique index on {table} ({', '.join(conflict)}), run migrate.py; falling back to update then insert")
+        with self.cursor() as cursor:
+            for statement, params in self._update_then_insert(table, data, conflict, update):
+                cursor.execute(statement, params)
+                row = cursor.fetchone()
+                if row is not None:
+                    return row
+        return None
+
+    def upsert_many(self, table: str, rows: List[Dict[str, Any]], conflict: List[str], update: Optional[List[str]] = None, increment: Optional[List[str]] = None, page_size: int = 500, cursor=None) -> List[Dict[str, Any]]:
+        """
+        Upsert many rows (all with the same keys) in one transaction and return the resulting
+        rows. On conflict the `increment` columns are added to the existing values rather
+        than overwriting them. Runs on `cursor` if given, as part of the caller's transaction.
+        """
+        if not rows:
+            return []
+        columns = list(rows[0].keys())
+
+        query = f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES %s
+            {self._on_conflict_clause(columns, conflict, update, increment, table)}
+            RETURNING *
+        """
+
+        values = [tuple(row[column] for column in columns) for row in rows]
+        with nullcontext(cursor) if cursor is not None else self.cursor() as cursor:
+            return execute_values(cursor, query, values, page_size=page_size, fetch=True)
+
+    def fetch_range(self, table: str, start: datetime, end: datetime, where: Optional[Dict[str, Any]] = None, columns: Optional[List[str]] = None, column: str = "created_at", order_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch the rows of a table partitioned by date with start <= `column` < end (and
+        matching the `where` equalities). Both bounds are always given so the planner only
+        scans the partitions of that range. Rows from before migration 0008 have created_at
+        1970-01-01, so only a range starting that early returns them.
+        """
+        return self.fetch_all(*self.range_query(table, start, end, where, columns, column, order_by))
+
+    def partitions(self, table: str) -> List[Dict[str, Any]]:
+        """
+        The partitions of a range partitioned table, oldest first, as {"name", "start",
+        "end", "default"}; start/end are None for MINVALUE/MAXVALUE and the default partition.
+        """
+        rows = self.fetch_all("""
+            SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+        """, (table,))
+        partitions = [_partition_range(row["name"], row["bound"]) for row in rows]
+        return sorted(partitions, key=lambda p: (p["default"], p["start"].timestamp() if p["start"] else float("-inf")))
+
+    @staticmethod
+    def range_query(table: str, start: datetime, end: datetime, where: Optional[Dict[str, Any]] = None, columns: Optional[List[str]] = None, column: str = "created_at", order_by: Optional[str] = None) -> Tuple[str, tuple]:
+        """The SELECT and params fetch_range runs, for use inside a larger statement"""
+        where = where or {}
+        conditions = [f"{column} >= %s", f"{column} < %s"] + [f"{k} = %s" for k in where.keys()]
+        query = f"SELECT {', '.join(columns) if columns else '*'} FROM {table} WHERE {' AND '.join(conditions)}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        return query, (start, end, *where.values())
+
+    @staticmethod
+    def _update_then_insert(table: str, data: Dict[str, Any], conflict: List[str], update: Optional[List[str]] = None) -> List[Tuple[str, tuple]]:
+        """The UPDATE and INSERT statements upsert falls back on, to run in order until one returns a row"""
+        columns = list(data.keys())
+        update = update if update is not None else [c for c in columns if c not in conflict]
+        where_clause = ' AND '.join([f"{k} = %s" for k in conflict])
+        key = tuple(data[k] for k in conflict)
+        if update:
+            set_clause = ', '.join([f"{c} = %s" for c in update])
+            existing = (f"UPDATE {table} SET {set_clause} WHERE {where_clause} RETURNING *", tuple(data[c] for c in update) + key)
+        else:
+            existing = (f"SELECT * FROM {table} WHERE {where_clause} LIMIT 1", key)
+        insert = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s' for _ in columns])}) RETURNING *", tuple(data.values()))
+        return [existing, insert]
+
+    @staticmethod
+    def _on_conflict_clause(columns: List[str], conflict: List[str], update: Optional[List[str]] = None, increment: Optional[List[str]] = None, table: Optional[str] = None) -> str:
+        increment = increment or []
+        update = update if update is not None else [c for c in columns if c not in conflict and c not in increment]
+        if not update and not increment:
+            return f"ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+        set_clause = ', '.join([f"{c} = {table}.{c} + EXCLUDED.{c}" for c in increment] + [f"{c} = EXCLUDED.{c}" for c in update])
+        return f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {set_clause}"
+
+
+
+_BOUND = re.compile(r"^FOR VALUES FROM \((.+)\) TO \((.+)\)$")
+
+def _partition_range(name: str, bound: str) -> Dict[str, Any]:
+    if bound == "DEFAULT":
+        return {"name": name, "start": None, "end": None, "default": True}
+    match = _BOUND.match(bound)
+    if not match:
+        raise ValueError(f"Partition {name} is not a single column range partition: {bound}")
+    start, end = (None if value.upper() in ("MINVALUE", "MAXVALUE") else datetime.fromisoformat(value.strip("'")) for value in match.groups())
+    return {"name": name, "start": start, "end": end, "default": False}
+
+
+_async_pools: Dict[tuple, Any] = {}
+
+class AsyncDatabase:
+    """
+    asyncio counterpart of Database for the async runtime (SLACK_APP_RUNTIME=async), backed
+    by an asyncpg pool sized by the same DB_POOL_* settings. Queries use the same %s
+    placeholders as Database and rows come back as plain dicts, jsonb columns decoded.
+    """
+    _placeholder = re.compile(r"%s")
+
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self._lock = asyncio.Lock()
+
+    async def pool(self):
+        pool = _async_pools.get(self.config.key)
+        if pool is not None:
+            return pool
+        async with self._lock:
+            pool = _async_pools.get(self.config.key)
+            if pool is None:
+                import asyncpg # only needed by the async runtime
+
+                async def init(conn):
+                    for type_name in ("json", "jsonb"):
+                        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+                pool = await asyncpg.create_pool(
+                    host=self.config.host,
+                    port=int(self.config.port),
+                    database=self.config.database,
+                    user=self.config.user,
+                    password=self.config.password,
+                    min_size=self.config.pool_min_size,
+                    max_size=self.config.pool_max_size,
+                    max_inactive_connection_lifetime=self.config.pool_idle_timeout,
+                    timeout=self.config.pool_timeout,
+                    init=init,
+                )
+                _async_pools[self.config.key] = pool
+                logger.info(f"Created async connection pool for {self.config.label} (min={self.config.pool_min_size}, max={self.config.pool_max_size})")
+        return pool
+
+    @classmethod
+    def _convert(cls, query: str) -> str:
+        """Rewrite psycopg2-style %s placeholders as asyncpg's $1, $2, ..."""
+        counter = iter(range(1, 10000))
+        return cls._placeholder.sub(lambda _: f"${next(counter)}", query)
+
+    async def execute(self, query: str, params: Optional[tuple] = None) -> None:
+        """Execute a query without returning results"""
+        pool = await self.pool()
+        await pool.execute(self._convert(query), *(params or ()))
+
+    async def fetch_one(self, query: str, params: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
+        """Fetch a single row from the database"""
+        pool = await self.pool()
+        row = await pool.fetchrow(self._convert(query), *(params or ()))
+        return dict(row) if row is not None else None
+
+    async def fetch_all(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Fetch all rows from the database"""
+        pool = await self.pool()
+        return [dict(row) for row in await pool.fetch(self._convert(query), *(params or ()))]
+
+    async def insert(self, table: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Insert a row into the database and return the inserted row"""
+        columns = list(data.keys())
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s' for _ in columns])}) RETURNING *"
+        return await self.fetch_one(query, tuple(data.values()))
+
+    async def update(self, table: str, data: Dict[str, Any], where: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update rows in the database and return the updated row"""
+        set_clause = ', '.join([f"{k} = %s" for k in data.keys()])
+        where_clause = ' AND '.join([f"{k} = %s" for k in where.keys()])
+        query = f"UPDATE {table} SET {set_clause} WHERE {where_clause} RETURNING *"
+        return await self.fetch_one(query, tuple(list(data.values()) + list(where.values())))
+
+    async def upsert(self, table: str, data: Dict[str, Any], conflict: List[str], update: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Insert or update on conflict in a single statement, as Database.upsert"""
+        columns = list(data.keys())
+        query = f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join(['%s' for _ in columns])})
+            {Database._on_conflict_clause(columns, conflict, update)}
+            RETURNING *
+        """
+        try:
+            return await self.fetch_one(query, tuple(data.values()))
+        except Exception as e:
+            # asyncpg's InvalidColumnReferenceError: no unique index on the conflict columns
+            if getattr(e, "sqlstate", None) != "42P10":
+                raise
+            logger.warning(f"No unique index on {table} ({', '.join(conflict)}), run migrate.py; falling back to update then insert")
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for statement, params in Database._update_then_insert(table, data, conflict, update):
+                    row = await conn.fetchrow(self._convert(statement), *params)
+                    if row is not None:
+                        return dict(row)
+        return None
+
+    async def fetch_range(self, table: str, start: datetime, end: datetime, where: Optional[Dict[str, Any]] = None, columns: Optional[List[str]] = None, column: str = "created_at", order_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Fetch the rows of a date range with partition pruning, as Database.fetch_range"""
+        return await self.fetch_all(*Database.range_query(table, start, end, where, columns, column, order_by))
+
@@ -0,0 +1,134 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from . import identity
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+
+class _TeamCache:
+    def __init__(self):
+        self.users: Dict[str, dict] = {}
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()  # single-flight for full loads
+        self.refreshing = False
+
+
+class MemberDirectory:
+    """
+    Per-team cache of user profiles, loaded with paginated users.list calls.
+
+    Answers "who are the human members of channel X" with one conversations.members
+    walk plus cache lookups instead of one users.info call per member. Entries older
+    than `ttl` seconds are still served while a background refresh runs
+    (stale-while-revalidate); only a team that has never been loaded blocks the caller.
+    """
+    def __init__(self, ttl: float = float(os.environ.get("DIRECTORY_TTL", "900")), page_size: int = 200):
+        self.ttl = ttl
+        self.page_size = page_size
+        self._teams: Dict[str, _TeamCache] = {}
+        self._lock = threading.Lock()
+
+    def _team(self, team_id: str) -> _TeamCache:
+        with self._lock:
+            team = self._teams.get(team_id)
+            if team is None:
+                team = self._teams[team_id] = _TeamCache()
+            return team
+
+    def _load(self, client: WebClient, team: _TeamCache, team_id: str):
+        users = {}
+        cursor = None
+        while True:
+            response = client.users_list(limit=self.page_size, cursor=cursor) if cursor else client.users_list(limit=self.page_size)
+            for user in response["members"]:
+                users[user["id"]] = user
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        team.users = users
+        team.fetched_at = time.monotonic()
+        logger.info(f"Loaded {len(users)} users for team {team_id}")
+
+    def _refresh_in_background(self, client: WebClient, team: _TeamCache, team_id: str):
+        with team.lock:
+            if team.refreshing:
+                return
+            team.refreshing = True
+
+        def _run():
+            try:
+                self._load(client, team, team_id)
+            except Exception as e:
+                logger.error(f"Error refreshing user directory for team {team_id}: {e}")
+            finally:
+                team.refreshing = False
+
+        threading.Thread(target=_run, name=f"directory-refresh-{team_id}", daemon=True).start()
+
+    def users(self, client: WebClient, team_id: str) -> Dict[str, dict]:
+        """All cached users of a team, keyed by user ID"""
+        team = self._team(team_id)
+        if not team.fetched_at:
+            with team.lock:
+                if not team.fetched_at:
+                    self._load(client, team, team_id)
+        elif time.monotonic() - team.fetched_at > self.ttl:
+            self._refresh_in_background(client, team, team_id)
+        return team.users
+
+    def get_user(self, client: WebClient, team_id: str, user_id: str) -> Optional[dict]:
+        """A single user's profile, falling back to users.info for users outside the team list (e.g. Slack Connect)"""
+        user = self.users(client, team_id).get(user_id)
+        if user is None:
+            try:
+                user = client.users_info(user=user_id)["user"]
+                self._team(team_id).users[user_id] = user
+            except SlackApiError as e:
+                logger.error(f"Error fetching user info for {user_id}: {e}")
+        return user
+
+    def channel_member_ids(self, client: WebClient, channel_id: str) -> List[str]:
+        member_ids = []
+        cursor = None
+        while True:
+            response = client.conversations_members(channel=channel_id, cursor=cursor, limit=self.page_size) if cursor else client.conversations_members(channel=channel_id, limit=self.page_size)
+            member_ids.extend(response["members"])
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        return member_ids
+
+    def channel_members(self, client: WebClient, channel_id: str, team_id: str, exclude_bots: bool = True) -> List[dict]:
+        """Profiles of a channel's (by default human) members, skipping deactivated users"""
+        members = []
+        for member_id in self.channel_member_ids(client, channel_id):
+            user = self.get_user(client, team_id, member_id)
+            if not user or user.get("deleted", False) or (exclude_bots and user.get("is_bot", False)):
+                continue
+            members.append(user)
+        return members
+
+    def invalidate(self, team_id: str = None):
+        with self._lock:
+            if team_id is None:
+                self._teams.clear()
+            else:
+                self._teams.pop(team_id, None)
+
+
+directory = MemberDirectory()
+
+def channel_members(client: WebClient, channel_id: str, team_id: str = None, exclude_bots: bool = True) -> List[dict]:
+    """Members of a channel, resolved from the cached user directory"""
+    if team_id is None:
+        team_id = identity.bot_identity(client)["team_id"]
+    return directory.channel_members(client, channel_id, team_id, exclude_bots=exclude_bots)
+
+def human_members(client: WebClient, channel_id: str, team_id: str = None) -> List[dict]:
+    return channel_members(client, channel_id, team_id=team_id)
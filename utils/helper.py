@@ -2,6 +2,7 @@ import logging
 import random
 import json
 import os
+from . import block_kit
 
 logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
 logger = logging.getLogger(__name__)
@@ -52,14 +53,10 @@ def loading_formatter(posts:str, replies: str, canvas: str, current: str):
 
 def render_block_kit(template: str|dict, data):
     if isinstance(template, str) and template.endswith(".json"):
-        view_path = os.path.join("block_kit", template)
-        with open(view_path, 'r') as file:
-            template = json.load(file)
+        return block_kit.engine.render(template, data)
+    return block_kit.compile_template(template)(data)
 
-    json_string = json.dumps(template)
-    for key, value in data.items():
-        # if isinstance(value, str):
-        json_string = json_string.replace("{" + key + "}", str(value))
-        # else:
-            # return render_block_kit(value, data)
-    return json.loads(json_string)
\ No newline at end of file
+
+def load_block_kit(template: str):
+    """Load a copy of a block_kit/*.json template from the precompiled cache"""
+    return block_kit.engine.load(template)
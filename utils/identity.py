@@ -0,0 +1,57 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from slack_sdk import WebClient
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_TOKENS = int(os.environ.get("IDENTITY_CACHE_SIZE", "1000"))
+
+# bot token -> auth.test identity, least recently used first
+_cache: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def bot_identity(client: WebClient) -> Dict[str, Optional[str]]:
+    """
+    The bot's `user_id`, `bot_id`, `team_id` and `enterprise_id` for the client's token.
+
+    auth.test is only called the first time a token is seen. A rotated token is a new
+    cache key, and `invalidate()` drops entries when the app is uninstalled or its
+    tokens are revoked.
+    """
+    token = client.token
+    with _lock:
+        identity = _cache.get(token)
+        if identity is not None:
+            _cache.move_to_end(token)
+            return identity
+
+    auth = client.auth_test()
+    identity = {
+        "user_id": auth.get("user_id"),
+        "bot_id": auth.get("bot_id"),
+        "team_id": auth.get("team_id"),
+        "enterprise_id": auth.get("enterprise_id"),
+    }
+    with _lock:
+        _cache[token] = identity
+        while len(_cache) > MAX_CACHED_TOKENS:
+            _cache.popitem(last=False)
+    return identity
+
+
+def invalidate(token: str = None, team_id: str = None, enterprise_id: str = None):
+    """Forget cached identities by token, team or enterprise (or everything when no filter is given)"""
+    with _lock:
+        if token is None and team_id is None and enterprise_id is None:
+            _cache.clear()
+            return
+        for key in list(_cache.keys()):
+            identity = _cache[key]
+            if key == token or (team_id and identity["team_id"] == team_id) or (enterprise_id and identity["enterprise_id"] == enterprise_id):
+                del _cache[key]
+                logger.info(f"Dropped cached bot identity for team {identity['team_id']}")
@@ -0,0 +1,192 @@
+import os
+import json
+import logging
+import socket
+from logging import Logger
+from typing import Any, Callable, Dict, List, Optional
+from .database import Database, DatabaseConfig
+from . import helper
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# "queue" persists jobs for jobs_worker.py, "inline" runs them in the listener (handy for local socket mode)
+JOB_RUNNER = os.environ.get("JOB_RUNNER", "queue").lower()
+STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", "300"))
+MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+
+_handlers: Dict[str, Callable] = {}
+_error_views: Dict[str, Callable] = {}
+
+
+def handler(kind: str, error_view: Callable = None):
+    """
+    Register a job handler, called as handler(client, job, logger). `error_view(error)`
+    builds the modal that replaces the job's loading modal (payload["view_id"]) once the
+    job has failed for good; a generic error modal is shown if it isn't given.
+    """
+    def register(fn: Callable):
+        _handlers[kind] = fn
+        if error_view is not None:
+            _error_views[kind] = error_view
+        return fn
+    return register
+
+def get_handler(kind: str) -> Callable:
+    return _handlers[kind]
+
+def default_error_view(error: Exception) -> dict:
+    return helper.render_block_kit(template=helper.load_block_kit("error_modal.json"), data={
+        "title": "An error has occurred",
+        "error": f"❌ Something went wrong: {error}"
+    })
+
+def show_failure(client, job: "Job", error: Exception):
+    """Replace the loading modal of a job that won't be retried with its error view"""
+    view_id = job.payload.get("view_id") if isinstance(job.payload, dict) else None
+    if not view_id or client is None:
+        return
+    try:
+        client.views_update(view_id=view_id, view=_error_views.get(job.kind, default_error_view)(error))
+    except Exception as e:
+        logger.error(f"Could not show the error for {job.kind} job {job.id} in view {view_id}: {e}")
+
+
+class Job:
+    """A unit of long-running work. Handlers use `checkpoint` to resume where a crashed run left off."""
+    def __init__(self, row: Dict[str, Any], queue: "JobQueue" = None):
+        self.id = row.get("id")
+        self.kind = row["kind"]
+        self.payload = row["payload"]
+        self.checkpoint = row.get("checkpoint") or {}
+        self.attempts = row.get("attempts", 0)
+        self.team_id = row.get("team_id")
+        self.enterprise_id = row.get("enterprise_id")
+        self.is_enterprise_install = row.get("is_enterprise_install", False)
+        self.queue = queue
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.checkpoint)
+
+    def save_checkpoint(self, **data):
+        """Merge `data` into the checkpoint and persist it (a no-op for inline jobs)"""
+        self.checkpoint.update(data)
+        if self.queue is not None and self.id is not None:
+            self.queue.save_checkpoint(self)
+
+
+class JobQueue:
+    """
+    Postgres-backed job queue. Workers claim jobs with FOR UPDATE SKIP LOCKED and
+    heartbeat while running; a running job whose heartbeat is older than `stale_after`
+    seconds belongs to a dead worker and is handed out again, checkpoint included, unless
+    it has used up its attempts (see fail_stale).
+    """
+    def __init__(self, db: Database, stale_after: int = STALE_AFTER, max_attempts: int = MAX_ATTEMPTS):
+        self.db = db
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], team_id: str = None, enterprise_id: str = None, is_enterprise_install: bool = False) -> int:
+        row = self.db.insert("jobs", {
+            "kind": kind,
+            "payload": json.dumps(payload),
+            "team_id": team_id,
+            "enterprise_id": enterprise_id,
+            "is_enterprise_install": is_enterprise_install
+        })
+        logger.info(f"Queued {kind} job {row['id']}")
+        return row["id"]
+
+    def claim(self, worker: str) -> Optional[Job]:
+        row = self.db.fetch_one("""
+            UPDATE jobs
+            SET status = 'running', worker = %s, attempts = attempts + 1, heartbeat_at = now(), updated_at = now()
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued'
+                   OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => %s) AND attempts < %s)
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *
+        """, (worker, self.stale_after, self.max_attempts))
+        return Job(row, queue=self) if row else None
+
+    def fail_stale(self) -> List[Job]:
+        """
+        Mark failed the stale running jobs that have used up their attempts, e.g. a job that
+        keeps killing its worker process and so never reaches fail(). Returns those jobs.
+        """
+        rows = self.db.fetch_all("""
+            UPDATE jobs
+            SET status = 'failed', error = 'worker stopped responding on the last attempt', updated_at = now()
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE status = 'running' AND heartbeat_at < now() - make_interval(secs => %s) AND attempts >= %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+        """, (self.stale_after, self.max_attempts))
+        return [Job(row, queue=self) for row in rows]
+
+    def heartbeat(self, job: Job):
+        self.db.execute("UPDATE jobs SET heartbeat_at = now() WHERE id = %s AND status = 'running'", (job.id,))
+
+    def save_checkpoint(self, job: Job):
+        self.db.execute(
+            "UPDATE jobs SET checkpoint = %s, heartbeat_at = now(), updated_at = now() WHERE id = %s",
+            (json.dumps(job.checkpoint), job.id)
+        )
+
+    def complete(self, job: Job):
+        self.db.execute("UPDATE jobs SET status = 'done', error = NULL, updated_at = now() WHERE id = %s", (job.id,))
+
+    def fail(self, job: Job, error: str):
+        """Requeue the job, or mark it failed once it has used up its attempts"""
+        status = "failed" if job.attempts >= self.max_attempts else "queued"
+        self.db.execute("UPDATE jobs SET status = %s, error = %s, updated_at = now() WHERE id = %s", (status, error, job.id))
+        return status
+
+    def release(self, job: Job):
+        """Hand a job back without counting the attempt, e.g. when the worker is shutting down"""
+        self.db.execute(
+            "UPDATE jobs SET status = 'queued', attempts = GREATEST(attempts - 1, 0), updated_at = now() WHERE id = %s AND status = 'running'",
+            (job.id,)
+        )
+
+
+queue = JobQueue(Database(DatabaseConfig()))
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def submit(kind: str, payload: Dict[str, Any], context=None, client=None, logger: Logger = logger) -> Optional[int]:
+    """
+    Queue a job for the worker processes. `context` is the Bolt context of the listener,
+    used by the worker to find the installation's bot token. With JOB_RUNNER=inline the
+    handler runs right away in the calling thread using `client`.
+    """
+    team_id = context.team_id if context else None
+    enterprise_id = context.enterprise_id if context else None
+    is_enterprise_install = bool(context.is_enterprise_install) if context else False
+
+    if JOB_RUNNER == "inline":
+        job = Job({
+            "kind": kind,
+            "payload": payload,
+            "team_id": team_id,
+            "enterprise_id": enterprise_id,
+            "is_enterprise_install": is_enterprise_install
+        })
+        try:
+            get_handler(kind)(client, job, logger)
+        except Exception as e:
+            # inline jobs aren't retried
+            show_failure(client, job, e)
+            raise
+        return None
+
+    return queue.enqueue(kind, payload, team_id=team_id, enterprise_id=enterprise_id, is_enterprise_install=is_enterprise_install)
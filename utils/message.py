@@ -3,9 +3,10 @@ from slack_sdk.errors import SlackApiError
 # from objects import Database, DatabaseConfig
 from typing import Dict, Any
 import logging
-import time
 # import worker
 from .database import Database, DatabaseConfig
+from . import message_log, reactions
+from .rate_limit import scheduler
 
 logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
 logger = logging.getLogger(__name__)
@@ -76,7 +77,9 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
         if "reacjis" in post and post["reacjis"]:
             for reaction in post["reacjis"]:
                 try:
-                    client.reactions_add(
+                    scheduler.call(
+                        client=client,
+                        method="reactions_add",
                         channel=selected_channel,
                         timestamp=main_post["ts"],
                         name=reaction.strip(':')
@@ -134,7 +137,9 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
                 if "reacjis" in reply and reply["reacjis"]:
                     for reaction in reply["reacjis"]:
                         try:
-                            client.reactions_add(
+                            scheduler.call(
+                                client=client,
+                                method="reactions_add",
                                 channel=selected_channel,
                                 timestamp=reply_post["ts"],
                                 name=reaction.strip(':')
@@ -143,9 +148,6 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
                             logger.error(f"Error adding reaction {reaction} to reply post {reply_post['ts']}: {e}")
                             continue
 
-        # Add slight delay between posts to avoid rate limits
-        time.sleep(1)
-
     except SlackApiError as e:
         logger.error(f"Error posting message to channel: {e}")
     
@@ -155,57 +157,42 @@ def _send_conversation(client, selected_channel: str, post: list|dict, participa
         "reply_results": reply_results
     }
 
+def _message_kwargs(selected_channel: str, post: dict, participant: dict = None, thread_ts: str = False) -> Dict[str, Any]:
+    """chat.postMessage arguments for a post, impersonating `participant` if given"""
+    kwargs = {
+        "channel": selected_channel,
+        "text": post["message"]
+    }
+    if participant:
+        kwargs.update({
+            "username": participant["real_name"],
+            "icon_url": participant["avatar"],
+            "metadata": {
+                "event_type": "converse_reply_posted" if thread_ts else "converse_message_posted",
+                "event_payload": {
+                    "actor_id": participant["id"],
+                    "actor_name": participant["real_name"],
+                    "avatar": participant["avatar"]
+                }
+            }
+        })
+        if thread_ts:
+            kwargs["thread_ts"] = thread_ts
+    else:
+        kwargs["thread_ts"] = thread_ts if thread_ts else False
+    return kwargs
+
 def send_message(client, selected_channel: str, post: dict, participant: dict = None, thread_ts: str = False, history_id: int = None):
-    event_type = "converse_reply_posted" if thread_ts else "converse_message_posted"
-    db = Database(DatabaseConfig())
     try:
+        api_result = scheduler.call(
+            client=client,
+            method="chat_postMessage",
+            **_message_kwargs(selected_channel, post, participant, thread_ts)
+        )
         if participant:
-            if thread_ts:
-                api_result = client.chat_postMessage(
-                    channel=selected_channel,
-                    text=post["message"],
-                    username=participant["real_name"],
-                    icon_url=participant["avatar"],
-                    thread_ts=thread_ts if thread_ts else False,
-                    metadata={
-                        "event_type": event_type,
-                        "event_payload": {
-                            "actor_id": participant["id"],
-                            "actor_name": participant["real_name"],
-                            "avatar": participant["avatar"]
-                        }
-                    }
-                )
-            else:
-                api_result = client.chat_postMessage(
-                    channel=selected_channel,
-                    text=post["message"],
-                    username=participant["real_name"],
-                    icon_url=participant["avatar"],
-                    metadata={
-                        "event_type": event_type,
-                        "event_payload": {
-                            "actor_id": participant["id"],
-                            "actor_name": participant["real_name"],
-                            "avatar": participant["avatar"]
-                        }
-                    }
-                )
-
-            # Log the message to the database
-            message_ts = api_result["ts"]
-            db.insert("messages", {
-                "message_ts": message_ts,
-                "history_id": history_id if history_id else 0
-            })
-            return api_result
-        else:
-            api_result = client.chat_postMessage(
-                channel=selected_channel,
-                text=post["message"],
-                thread_ts=thread_ts if thread_ts else False,
-            )
-            return api_result
+            # Log the message to the database (written in batches, see message_log.flush)
+            message_log.record(api_result["ts"], history_id, reply=bool(thread_ts))
+        return api_result
 
     except SlackApiError as e:
         logger.error(f"Error sending message: {e}")
@@ -213,24 +200,33 @@ def send_message(client, selected_channel: str, post: dict, participant: dict =
         import traceback
         logger.error(f"Error in send_message: {e}")
         traceback.print_exc()
-    
 
-def send_reacjis(client, channel_id, message_ts: str, reacji: str|list):
-    if not isinstance(reacji, list):
-        reacji = [reacji]
+async def async_send_message(client, selected_channel: str, post: dict, participant: dict = None, thread_ts: str = False, history_id: int = None):
+    """As send_message, for an AsyncWebClient"""
+    try:
+        api_result = await scheduler.acall(
+            client=client,
+            method="chat_postMessage",
+            **_message_kwargs(selected_channel, post, participant, thread_ts)
+        )
+        if participant:
+            message_log.record(api_result["ts"], history_id, reply=bool(thread_ts))
+        return api_result
+
+    except SlackApiError as e:
+        logger.error(f"Error sending message: {e}")
+    except Exception as e:
+        logger.error(f"Error in async_send_message: {e}", exc_info=True)
     
-    for r in reacji:
-        try:
-            if isinstance(r, list):
-                logger.info("Found a list of reacjis instead. Iterating again!")
-                logger.info(r)
-                send_reacjis(client, channel_id, message_ts, r)
-            else:
-                result = client.reactions_add(
-                    channel=channel_id,
-                    timestamp=message_ts,
-                    name=r.strip(':')
-                )
-        except Exception as e:
-            logger.error(f"Error adding reaction '{r}' to post {message_ts}: {e}")
-            continue
\ No newline at end of file
+
+def send_reacjis(client, channel_id, message_ts: str, reacji: str|list, history_id: int = None):
+    """Add the reacjis to a post, see reactions.ReactionDispatcher; returns a result per reaction"""
+    results = reactions.dispatcher.add(client, channel_id, message_ts, reacji)
+    message_log.record_reactions(history_id, sum(1 for result in results if result["ok"]))
+    return results
+
+async def async_send_reacjis(client, channel_id, message_ts: str, reacji: str|list, history_id: int = None):
+    """As send_reacjis, for an AsyncWebClient"""
+    results = await reactions.dispatcher.async_add(client, channel_id, message_ts, reacji)
+    message_log.record_reactions(history_id, sum(1 for result in results if result["ok"]))
+    return results
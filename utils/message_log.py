@@ -0,0 +1,146 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from .database import Database, DatabaseConfig
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+
+class MessageLogBuffer:
+    """
+    Write-behind buffer for rows in the `messages` table and the per-run post, reply and
+    reaction counts in `history_counters`.
+
+    Posting code calls `record()` (and `record_reactions()`) which only append to memory. A
+    background thread writes the rows with a multi-row INSERT, and adds the counts with one
+    upsert in the same transaction, once `max_rows` are pending or `flush_interval` seconds
+    have passed. Anything that needs the tables to be up to date (e.g. the end-of-run
+    accounting in utils.analytics) must call `flush()` first.
+    """
+    columns = ["message_ts", "history_id"]
+    counters = ["posts", "replies", "reactions"]
+
+    def __init__(
+        self,
+        db: Database,
+        max_rows: int = int(os.getenv("MESSAGE_LOG_MAX_ROWS", "100")),
+        flush_interval: float = float(os.getenv("MESSAGE_LOG_FLUSH_INTERVAL", "2")),
+    ):
+        self.db = db
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self._rows: List[Tuple[str, int]] = []
+        # history_id -> [posts, replies, reactions] not written yet
+        self._counts: Dict[int, List[int]] = {}
+        self._cond = threading.Condition()
+        # held for the whole take-and-write so flush() also waits for an in-flight background write
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._last_flush = time.monotonic()
+
+    def record(self, message_ts: str, history_id: int = None, reply: bool = False):
+        """Queue a posted message (a thread reply if `reply`) for logging"""
+        with self._cond:
+            self._rows.append((message_ts, history_id if history_id else 0))
+            if history_id:
+                self._count(history_id, 1 if reply else 0, 1)
+            self._ensure_started()
+            if len(self._rows) >= self.max_rows:
+                self._cond.notify()
+
+    def record_reactions(self, history_id: int, added: int):
+        """Count reactions added to the messages of a run"""
+        if not history_id or not added:
+            return
+        with self._cond:
+            self._count(history_id, 2, added)
+
+    def _count(self, history_id: int, counter: int, amount: int):
+        # called with self._cond held
+        counts = self._counts.setdefault(history_id, [0, 0, 0])
+        counts[counter] += amount
+
+    def flush(self) -> int:
+        """
+        Synchronously write every pending row and count, returns the number of rows written.
+        If the write fails the rows and counts are queued again and the error is raised.
+        """
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+                counts, self._counts = self._counts, {}
+                self._last_flush = time.monotonic()
+            if not rows and not counts:
+                return 0
+            try:
+                self._write(rows, counts)
+                return len(rows)
+            except Exception as e:
+                logger.error(f"Error writing {len(rows)} message log rows, will retry: {e}")
+                with self._cond:
+                    self._rows = rows + self._rows
+                    for history_id, values in counts.items():
+                        for counter, amount in enumerate(values):
+                            self._count(history_id, counter, amount)
+                raise
+
+    def _write(self, rows: List[Tuple[str, int]], counts: Dict[int, List[int]]):
+        updated_at = datetime.now(timezone.utc)
+        with self.db.cursor() as cursor:
+            self.db.insert_many("messages", self.columns, rows, cursor=cursor)
+            self.db.upsert_many(
+                "history_counters",
+                [{"history_id": history_id, **dict(zip(self.counters, values)), "updated_at": updated_at} for history_id, values in sorted(counts.items())],
+                conflict=["history_id"],
+                update=["updated_at"],
+                increment=self.counters,
+                cursor=cursor
+            )
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._rows) + len(self._counts)
+
+    def _ensure_started(self):
+        # called with self._cond held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="message-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    due = self._last_flush + self.flush_interval - time.monotonic()
+                    if self._rows and (len(self._rows) >= self.max_rows or due <= 0):
+                        break
+                    self._cond.wait(due if self._rows and due > 0 else self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # already logged and queued again, back off before trying again
+                time.sleep(self.flush_interval)
+
+    def flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.error(f"Exiting with {self.pending()} message log rows and counts not written")
+
+
+buffer = MessageLogBuffer(Database(DatabaseConfig()))
+atexit.register(buffer.flush_at_exit)
+
+def record(message_ts: str, history_id: int = None, reply: bool = False):
+    buffer.record(message_ts, history_id, reply)
+
+def record_reactions(history_id: int, added: int):
+    buffer.record_reactions(history_id, added)
+
+def flush() -> int:
+    return buffer.flush()
@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+from .database import Database
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.environ.get("MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"))
+# pg_advisory_lock key, so only one release/dyno migrates at a time
+LOCK_KEY = 5_173_340_021
+
+_FILENAME = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+# first line of a migration that must run outside a transaction (e.g. CREATE INDEX CONCURRENTLY)
+_NO_TRANSACTION = "-- migrate: no-transaction"
+
+# The queries on the hot paths and the table and leading index columns each must be able to
+# use. Indexes are matched on what they cover rather than their name, since databases that
+# predate migrations may already have an equivalent index under another name (see 0002).
+HOT_QUERIES = [
+    ("SELECT id, api_key, member_id, team_id, enterprise_id, date_updated FROM users WHERE member_id = %s", ("U0",), "users", ("member_id",)),
+    ("SELECT builder_options, mode FROM user_builder_selections WHERE user_id = %s AND app_installed_team_id = %s", ("U0", "T0"), "user_builder_selections", ("user_id",)),
+    ("SELECT posts, replies, reactions FROM history_counters WHERE history_id = %s", (0,), "history_counters", ("history_id",)),
+    ("SELECT message_ts FROM messages WHERE history_id = %s", (0,), "messages", ("history_id",)),
+    ("SELECT day, team_id, runs FROM daily_team_usage WHERE day >= %s", ("2000-01-01",), "daily_team_usage", ("day",)),
+]
+
+
+class Migration:
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, "r") as file:
+            self.sql = file.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(_NO_TRANSACTION)
+
+    def statements(self) -> List[str]:
+        """The migration split into statements, for no-transaction migrations which must run one at a time"""
+        lines = [line for line in self.sql.splitlines() if not line.strip().startswith("--")]
+        return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """The migrations in `directory`, named NNNN_description.sql, in version order"""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Two migrations with version {version}: {migrations[version].path} and {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+class Migrator:
+    """
+    Applies the versioned SQL migrations in MIGRATIONS_DIR and records them in
+    schema_migrations. Each migration runs in its own transaction unless its first line is
+    "-- migrate: no-transaction", in which case its statements run one by one in autocommit
+    (and should be written to be re-runnable, e.g. IF NOT EXISTS).
+    """
+    def __init__(self, db: Database, directory: str = MIGRATIONS_DIR):
+        self.db = db
+        self.directory = directory
+
+    def applied(self) -> Dict[int, Dict[str, Any]]:
+        self._ensure_table()
+        return {row["version"]: row for row in self.db.fetch_all("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")}
+
+    def pending(self) -> List[Migration]:
+        applied = self.applied()
+        for migration in discover(self.directory):
+            if migration.version in applied and applied[migration.version]["checksum"] != migration.checksum:
+                logger.warning(f"Migration {migration} was changed after it was applied")
+        return [migration for migration in discover(self.directory) if migration.version not in applied]
+
+    def migrate(self, target: Optional[int] = None, dry_run: bool = False) -> List[Migration]:
+        """Apply the pending migrations up to `target` (all by default); returns the ones applied"""
+        self._ensure_table()
+        with self.db.connection() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+                try:
+                    # read under the lock, another process may have just migrated
+                    todo = [migration for migration in self.pending() if target is None or migration.version <= target]
+                    for migration in todo:
+                        if dry_run:
+                            logger.info(f"Would apply migration {migration}")
+                            continue
+                        self._apply(conn, migration)
+                    return todo
+                finally:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+            finally:
+                conn.autocommit = False
+
+    def _apply(self, conn, migration: Migration):
+        logger.info(f"Applying migration {migration}")
+        record = ("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)", (migration.version, migration.name, migration.checksum))
+        if migration.transactional:
+            conn.autocommit = False
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(migration.sql)
+                    cursor.execute(*record)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
+        else:
+            with conn.cursor() as cursor:
+                for statement in migration.statements():
+                    cursor.execute(statement)
+                cursor.execute(*record)
+        logger.info(f"Applied migration {migration}")
+
+    def status(self) -> List[Dict[str, Any]]:
+        applied = self.applied()
+        return [{
+            "version": migration.version,
+            "name": migration.name,
+            "applied_at": applied[migration.version]["applied_at"] if migration.version in applied else None,
+            "modified": migration.version in applied and applied[migration.version]["checksum"] != migration.checksum
+        } for migration in discover(self.directory)]
+
+    def check_indexes(self) -> List[Dict[str, Any]]:
+        """
+        EXPLAIN each hot query with sequential scans discouraged and report whether the plan
+        uses an index on its table whose leading columns are the ones the query relies on.
+        Planning only, nothing is executed.
+        """
+        results = []
+        with self.db.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for query, params, table, columns in HOT_QUERIES:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                plan = cursor.fetchone()["QUERY PLAN"]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                cursor.execute(_INDEX_COLUMNS, (sorted(_plan_indexes(plan[0]["Plan"])),))
+                used = [
+                    row["name"] for row in cursor.fetchall()
+                    if table in (row["table"], row["parent"]) and tuple(row["columns"][:len(columns)]) == tuple(columns)
+                ]
+                results.append({
+                    "query": query,
+                    "index": f"{table} ({', '.join(columns)})",
+                    "used": bool(used),
+                    "via": used[0] if used else None
+                })
+        return results
+
+    def _ensure_table(self):
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+
+
+# the table (and parent, for a partition) and key columns of each index in a plan
+_INDEX_COLUMNS = """
+    SELECT ic.relname AS name, t.relname AS table, p.relname AS parent,
+        ARRAY(
+            SELECT a.attname::text FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+            ORDER BY k.n
+        ) AS columns
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    LEFT JOIN pg_inherits h ON h.inhrelid = t.oid
+    LEFT JOIN pg_class p ON p.oid = h.inhparent
+    WHERE ic.relname = ANY(%s)
+"""
+
+
+def _plan_indexes(node: Dict[str, Any]) -> set:
+    indexes = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        indexes |= _plan_indexes(child)
+    return indexes
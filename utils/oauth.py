@@ -0,0 +1,52 @@
+import asyncio
+from logging import Logger
+from slack_sdk.oauth.state_store import OAuthStateStore
+from slack_sdk.oauth.state_store.async_state_store import AsyncOAuthStateStore
+
+# Bot scopes requested on install, shared by the sync (app.py) and async (async_app.py) runtimes
+SCOPES = [
+    "canvases:read",
+    "canvases:write",
+    "channels:history",
+    "channels:join",
+    "channels:manage",
+    "channels:read",
+    "channels:write.invites",
+    "channels:write.topic",
+    "chat:write",
+    "chat:write.customize",
+    "files:read",
+    "groups:history",
+    "groups:read",
+    "groups:write",
+    "im:history",
+    "im:read",
+    "mpim:history",
+    "mpim:read",
+    "mpim:write",
+    "search:read.private",
+    "users:read",
+    "reactions:write",
+    "commands",
+    "app_mentions:read",
+    "emoji:read"
+]
+
+
+class ThreadedOAuthStateStore(AsyncOAuthStateStore):
+    """
+    Exposes a sync OAuthStateStore (e.g. SQLAlchemyOAuthStateStore, which has no async
+    version) to AsyncApp by running its calls on a worker thread. Only used during installs.
+    """
+    def __init__(self, store: OAuthStateStore):
+        self.store = store
+
+    @property
+    def logger(self) -> Logger:
+        return self.store.logger
+
+    async def async_issue(self, *args, **kwargs) -> str:
+        return await asyncio.to_thread(self.store.issue, *args, **kwargs)
+
+    async def async_consume(self, state: str) -> bool:
+        return await asyncio.to_thread(self.store.consume, state)
@@ -0,0 +1,169 @@
+import os
+import gzip
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from .database import Database, DatabaseConfig
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+# tables range partitioned by month on created_at, see migration 0008. Rows written before
+# that migration have created_at 1970-01-01 (nothing recorded when they were written), so
+# any query bounded by date, e.g. created_at >= now() - interval '30 days', silently leaves
+# them out; include created_at = '1970-01-01' or go by id to reach them.
+PARTITIONED_TABLES = ("history", "messages")
+# monthly partitions created ahead of time, so rows never land in the default partition
+MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", "3"))
+# partitions ending this many months before the current one are archived (0 keeps everything)
+ARCHIVE_AFTER_MONTHS = int(os.environ.get("ARCHIVE_AFTER_MONTHS", "0"))
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+# pg_advisory_lock key, so only one process maintains the partitions at a time
+LOCK_KEY = 5_173_340_025
+
+
+def month_start(moment: Optional[datetime] = None) -> datetime:
+    """The start (UTC) of the month `moment` falls in, now by default"""
+    moment = (moment or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+class PartitionManager:
+    """
+    Creates the monthly partitions of PARTITIONED_TABLES ahead of time and archives old
+    ones: a partition is detached, exported to a gzipped CSV file in the archive directory
+    and dropped, with each step recorded in archived_partitions so a run that dies half
+    way is finished by the next one.
+    """
+    def __init__(self, db: Database, tables: tuple = PARTITIONED_TABLES):
+        self.db = db
+        self.tables = tables
+
+    def ensure(self, months_ahead: int = MONTHS_AHEAD, now: Optional[datetime] = None) -> List[str]:
+        """Create any missing partitions from the current month to `months_ahead` months ahead; returns their names"""
+        created = []
+        first = month_start(now)
+        for table in self.tables:
+            partitions = self.db.partitions(table)
+            if not partitions:
+                # not partitioned (yet), migration 0008 hasn't been applied
+                continue
+            default = next((p["name"] for p in partitions if p["default"]), None)
+            for offset in range(months_ahead + 1):
+                start = add_months(first, offset)
+                end = add_months(start, 1)
+                if any(_overlaps(p, start, end) for p in partitions):
+                    continue
+                name = partition_name(table, start)
+                self._create(table, name, start, end, default)
+                created.append(name)
+        return created
+
+    def _create(self, table: str, name: str, start: datetime, end: datetime, default: Optional[str]):
+        bounds = (start.isoformat(), end.isoformat())
+        with self.db.cursor() as cursor:
+            stray = False
+            if default:
+                query, params = Database.range_query(default, start, end, columns=["1"])
+                cursor.execute(f"SELECT EXISTS ({query}) AS stray", params)
+                stray = cursor.fetchone()["stray"]
+            if stray:
+                # the partition can't be created while the default one holds rows in its range,
+                # so take the default out, move them across and put it back
+                cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+            cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+            if stray:
+                query, params = Database.range_query(default, start, end)
+                cursor.execute(f"INSERT INTO {name} {query}", params)
+                logger.warning(f"Moved {cursor.rowcount} rows from {default} to {name}")
+                cursor.execute(f"DELETE FROM {default} WHERE created_at >= %s AND created_at < %s", bounds)
+                cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+        logger.info(f"Created partition {name} for {start:%Y-%m}")
+
+    def archive(self, before: Optional[datetime] = None, directory: str = ARCHIVE_DIR) -> List[Dict[str, Any]]:
+        """
+        Archive every partition that ends on or before `before` (by default
+        ARCHIVE_AFTER_MONTHS months before the current month); returns the
+        archived_partitions rows of the partitions archived.
+        """
+        if before is None:
+            if ARCHIVE_AFTER_MONTHS <= 0:
+                return []
+            before = add_months(month_start(), -ARCHIVE_AFTER_MONTHS)
+        os.makedirs(directory, exist_ok=True)
+
+        # partitions an earlier run detached but didn't get to export
+        names = [row["name"] for row in self.db.fetch_all("SELECT name FROM archived_partitions WHERE status = 'detached' ORDER BY range_end")]
+        for table in self.tables:
+            for partition in self.db.partitions(table):
+                if partition["default"] or partition["end"] is None or partition["end"] > before:
+                    continue
+                self._detach(table, partition)
+                names.append(partition["name"])
+        return [self._export(name, directory) for name in names]
+
+    def _detach(self, table: str, partition: Dict[str, Any]):
+        # detaching and recording it in one transaction, so a detached partition is never lost track of
+        with self.db.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {partition['name']}")
+            cursor.execute(
+                "INSERT INTO archived_partitions (name, parent, range_start, range_end) VALUES (%s, %s, %s, %s)",
+                (partition["name"], table, partition["start"], partition["end"])
+            )
+        logger.info(f"Detached partition {partition['name']} from {table}")
+
+    def _export(self, name: str, directory: str) -> Dict[str, Any]:
+        path = os.path.join(directory, f"{name}.csv.gz")
+        with self.db.cursor() as cursor:
+            with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as file:
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", file)
+            cursor.execute(f"SELECT COUNT(*) AS row_count FROM {name}")
+            row_count = cursor.fetchone()["row_count"]
+        os.replace(f"{path}.tmp", path)
+
+        # only dropped once the file is complete
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                "UPDATE archived_partitions SET status = 'archived', row_count = %s, path = %s, archived_at = now() WHERE name = %s RETURNING *",
+                (row_count, path, name)
+            )
+            archived = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {name}")
+        logger.info(f"Archived {row_count} rows of {name} to {path}")
+        return archived
+
+    def maintain(self, archive: bool = True) -> Dict[str, Any]:
+        """ensure() then (optionally) archive(), unless another process is already doing it"""
+        with self.db.connection() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+                    if not cursor.fetchone()[0]:
+                        logger.info("Partitions are being maintained by another process")
+                        return {"created": [], "archived": []}
+                try:
+                    return {"created": self.ensure(), "archived": self.archive() if archive else []}
+                finally:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+            finally:
+                conn.autocommit = False
+
+
+def _overlaps(partition: Dict[str, Any], start: datetime, end: datetime) -> bool:
+    if partition["default"]:
+        return False
+    return (partition["start"] is None or partition["start"] < end) and (partition["end"] is None or partition["end"] > start)
+
+
+manager = PartitionManager(Database(DatabaseConfig()))
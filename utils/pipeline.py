@@ -0,0 +1,116 @@
+import os
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Tuple, Any
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+GENERATION_CONCURRENCY = int(os.environ.get("GENERATION_CONCURRENCY", "4"))
+# posts requested per LLM call, 1 turns batching off
+GENERATION_BATCH_SIZE = int(os.environ.get("GENERATION_BATCH_SIZE", "5"))
+# how conversation posts are generated:
+#   "batched"     - several posts per call, then one call per post for its replies
+#   "single_shot" - one call per post that returns the post with its replies and reacjis
+GENERATION_STRATEGY = os.environ.get("GENERATION_STRATEGY", "batched").lower()
+GENERATION_STRATEGIES = ("batched", "single_shot")
+
+
+def chunked(items: list, size: int) -> Iterator[list]:
+    """Consecutive slices of `items` of at most `size` elements"""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ordered_map(fn: Callable, items: Iterable, concurrency: int = GENERATION_CONCURRENCY, lookahead: int = None) -> Iterator[Tuple[Any, Any]]:
+    """
+    Run `fn` over `items` on a bounded thread pool and yield `(item, result)` pairs in
+    the original order.
+
+    At most `concurrency` calls run at once and at most `lookahead` results (defaults to
+    twice the concurrency) are computed ahead of the consumer, so slow consumers (e.g.
+    posting to Slack in order) don't cause the whole batch to be generated up front.
+    If `fn` raises, the exception is yielded in place of the result.
+    """
+    concurrency = max(1, concurrency)
+    lookahead = max(concurrency, lookahead or concurrency * 2)
+    items = iter(items)
+    pending = deque()
+
+    def _submit(executor):
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            return True
+        return False
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pipeline") as executor:
+        try:
+            while len(pending) < lookahead and _submit(executor):
+                pass
+            while pending:
+                item, future = pending.popleft()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Pipeline task failed: {e}")
+                    result = e
+                _submit(executor)
+                yield item, result
+        finally:
+            # the consumer stopped early, don't start anything that hasn't started yet
+            for _, future in pending:
+                future.cancel()
+
+
+_DONE = object()
+
+def ordered_stream(fn: Callable, items: Iterable, concurrency: int = GENERATION_CONCURRENCY, lookahead: int = None) -> Iterator[Tuple[Any, Any]]:
+    """
+    Like ordered_map, for an `fn` that returns an iterator (e.g. a streamed LLM answer):
+    yields `(item, value)` for every value `fn(item)` produces, as soon as it is produced,
+    with all of one item's values before the next item's. `lookahead` counts items.
+    If `fn` raises, the exception is yielded after the values it produced.
+    """
+    concurrency = max(1, concurrency)
+    lookahead = max(concurrency, lookahead or concurrency * 2)
+    items = iter(items)
+    pending = deque()
+    stopped = threading.Event()
+
+    def _run(item, values: queue.Queue):
+        try:
+            for value in fn(item):
+                if stopped.is_set():
+                    return
+                values.put(value)
+        except Exception as e:
+            logger.error(f"Pipeline task failed: {e}")
+            values.put(e)
+        finally:
+            values.put(_DONE)
+
+    def _submit(executor):
+        for item in items:
+            values = queue.Queue()
+            pending.append((item, values, executor.submit(_run, item, values)))
+            return True
+        return False
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pipeline") as executor:
+        try:
+            while len(pending) < lookahead and _submit(executor):
+                pass
+            while pending:
+                item, values, _ = pending[0]
+                while (value := values.get()) is not _DONE:
+                    yield item, value
+                pending.popleft()
+                _submit(executor)
+        finally:
+            stopped.set()
+            for _, _, future in pending:
+                future.cancel()
@@ -0,0 +1,88 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+from slack_sdk import WebClient
+from . import helper
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+UPDATES_PER_SECOND = float(os.environ.get("PROGRESS_UPDATES_PER_SECOND", "1"))
+
+
+class ProgressReporter:
+    """
+    Pushes loading modal updates for one view from a background thread.
+
+    `update()` only records the latest state and returns immediately. The reporter sends
+    at most `max_per_second` views.update calls; states that are superseded before they
+    are sent are dropped. `finish()` always sends the final state (or a final view).
+    """
+    def __init__(self, client: WebClient, view_id: str, template: str = "loading_details.json", max_per_second: float = UPDATES_PER_SECOND):
+        self.client = client
+        self.view_id = view_id
+        self.template = template
+        self.min_interval = 1 / max_per_second if max_per_second > 0 else 0
+        self.sent = 0
+        self.dropped = 0
+        self._state: Optional[Dict[str, Any]] = None
+        self._dirty = False
+        self._last_sent = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"progress-{view_id}", daemon=True)
+        self._thread.start()
+
+    def update(self, data: Dict[str, Any]):
+        with self._cond:
+            if self._closed:
+                return
+            if self._dirty:
+                self.dropped += 1
+            self._state = dict(data)
+            self._dirty = True
+            self._cond.notify()
+
+    def finish(self, view: dict = None):
+        """Stop the background thread and send `view`, or the latest state if no view is given"""
+        with self._cond:
+            self._closed = True
+            state, dirty = self._state, self._dirty
+            if dirty and view is not None:
+                self.dropped += 1
+            self._dirty = False
+            self._cond.notify()
+        self._thread.join()
+        if view is not None:
+            self._send(view)
+        elif dirty:
+            self._send(helper.render_block_kit(template=self.template, data=state))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                wait = self._last_sent + self.min_interval - time.monotonic()
+                if wait > 0:
+                    # coalesce anything that arrives while we wait out the rate limit
+                    self._cond.wait(wait)
+                    continue
+                state = self._state
+                self._dirty = False
+            self._send(helper.render_block_kit(template=self.template, data=state))
+
+    def _send(self, view: dict):
+        with self._send_lock:
+            try:
+                self.client.views_update(view_id=self.view_id, view=view)
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"Error updating progress view {self.view_id}: {e}")
+            finally:
+                self._last_sent = time.monotonic()
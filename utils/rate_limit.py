@@ -0,0 +1,181 @@
+import os
+import time
+import socket
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+from aiohttp import ClientConnectorError
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.environ.get("SLACK_MAX_RETRIES", "3"))
+
+# (requests per minute, burst) per workspace, and per channel where Slack applies a channel limit.
+# See https://api.slack.com/apis/rate-limits - chat.postMessage is "special": ~1 per second per channel.
+METHOD_LIMITS = {
+    "chat_postMessage": {"workspace": (600, 20), "channel": (60, 3)},
+    "reactions_add": {"workspace": (50, 10)},  # Tier 3
+    "views_update": {"workspace": (100, 10)},  # Tier 4
+    "views_publish": {"workspace": (100, 10)},  # Tier 4
+}
+DEFAULT_LIMITS = {"workspace": (50, 10)}  # Tier 3
+# Methods that aren't safe to repeat: after a timeout, a dropped connection or a 5xx Slack may
+# already have acted on the request, so these are only retried on a 429 or when the request
+# never left. reactions_add is safe, a repeat just fails with already_reacted.
+NOT_IDEMPOTENT = {"chat_postMessage", "chat_postEphemeral", "chat_scheduleMessage"}
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        """Hold every caller back for `seconds`, e.g. after a 429 with Retry-After"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class SlackScheduler:
+    """
+    Paces Slack Web API calls with token buckets per workspace and method (plus per
+    channel for chat.postMessage, so separate channels proceed in parallel). Calls that
+    get a 429 wait for Retry-After and are retried, as are transient server or
+    connection errors, up to `max_retries` times. NOT_IDEMPOTENT methods are not retried
+    after an error that may have reached Slack; those are counted as "not_retried".
+    """
+    def __init__(self, max_retries: int = MAX_RETRIES):
+        self.max_retries = max_retries
+        self._buckets: Dict[Tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    def _bucket(self, key: Tuple, limit: Tuple[float, int]) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(*limit)
+            return bucket
+
+    def _buckets_for(self, client: WebClient, method: str, channel: Optional[str]):
+        # a bot token identifies one workspace installation
+        limits = METHOD_LIMITS.get(method, DEFAULT_LIMITS)
+        buckets = [self._bucket((client.token, method), limits["workspace"])]
+        if channel and "channel" in limits:
+            buckets.append(self._bucket((client.token, method, channel), limits["channel"]))
+        return buckets
+
+    def _count(self, method: str, counter: str, amount: float = 1):
+        with self._lock:
+            counters = self._counters.setdefault(method, {"calls": 0, "throttled": 0, "retried": 0, "not_retried": 0, "failed": 0, "waited_seconds": 0.0})
+            counters[counter] += amount
+
+    def _retry_backoff(self, method: str, error: Exception, buckets, attempt: int) -> Optional[float]:
+        """
+        Decide how to retry a failed call: raises if it shouldn't be retried, otherwise
+        returns the jittered backoff in seconds (0 for 429s, which wait out Retry-After
+        via the buckets instead)
+        """
+        backoff = True
+        if isinstance(error, SlackApiError):
+            status = error.response.status_code if error.response is not None else None
+            if status == 429:
+                retry_after = float(error.response.headers.get("Retry-After", error.response.headers.get("retry-after", 1)))
+                self._count(method, "throttled")
+                logger.warning(f"Slack throttled {method}, retrying after {retry_after}s")
+                for bucket in buckets:
+                    bucket.block(retry_after)
+                backoff = False
+            elif status is None or status < 500:
+                self._count(method, "failed")
+                raise error
+
+        if backoff and method in NOT_IDEMPOTENT and not _never_sent(error):
+            # retrying could post the message twice
+            logger.warning(f"Not retrying {method} after {error!r}, Slack may have received it")
+            self._count(method, "not_retried")
+            self._count(method, "failed")
+            raise error
+
+        if attempt > self.max_retries:
+            self._count(method, "failed")
+            raise error
+        self._count(method, "retried")
+        return random.uniform(0, min(8, 0.5 * 2 ** attempt)) if backoff else 0.0
+
+    def _wait(self, method: str, buckets) -> float:
+        wait = max(bucket.reserve() for bucket in buckets)
+        if wait > 0:
+            self._count(method, "waited_seconds", wait)
+        self._count(method, "calls")
+        return wait
+
+    def call(self, client: WebClient, method: str, channel: Optional[str] = None, **kwargs) -> Any:
+        """Call `client.<method>(channel=channel, **kwargs)` within the rate limits"""
+        if channel is not None:
+            kwargs["channel"] = channel
+        buckets = self._buckets_for(client, method, channel)
+        attempt = 0
+        while True:
+            wait = self._wait(method, buckets)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return getattr(client, method)(**kwargs)
+            except (SlackApiError, ConnectionError, TimeoutError, OSError) as e:
+                attempt += 1
+                backoff = self._retry_backoff(method, e, buckets, attempt)
+            if backoff:
+                time.sleep(backoff)
+
+    async def acall(self, client, method: str, channel: Optional[str] = None, **kwargs) -> Any:
+        """As call(), for an AsyncWebClient; waits with asyncio.sleep so the event loop keeps running"""
+        if channel is not None:
+            kwargs["channel"] = channel
+        buckets = self._buckets_for(client, method, channel)
+        attempt = 0
+        while True:
+            wait = self._wait(method, buckets)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await getattr(client, method)(**kwargs)
+            except (SlackApiError, ConnectionError, TimeoutError, OSError) as e:
+                attempt += 1
+                backoff = self._retry_backoff(method, e, buckets, attempt)
+            if backoff:
+                await asyncio.sleep(backoff)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {method: dict(counters) for method, counters in self._counters.items()}
+
+
+def _never_sent(error: Exception) -> bool:
+    """True if the call failed while connecting, i.e. before Slack could have seen the request"""
+    # urllib (WebClient) wraps the socket error in URLError.reason
+    for e in (error, getattr(error, "reason", None)):
+        if isinstance(e, (ConnectionRefusedError, socket.gaierror, ClientConnectorError)):
+            return True
+    return False
+
+
+scheduler = SlackScheduler()
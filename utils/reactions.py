@@ -0,0 +1,202 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from .rate_limit import scheduler
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+EMOJI_CACHE_TTL = int(os.environ.get("EMOJI_CACHE_TTL", "3600"))
+REACTION_CONCURRENCY = int(os.environ.get("REACTION_CONCURRENCY", "8"))
+
+# reactions_add errors that mean the name will never work in this workspace
+_INVALID_NAME_ERRORS = {"invalid_name"}
+# reactions_add errors that still leave the reaction in place
+_OK_ERRORS = {"already_reacted"}
+
+
+class _Catalog:
+    def __init__(self, names: Set[str]):
+        self.names = names
+        self.invalid: Set[str] = set()
+        self.fetched_at = time.monotonic()
+
+
+class EmojiCatalog:
+    """
+    Emoji names a workspace accepts, per bot token: its custom emoji and aliases plus the
+    standard set, both from one emoji.list call (include_categories) cached for `ttl`
+    seconds, and loaded by one thread at a time. emoji.list leaves out many standard
+    aliases (e.g. thumbsup), so a name it doesn't list is unknown rather than invalid:
+    names Slack rejects with invalid_name are remembered until the next refresh and names
+    Slack accepts are added. Without emoji:read every name starts out unknown.
+    """
+    def __init__(self, ttl: int = EMOJI_CACHE_TTL):
+        self.ttl = ttl
+        self._catalogs: Dict[str, _Catalog] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, token: str) -> Optional[_Catalog]:
+        with self._lock:
+            catalog = self._catalogs.get(token)
+        if catalog is not None and time.monotonic() - catalog.fetched_at < self.ttl:
+            return catalog
+        return None
+
+    def _get(self, client: WebClient) -> _Catalog:
+        catalog = self._cached(client.token)
+        if catalog is not None:
+            return catalog
+
+        with self._lock:
+            loading = self._loading.setdefault(client.token, threading.Lock())
+        with loading:
+            # concurrent first calls wait for the one emoji.list request
+            catalog = self._cached(client.token)
+            if catalog is not None:
+                return catalog
+            try:
+                response = client.emoji_list(include_categories=True)
+                names = set(response.get("emoji", {}).keys())
+                for category in response.get("categories", []):
+                    names.update(category.get("emoji_names", []))
+                catalog = _Catalog(names)
+                logger.info(f"Cached {len(names)} emoji names")
+            except SlackApiError as e:
+                # e.g. installs from before emoji:read was requested; fall back to learning from reactions_add
+                logger.warning(f"emoji.list unavailable, emoji names will only be learned from reactions_add: {e}")
+                catalog = _Catalog(set())
+
+            with self._lock:
+                self._catalogs[client.token] = catalog
+        return catalog
+
+    def check(self, client: WebClient, name: str) -> Optional[bool]:
+        """True if the name is known to work, False if known not to, None if unknown"""
+        catalog = self._get(client)
+        base = name.split("::")[0] # skin tone variants, e.g. wave::skin-tone-3
+        if base in catalog.invalid:
+            return False
+        if base in catalog.names:
+            return True
+        return None
+
+    def learn(self, client: WebClient, name: str, valid: bool):
+        catalog = self._get(client)
+        base = name.split("::")[0]
+        with self._lock:
+            (catalog.names if valid else catalog.invalid).add(base)
+
+    def invalidate(self, token: str = None):
+        with self._lock:
+            if token is None:
+                self._catalogs.clear()
+            else:
+                self._catalogs.pop(token, None)
+
+
+def normalise(reacji: Any) -> List[str]:
+    """Flatten (possibly nested) reacji from the LLM into unique Slack emoji names, in order"""
+    names = []
+    stack = [reacji]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, (list, tuple)):
+            stack[0:0] = list(item)
+            continue
+        if not isinstance(item, str):
+            continue
+        name = item.strip().strip(":").strip().lower().replace(" ", "_")
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class ReactionDispatcher:
+    """
+    Adds every reaction for a message concurrently, under the SlackScheduler limits.
+    Names are normalised and de-duplicated first, and names the EmojiCatalog knows to
+    be invalid (rejected by reactions_add before) are skipped without a call. Returns one result per name: {"name", "ok", "skipped", "error"}.
+    """
+    def __init__(self, catalog: EmojiCatalog, max_workers: int = REACTION_CONCURRENCY):
+        self.catalog = catalog
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reactions")
+
+    def _plan(self, client, reacji) -> Tuple[List[str], List[Dict[str, Any]]]:
+        names = normalise(reacji)
+        send, skipped = [], []
+        for name in names:
+            if self.catalog.check(client, name) is False:
+                skipped.append({"name": name, "ok": False, "skipped": True, "error": "invalid_name"})
+            else:
+                send.append(name)
+        return send, skipped
+
+    def _result(self, client, name: str, error: Optional[SlackApiError]) -> Dict[str, Any]:
+        if error is None:
+            self.catalog.learn(client, name, valid=True)
+            return {"name": name, "ok": True, "skipped": False, "error": None}
+        code = error.response.get("error") if error.response is not None else str(error)
+        if code in _OK_ERRORS:
+            return {"name": name, "ok": True, "skipped": False, "error": code}
+        if code in _INVALID_NAME_ERRORS:
+            self.catalog.learn(client, name, valid=False)
+        return {"name": name, "ok": False, "skipped": False, "error": code}
+
+    def _add_one(self, client: WebClient, channel_id: str, message_ts: str, name: str) -> Dict[str, Any]:
+        try:
+            scheduler.call(client=client, method="reactions_add", channel=channel_id, timestamp=message_ts, name=name)
+            return self._result(client, name, None)
+        except SlackApiError as e:
+            return self._result(client, name, e)
+        except Exception as e:
+            return {"name": name, "ok": False, "skipped": False, "error": str(e)}
+
+    def add(self, client: WebClient, channel_id: str, message_ts: str, reacji) -> List[Dict[str, Any]]:
+        send, skipped = self._plan(client, reacji)
+        futures = [self.executor.submit(self._add_one, client, channel_id, message_ts, name) for name in send]
+        results = self._ordered(reacji, [future.result() for future in futures] + skipped)
+        self._log(message_ts, results)
+        return results
+
+    async def async_add(self, client, channel_id: str, message_ts: str, reacji) -> List[Dict[str, Any]]:
+        """As add(), for an AsyncWebClient; the catalog is loaded off the event loop"""
+        sync_client = WebClient(token=client.token, base_url=client.base_url)
+        send, skipped = await asyncio.to_thread(self._plan, sync_client, reacji)
+
+        async def add_one(name: str) -> Dict[str, Any]:
+            try:
+                await scheduler.acall(client=client, method="reactions_add", channel=channel_id, timestamp=message_ts, name=name)
+                return self._result(sync_client, name, None)
+            except SlackApiError as e:
+                return self._result(sync_client, name, e)
+            except Exception as e:
+                return {"name": name, "ok": False, "skipped": False, "error": str(e)}
+
+        results = self._ordered(reacji, list(await asyncio.gather(*(add_one(name) for name in send))) + skipped)
+        self._log(message_ts, results)
+        return results
+
+    @staticmethod
+    def _ordered(reacji, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        order = normalise(reacji)
+        return sorted(results, key=lambda result: order.index(result["name"]))
+
+    @staticmethod
+    def _log(message_ts: str, results: List[Dict[str, Any]]):
+        failed = [f"{r['name']} ({r['error']})" for r in results if not r["ok"] and not r["skipped"]]
+        skipped = [r["name"] for r in results if r["skipped"]]
+        if failed:
+            logger.error(f"Reactions not added to post {message_ts}: {', '.join(failed)}")
+        if skipped:
+            logger.debug(f"Skipped invalid reactions for post {message_ts}: {', '.join(skipped)}")
+
+catalog = EmojiCatalog()
+dispatcher = ReactionDispatcher(catalog)
@@ -1,23 +1,51 @@
 from logging import Logger
-from utils import user, message as message_utility, channel as channel_utility
-from utils.database import Database, DatabaseConfig
-from ai import devxp
+from utils import user, message as message_utility, channel as channel_utility, analytics, identity, jobs
+from utils.database import Database, AsyncDatabase, DatabaseConfig
+from ai import devxp, async_devxp
 import random
+import asyncio
 from slack_bolt import Say
+from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
 
 db = Database(DatabaseConfig())
+async_db = AsyncDatabase(DatabaseConfig())
 
-def extend_thread(client, member_id, channel_id, message_ts, say: Say, logger: Logger):
-    current_user = user.get_user(client=client, member_id=member_id, logger=logger)
+@jobs.handler("extend_thread")
+def extend_thread_job(client, job: jobs.Job, logger: Logger):
+    extend_thread(
+        client=client,
+        member_id=job.payload["member_id"],
+        channel_id=job.payload["channel_id"],
+        message_ts=job.payload["message_ts"],
+        logger=logger,
+        job=job
+    )
 
-    # Prep the message history log
-    history_entry = {
-        "conversation_id": None,
-        "channel_id": channel_id,
-        "user_id": current_user["id"]
-    }
-    history_row = db.insert("history", history_entry)
-    start_time = user.get_time()
+def extend_thread(client, member_id, channel_id, message_ts, say: Say = None, logger: Logger = None, job: jobs.Job = None):
+    """
+    Generate and post more replies to a thread. When run as a job the generated replies
+    are checkpointed, so a resumed job only posts the replies that are still missing.
+    """
+    checkpoint = job.checkpoint if job else {}
+
+    if "history_id" in checkpoint:
+        current_user = {"id": checkpoint["user_id"]}
+        history_row = {"id": checkpoint["history_id"]}
+        start_time = checkpoint["start_time"]
+    else:
+        current_user = user.get_user(client=client, member_id=member_id, logger=logger)
+
+        # Prep the message history log
+        history_entry = {
+            "conversation_id": None,
+            "channel_id": channel_id,
+            "user_id": current_user["id"]
+        }
+        history_row = db.insert("history", history_entry)
+        start_time = user.get_time()
+        if job:
+            job.save_checkpoint(history_id=history_row["id"], user_id=current_user["id"], start_time=start_time)
 
     main_ts = message_ts
 
@@ -28,70 +56,53 @@ def extend_thread(client, member_id, channel_id, message_ts, say: Say, logger: L
     #     thread_ts=main_ts
     # )
 
-    # Get thread and members
-    thread = client.conversations_replies(channel=channel_id, ts=main_ts, include_all_metadata=True)
-    member_ids = client.conversations_members(channel=channel_id)["members"]
+    members_by_id = {}
+    if "replies" in checkpoint:
+        # Resumed job: the replies were already generated, only post the remaining ones
+        new_replies = checkpoint["replies"]
+    else:
+        # Get thread and members
+        thread = client.conversations_replies(channel=channel_id, ts=main_ts, include_all_metadata=True)
+        member_ids = client.conversations_members(channel=channel_id)["members"]
 
-    # Get human members
-    human_members = channel_utility.get_users(
-        client=client,
-        channel_id=channel_id
-    )
-    # Remove the bot/app from the human_members list
-    bot_info = client.auth_test()
-    bot_user_id = bot_info["bot_id"]
-    human_members = [member for member in human_members if member["id"] != bot_user_id]
-    human_member_ids = [member["id"] for member in human_members]
+        # Get human members
+        human_members = channel_utility.get_users(
+            client=client,
+            channel_id=channel_id
+        )
+        # Remove the bot/app from the human_members list
+        bot_user_id = identity.bot_identity(client)["bot_id"]
+        human_members = [member for member in human_members if member["id"] != bot_user_id]
+        human_member_ids = [member["id"] for member in human_members]
+        members_by_id = {member["id"]: member for member in human_members}
 
-    # Limit the thread to 5 members
-    # conversation_participants = random.sample(human_members, min(len(human_members), 5))
-
-    logger.info(thread)
-    thread_messages = []
-
-    for message in thread["messages"]:
-        logger.info(message)
-        author_id = ""
-        if "subtype" in message and message["subtype"] == "bot_message":
-            logger.info(f"Bot message detected: {message['text']}")
-            if message.get("metadata", {}).get("event_type") in ["converse_message_posted", "converse_reply_posted"]:
-                author_id = message["metadata"]["event_payload"]["actor_id"]
-            thread_messages.append({
-                "text": message["text"],
-                "author_type": "bot",
-                "user": {"id": author_id}
-            })
-        else:
-            thread_messages.append({
-                "text": message["text"],
-                "author_type": "user",
-                "user": {"id": message["user"]}
-            })
+        # Limit the thread to 5 members
+        # conversation_participants = random.sample(human_members, min(len(human_members), 5))
 
-    logger.info(thread_messages)
+        logger.info(thread)
+        thread_messages = _thread_messages(thread["messages"], logger)
 
-    # Get channel info
-    channel = client.conversations_info(channel=channel_id)
-    logger.info(channel)
+        # Get channel info
+        channel = client.conversations_info(channel=channel_id)
+        logger.info(channel)
 
-    # Pass messages to the AI as context and get additional replies
-    new_replies = devxp.thread(
-        description=channel["description"],
-        topic=channel["topic"],
-        thread=thread_messages,
-        members=human_member_ids
-    )
+        # Pass messages to the AI as context and get additional replies
+        new_replies = devxp.thread(
+            description=channel["description"],
+            topic=channel["topic"],
+            thread=thread_messages,
+            members=human_member_ids
+        )
+        if job:
+            job.save_checkpoint(replies=new_replies, next_reply=0)
 
-    for reply in new_replies:
+    next_reply = checkpoint.get("next_reply", 0)
+    for index, reply in enumerate(new_replies[next_reply:], start=next_reply):
         reply["author"] = ''.join(c for c in reply["author"] if c.isalnum())
         logger.info(f"Getting user info for {reply['author']}")
-        author_full_info = client.users_info(user=reply["author"])
+        author_full_info = members_by_id.get(reply["author"]) or client.users_info(user=reply["author"])["user"]
         reply_post = {"message": reply["message"]}
-        author = {
-            "id": reply["author"],
-            "real_name": author_full_info["user"].get('real_name', ''),
-            "avatar": author_full_info["user"]["profile"].get('image_192', '')
-        }
+        author = _reply_author(reply["author"], author_full_info)
         try:
             reply_result = message_utility.send_message(
                 client=client,
@@ -125,7 +136,8 @@ def extend_thread(client, member_id, channel_id, message_ts, say: Say, logger: L
                     client=client,
                     channel_id=channel_id,
                     message_ts=reply_result["ts"],
-                    reacji=reply["reacjis"]
+                    reacji=reply["reacjis"],
+                    history_id=history_row["id"]
                 )
                 # reacji = reply["reacjis"]
                 # if not isinstance(reacji, list):
@@ -143,15 +155,112 @@ def extend_thread(client, member_id, channel_id, message_ts, say: Say, logger: L
                 #         continue
         except Exception as e:
             logger.error(f"Error sending reply: {e}")
+        if job:
+            # this reply is in the thread, a resumed job starts after it
+            job.save_checkpoint(next_reply=index + 1)
+
+    if job:
+        # a retry from here on only redoes the bookkeeping below, never the posting
+        job.save_checkpoint(next_reply=len(new_replies), posted=True)
 
     # Delete the temp message
     # client.chat_delete(channel=temp_message["channel"], ts=temp_message["ts"])
 
-    # Update the history for query time
+    # Record the query time and the run's counters on history, analytics and the daily rollups
     query_time = user.get_time() - start_time
     logger.info(f"Start time = {start_time}; query time: {query_time}")
-    db.update("history", {"query_time": query_time}, {"id": history_row["id"]})
+    analytics.finish_run(history_row["id"], current_user["id"], query_time, team_id=identity.bot_identity(client)["team_id"])
+
+
+def _thread_messages(messages: list, logger: Logger) -> list:
+    """Reduce conversations.replies messages to the text/author pairs the AI needs as context"""
+    thread_messages = []
+
+    for message in messages:
+        logger.info(message)
+        author_id = ""
+        if "subtype" in message and message["subtype"] == "bot_message":
+            logger.info(f"Bot message detected: {message['text']}")
+            if message.get("metadata", {}).get("event_type") in ["converse_message_posted", "converse_reply_posted"]:
+                author_id = message["metadata"]["event_payload"]["actor_id"]
+            thread_messages.append({
+                "text": message["text"],
+                "author_type": "bot",
+                "user": {"id": author_id}
+            })
+        else:
+            thread_messages.append({
+                "text": message["text"],
+                "author_type": "user",
+                "user": {"id": message["user"]}
+            })
+
+    logger.info(thread_messages)
+    return thread_messages
+
+def _reply_author(author_id: str, author_full_info: dict) -> dict:
+    return {
+        "id": author_id,
+        "real_name": author_full_info.get('real_name', ''),
+        "avatar": author_full_info["profile"].get('image_192', '')
+    }
+
+
+async def async_extend_thread(client: AsyncWebClient, member_id, channel_id, message_ts, logger: Logger):
+    """
+    extend_thread for the async runtime: the Slack, AI and database calls are awaited so
+    one event loop can extend many threads at once. The member directory and bot identity
+    are cached per token and only hit Slack on a miss, so they are read off-loop with a
+    sync client rather than duplicated.
+    """
+    sync_client = WebClient(token=client.token)
+    current_user = await user.async_get_user(client=client, member_id=member_id, logger=logger)
+
+    history_row = await async_db.insert("history", {
+        "conversation_id": None,
+        "channel_id": channel_id,
+        "user_id": current_user["id"]
+    })
+    start_time = user.get_time()
+
+    thread, channel, human_members, bot = await asyncio.gather(
+        client.conversations_replies(channel=channel_id, ts=message_ts, include_all_metadata=True),
+        client.conversations_info(channel=channel_id),
+        asyncio.to_thread(channel_utility.get_users, client=sync_client, channel_id=channel_id),
+        asyncio.to_thread(identity.bot_identity, sync_client)
+    )
+    human_members = [member for member in human_members if member["id"] != bot["bot_id"]]
+    members_by_id = {member["id"]: member for member in human_members}
+
+    new_replies = await async_devxp.thread(
+        description=channel["description"],
+        topic=channel["topic"],
+        thread=_thread_messages(thread["messages"], logger),
+        members=list(members_by_id.keys())
+    )
 
-    # Log an entry to the analytics table
-    total_posts_sent = db.fetch_one("SELECT COUNT(*) AS total_posts_sent FROM messages WHERE history_id = %s", (history_row["id"],))["total_posts_sent"]
-    db.insert("analytics", {"user_id": current_user["id"], "messages": total_posts_sent})
\ No newline at end of file
+    for reply in new_replies:
+        try:
+            reply["author"] = ''.join(c for c in reply["author"] if c.isalnum())
+            author_full_info = members_by_id.get(reply["author"]) or (await client.users_info(user=reply["author"]))["user"]
+            reply_result = await message_utility.async_send_message(
+                client=client,
+                selected_channel=channel_id,
+                post={"message": reply["message"]},
+                participant=_reply_author(reply["author"], author_full_info),
+                thread_ts=message_ts,
+                history_id=history_row["id"]
+            )
+            if "reacjis" in reply:
+                await message_utility.async_send_reacjis(
+                    client=client,
+                    channel_id=channel_id,
+                    message_ts=reply_result["ts"],
+                    reacji=reply["reacjis"],
+                    history_id=history_row["id"]
+                )
+        except Exception as e:
+            logger.error(f"Error sending reply: {e}")
+
+    query_time = user.get_time() - start_time
+    await analytics.async_finish_run(history_row["id"], current_user["id"], query_time, team_id=bot["team_id"])
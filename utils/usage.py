@@ -0,0 +1,160 @@
+import os
+import time
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from .database import Database, DatabaseConfig
+from .analytics import bucket_upper_bound
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+logger = logging.getLogger(__name__)
+
+USAGE_DAYS = int(os.environ.get("USAGE_DAYS", "90"))
+USAGE_REFRESH = float(os.environ.get("USAGE_REFRESH", "60"))
+
+_COUNTERS = ("runs", "posts", "replies", "reactions", "query_time")
+
+
+def percentile(histogram: Dict[int, int], q: float) -> Optional[float]:
+    """The `q`th percentile (0-100) query time in milliseconds of a bucket -> runs histogram, to the bucket's upper bound"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = total * q / 100
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return bucket_upper_bound(bucket)
+    return bucket_upper_bound(max(histogram))
+
+
+class UsageRollups:
+    """
+    In-process copy of the last `days` days of daily_team_usage and
+    daily_query_time_histogram (maintained by utils.analytics.finish_run), for the usage
+    dashboard. The first load reads the whole window; after that a background thread
+    re-reads every `refresh` seconds only the days that can still change (from the day
+    before the newest day loaded), as primary key range scans. Readers only ever see the
+    copy, so a dashboard request never queries the database.
+    """
+    def __init__(self, db: Database, days: int = USAGE_DAYS, refresh: float = USAGE_REFRESH):
+        self.db = db
+        self.days = days
+        self.refresh = refresh
+        self.refreshed_at = 0.0
+        self._usage: Dict[Tuple[date, str], Dict[str, int]] = {}
+        self._histograms: Dict[Tuple[date, str], Dict[int, int]] = {}
+        self._newest: Optional[date] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self):
+        """Read the rollup rows that may have changed since the last load"""
+        with self._load_lock:
+            oldest = date.today() - timedelta(days=self.days)
+            # days before the newest one loaded are complete, except for runs that finished
+            # just before midnight in the database's time zone, so re-read one more
+            since = max(oldest, self._newest - timedelta(days=1)) if self._newest else oldest
+            usage = self.db.fetch_all(
+                f"SELECT day, team_id, {', '.join(_COUNTERS)} FROM daily_team_usage WHERE day >= %s",
+                (since,)
+            )
+            histograms = self.db.fetch_all(
+                "SELECT day, team_id, bucket, runs FROM daily_query_time_histogram WHERE day >= %s",
+                (since,)
+            )
+            with self._lock:
+                for key in [key for key in self._usage if key[0] < oldest]:
+                    del self._usage[key]
+                for key in [key for key in self._histograms if key[0] < oldest or key[0] >= since]:
+                    del self._histograms[key]
+                for row in usage:
+                    self._usage[(row["day"], row["team_id"])] = {counter: row[counter] for counter in _COUNTERS}
+                for row in histograms:
+                    self._histograms.setdefault((row["day"], row["team_id"]), {})[row["bucket"]] = row["runs"]
+                days = [row["day"] for row in usage]
+                if days:
+                    self._newest = max(days + ([self._newest] if self._newest else []))
+                self.refreshed_at = time.time()
+            logger.debug(f"Loaded {len(usage)} usage rows since {since}")
+
+    def start(self):
+        """Load (blocking the first time) and keep refreshing in the background"""
+        if not self.refreshed_at:
+            self.load()
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="usage-rollups", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh)
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Error refreshing usage rollups: {e}")
+
+    def _window(self, days: int, team_id: str = None):
+        # caller holds self._lock
+        oldest = date.today() - timedelta(days=days)
+        for (day, team), usage in self._usage.items():
+            if day >= oldest and (team_id is None or team == team_id):
+                yield day, team, usage, self._histograms.get((day, team), {})
+
+    @staticmethod
+    def _summary(usage: Dict[str, int], histogram: Dict[int, int]) -> Dict[str, Any]:
+        runs = usage["runs"]
+        messages = usage["posts"] + usage["replies"]
+        return {
+            **usage,
+            "messages": messages,
+            "messages_per_run": round(messages / runs, 2) if runs else 0.0,
+            "p50_query_time": percentile(histogram, 50),
+            "p95_query_time": percentile(histogram, 95),
+        }
+
+    def by_day(self, days: int = None, team_id: str = None) -> List[Dict[str, Any]]:
+        """Usage per day, across all workspaces or for one, oldest day first"""
+        totals: Dict[date, Tuple[Dict[str, int], Dict[int, int]]] = {}
+        with self._lock:
+            for day, _, usage, histogram in self._window(days or self.days, team_id):
+                _add(totals.setdefault(day, ({counter: 0 for counter in _COUNTERS}, {})), usage, histogram)
+        return [{"day": day, **self._summary(*totals[day])} for day in sorted(totals)]
+
+    def by_team(self, days: int = None) -> List[Dict[str, Any]]:
+        """Usage per workspace over the last `days` days, most runs first"""
+        totals: Dict[str, Tuple[Dict[str, int], Dict[int, int]]] = {}
+        with self._lock:
+            for _, team, usage, histogram in self._window(days or self.days):
+                _add(totals.setdefault(team, ({counter: 0 for counter in _COUNTERS}, {})), usage, histogram)
+        rows = [{"team_id": team, **self._summary(*totals[team])} for team in totals]
+        return sorted(rows, key=lambda row: row["runs"], reverse=True)
+
+    def team_days(self, days: int = None) -> List[Dict[str, Any]]:
+        """Runs per day and workspace"""
+        with self._lock:
+            return [{"day": day, "team_id": team, "runs": usage["runs"]} for day, team, usage, _ in self._window(days or self.days)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rows": len(self._usage),
+                "newest_day": self._newest.isoformat() if self._newest else None,
+                "refreshed_at": self.refreshed_at,
+            }
+
+
+def _add(total: Tuple[Dict[str, int], Dict[int, int]], usage: Dict[str, int], histogram: Dict[int, int]):
+    counters, buckets = total
+    for counter in _COUNTERS:
+        counters[counter] += usage[counter]
+    for bucket, runs in histogram.items():
+        buckets[bucket] = buckets.get(bucket, 0) + runs
+
+
+rollups = UsageRollups(Database(DatabaseConfig()))
@@ -1,37 +1,201 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from collections import OrderedDict
 from logging import Logger
+from typing import Any, Dict, Optional
 from slack_sdk.errors import SlackApiError
-from utils.database import Database, DatabaseConfig
+from utils.database import Database, AsyncDatabase, DatabaseConfig
 import time
 
+logging.basicConfig(level=os.environ.get('LOGLEVEL', logging.DEBUG))
+module_logger = logging.getLogger(__name__)
+
 db = Database(DatabaseConfig())
+async_db = AsyncDatabase(DatabaseConfig())
 
-def get_user(client, member_id: str, logger: Logger):
-    # do database lookups and stuff!
-    temp_user = db.fetch_one("SELECT id, api_key, member_id, team_id, enterprise_id, date_updated FROM users WHERE member_id = %s", (member_id,))
-    logger.debug(f"TEMP USER FROM DB {temp_user}")
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+
+_COLUMNS = "id, api_key, member_id, team_id, enterprise_id, date_updated"
+_SELECT_USER = f"SELECT {_COLUMNS} FROM users WHERE member_id = %s"
+# get-or-create in one statement: the inserted row, or the existing one when member_id
+# is already taken (relies on the users_member_id_key unique index, migration 0002)
+_GET_OR_CREATE_USER = f"""
+    WITH inserted AS (
+        INSERT INTO users (member_id, team_id, enterprise_id)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (member_id) DO NOTHING
+        RETURNING {_COLUMNS}
+    )
+    SELECT {_COLUMNS} FROM inserted
+    UNION ALL
+    SELECT {_COLUMNS} FROM users WHERE member_id = %s
+    LIMIT 1
+"""
+
+
+class UserIdentityCache:
+    """
+    The users row of each Slack member, created on first sight and then kept for the
+    process lifetime in an LRU of `max_size` entries (nothing updates a users row, so
+    there is nothing to invalidate). A miss costs one SELECT for a known member, or one
+    users.info call and one INSERT ... ON CONFLICT for a new one. Concurrent lookups of the
+    same member share a single load instead of racing each other to the database.
+    """
+    def __init__(self, max_size: int = USER_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, Future] = {}
+        self._async_loading: Dict[str, asyncio.Future] = {}
+        self._counters = {"hits": 0, "misses": 0, "shared": 0, "created": 0, "evictions": 0}
+
+    def _cached(self, member_id: str) -> Optional[Dict[str, Any]]:
+        # caller holds the lock
+        row = self._entries.get(member_id)
+        if row is not None:
+            self._entries.move_to_end(member_id)
+            self._counters["hits"] += 1
+            return dict(row)
+        return None
+
+    def _store(self, member_id: str, row: Dict[str, Any]):
+        with self._lock:
+            self._entries[member_id] = row
+            self._entries.move_to_end(member_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def get(self, client, member_id: str, logger: Logger = None) -> Dict[str, Any]:
+        """The member's users row, creating it from users.info if the member is new"""
+        logger = logger or module_logger
+        with self._lock:
+            row = self._cached(member_id)
+            if row is not None:
+                return row
+            loading = self._loading.get(member_id)
+            if loading is None:
+                self._counters["misses"] += 1
+                loading = self._loading[member_id] = Future()
+                leader = True
+            else:
+                self._counters["shared"] += 1
+                leader = False
+
+        if not leader:
+            return dict(loading.result())
+
+        try:
+            row = self._load(client, member_id, logger)
+            self._store(member_id, row)
+            loading.set_result(row)
+            return dict(row)
+        except BaseException as e:
+            loading.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(member_id, None)
+
+    def _load(self, client, member_id: str, logger: Logger) -> Dict[str, Any]:
+        row = db.fetch_one(_SELECT_USER, (member_id,))
+        if row:
+            return row
+        info = client.users_info(user=member_id)["user"]
+        logger.debug(f"Creating user {member_id} from users.info")
+        row = db.fetch_one(_GET_OR_CREATE_USER, _insert_params(member_id, info))
+        # the INSERT lost to a transaction that committed after this statement's snapshot
+        row = row or db.fetch_one(_SELECT_USER, (member_id,))
+        self.count("created")
+        return row
 
-    # if no match, create one then call get_user again
-    if temp_user and "id" in temp_user:
-        return temp_user
-    else: # no user found!
-        # fetch the user to get the enterprise id
-        temp_user = get_user_info(client, member_id=member_id, logger=logger)
+    async def async_get(self, client, member_id: str, logger: Logger = None) -> Dict[str, Any]:
+        """get() for the async runtime, `client` is an AsyncWebClient"""
+        logger = logger or module_logger
+        with self._lock:
+            row = self._cached(member_id)
+            if row is not None:
+                return row
+            loading = self._async_loading.get(member_id)
+            if loading is None:
+                self._counters["misses"] += 1
+                loading = self._async_loading[member_id] = asyncio.get_running_loop().create_future()
+                leader = True
+            else:
+                self._counters["shared"] += 1
+                leader = False
 
-        logger.debug(f"TEMP USER FROM USER INFO: {temp_user}")
+        if not leader:
+            return dict(await asyncio.shield(loading))
 
-        # TODO: was going to generate an API key here, but I don't think it's needed anymore with moving workflows into the app
+        try:
+            row = await self._async_load(client, member_id, logger)
+            self._store(member_id, row)
+            loading.set_result(row)
+            return dict(row)
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except BaseException as e:
+            loading.set_exception(e)
+            # don't warn about an unretrieved exception when nobody was waiting
+            loading.exception()
+            raise
+        finally:
+            with self._lock:
+                self._async_loading.pop(member_id, None)
+
+    async def _async_load(self, client, member_id: str, logger: Logger) -> Dict[str, Any]:
+        row = await async_db.fetch_one(_SELECT_USER, (member_id,))
+        if row:
+            return row
+        info = (await client.users_info(user=member_id))["user"]
+        logger.debug(f"Creating user {member_id} from users.info")
+        row = await async_db.fetch_one(_GET_OR_CREATE_USER, _insert_params(member_id, info))
+        row = row or await async_db.fetch_one(_SELECT_USER, (member_id,))
+        self.count("created")
+        return row
+
+    def count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def invalidate(self, member_id: str = None):
+        with self._lock:
+            if member_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(member_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"] + self._counters["shared"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+def _insert_params(member_id: str, info: Dict[str, Any]) -> tuple:
+    enterprise_id = (info.get("enterprise_user") or {}).get("enterprise_id")
+    return (member_id, info.get("team_id"), enterprise_id, member_id)
+
+
+identities = UserIdentityCache()
+
+def get_user(client, member_id: str, logger: Logger):
+    """The member's users row (id, api_key, member_id, team_id, enterprise_id, date_updated), created on first use"""
+    return identities.get(client, member_id, logger)
 
-        ent_id = temp_user["user"]["enterprise_user"]["enterprise_id"]
 
-        user = {
-            "member_id": member_id,
-            "team_id": temp_user["team_id"],
-            "enterprise_id": ent_id
-        }
+async def async_get_user(client, member_id: str, logger: Logger):
+    """get_user for the async runtime, `client` is an AsyncWebClient"""
+    return await identities.async_get(client, member_id, logger)
 
-        user = db.insert("users", user)
-        return get_user(client, member_id, logger=logger)
-    
 
 def get_user_info(client, member_id: str, logger: Logger):
     try:
@@ -42,4 +206,4 @@ def get_user_info(client, member_id: str, logger: Logger):
 
 def get_time(as_milli: bool = True):
     now = time.time()
-    return round(now*1000) if as_milli else now
\ No newline at end of file
+    return round(now*1000) if as_milli else now